@@ -10,29 +10,69 @@ MODELS_DIR = os.path.join(BASE_DIR, 'models')
 TRAINING_DATA_DIR = os.path.join(DATA_DIR, 'training_data')
 SYLLABLES_DIR = os.path.join(DATA_DIR, 'syllables')
 RECORDINGS_DIR = os.path.join(DATA_DIR, 'recordings')
+REFERENCE_BANK_DIR = os.path.join(DATA_DIR, 'reference_bank')
 
 # Audio settings
 SAMPLE_RATE = 22050  # Hz
 CHANNELS = 1  # Mono
 CHUNK_SIZE = 1024
 AUDIO_FORMAT = 'wav'
+REFERENCE_AUDIO_CACHE_BYTES = 64 * 1024 * 1024  # Decoded reference waveforms kept in memory
+TIME_STRETCH_BACKEND = 'wsola'  # 'wsola' or 'phase_vocoder'
+TIME_STRETCH_TOLERANCE = 0.02  # Rates this close to 1.0 are not stretched
+CROSSFADE_MS = 10  # Equal-power crossfade at each replaced syllable's edges
+AUDIO_SOURCE = 'microphone'  # 'microphone', 'synthetic' (generated syllables) or an audio file to replay
+SYNTHETIC_SYLLABLE_RATE = 4.0  # Syllables per second from the synthetic source
+SYNTHETIC_NOISE_LEVEL = 0.003  # Background noise amplitude of the synthetic source
+RECORDER_MODE = 'ring'  # 'ring' (callback writes into a preallocated buffer) or 'queue' (collector thread)
+RECORDER_BUFFER_SECONDS = 600  # Ring buffer preallocated per take; longer takes keep only the latest audio
+RECORDER_DISK_QUEUE_BLOCKS = 512  # Blocks buffered for the record-to-disk writer before dropping
+RECORDER_FLUSH_SECONDS = 2.0  # Record-to-disk header refresh interval (at most this much is lost in a crash)
+RECORD_SESSIONS_TO_DISK = True  # Correction-tab recordings stream to data/recordings instead of memory
+VAD_TRIM_TRAINING = True  # Trim leading/trailing silence from training takes as they are recorded
+VAD_AUTO_STOP_MS = 800  # Trailing silence that ends a training take (None to stop by hand only)
+VAD_FRAME_MS = 10
+VAD_THRESHOLD_DB = 12  # Speech must be this far above the noise floor
+VAD_MIN_LEVEL_DB = -55  # ...and never quieter than this (dBFS)
+VAD_FRICATIVE_ZCR = 0.3  # Zero-crossing rate that lets quieter fricative frames count as speech
+VAD_MIN_SPEECH_MS = 30  # Shorter bursts (clicks) are not speech
+VAD_PADDING_MS = 60  # Audio kept before and after the detected speech
+VAD_CALIBRATION_MS = 300  # Noise-floor sample taken from the start of a take when not calibrated
+VAD_TAKE_FLOOR_PERCENTILE = 10  # Quietest frames of that sample set the floor (speech may already be in it)
 
 # Hebrew syllable settings
 TARGET_SYLLABLE_COUNT = 100  # Most common Hebrew syllables to train
 MIN_SYLLABLE_DURATION = 0.05  # seconds (more flexible)
 MAX_SYLLABLE_DURATION = 1.5  # seconds (allow longer syllables)
+STREAM_DECISION_LAG_MS = 250  # Segmenter lookahead, chunking and scoring before a streamed syllable is decided
+STREAM_OUTPUT_DELAY_MS = int(MAX_SYLLABLE_DURATION * 1000) + STREAM_DECISION_LAG_MS  # Streaming corrector playback delay (covers the longest syllable)
+SHARED_STFT_FEATURES = True  # One STFT per recording, per-syllable features sliced from it
 
 # ML Model settings
 MODEL_NAME = 'hebrew_syllable_corrector'
 EMBEDDING_DIM = 128
 SIMILARITY_THRESHOLD = 0.85  # Threshold for pronunciation quality
+MATCH_TOP_K = 3  # Candidate reference syllables reported per analyzed syllable
 
 # Training settings
 BATCH_SIZE = 32
 LEARNING_RATE = 0.001
 EPOCHS = 50
+PROGRESS_COMPACT_EVENTS = 50  # Journaled takes before training progress is re-snapshotted
+PROGRESS_BACKEND = 'json'  # 'json' (snapshot + journal) or 'sqlite'
+DEFAULT_SPEAKER = 'default'
+FEATURE_RECENCY_DECAY = None  # e.g. 0.8 to weight recent takes more in a syllable's reference vector
+BULK_IMPORT_BATCH_SIZE = 500  # Imported takes committed per transaction (and per resume checkpoint)
 
 # GUI settings
 WINDOW_TITLE = "Hebrew Speech Correction System"
 WINDOW_SIZE = "800x600"
 THEME_COLOR = "#2E86AB"
+STARTUP_BACKGROUND_LOAD = True  # Show the window first, then load and warm up the model in the background
+JOB_WORKERS = 2  # Background threads for saving, analysis and playback
+JOB_PUMP_MS = 50  # How often finished background jobs are handed to the GUI
+JOB_PUMP_BATCH = 20  # Results delivered per pump, so a burst cannot stall the GUI
+WAVEFORM_HEIGHT = 100  # Pixels of the Correction Mode waveform view
+WAVEFORM_BASE_BLOCK = 64  # Samples per min/max entry at the finest pyramid level
+WAVEFORM_LEVEL_FACTOR = 4  # Each coarser level summarizes this many entries of the one below
+WAVEFORM_LIVE_REDRAW_MS = 100  # Redraw interval of the waveform while recording
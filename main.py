@@ -3,14 +3,19 @@ Main GUI Application for Hebrew Speech Correction System
 """
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import threading
+import argparse
+import time
 import os
 import sys
 import numpy as np
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from config import WINDOW_TITLE, WINDOW_SIZE, THEME_COLOR, MODELS_DIR, TRAINING_DATA_DIR
+from config import (WINDOW_TITLE, WINDOW_SIZE, THEME_COLOR, MODELS_DIR, TRAINING_DATA_DIR, RECORD_SESSIONS_TO_DISK,
+                    VAD_TRIM_TRAINING, VAD_AUTO_STOP_MS, AUDIO_SOURCE, STARTUP_BACKGROUND_LOAD)
 from src.audio_recorder import AudioRecorder
+from src.audio_sources import create_audio_source
+from src.job_scheduler import JobScheduler
+from src.waveform_view import WaveformView
 from src.syllable_analyzer import SyllableAnalyzer
 from src.training_system import SyllableTrainingSystem
 from src.pronunciation_model import PronunciationModel
@@ -23,17 +28,22 @@ class HebrewSpeechCorrectorGUI:
     Main GUI application with training mode and correction mode
     """
     
-    def __init__(self, root):
+    def __init__(self, root, audio_source=None):
+        self.started = time.perf_counter()
         self.root = root
         self.root.title(WINDOW_TITLE)
         self.root.geometry(WINDOW_SIZE)
         
-        # Initialize components
-        self.recorder = AudioRecorder()
+        # Initialize components (one analyzer shared by all of them)
+        self.recorder = AudioRecorder(source=audio_source)
         self.analyzer = SyllableAnalyzer()
-        self.training_system = SyllableTrainingSystem()
+        self.training_system = SyllableTrainingSystem(analyzer=self.analyzer)
         self.model = PronunciationModel()
-        self.corrector = AudioCorrector(self.model, self.training_system)
+        self.corrector = AudioCorrector(self.model, self.training_system, analyzer=self.analyzer)
+        self.jobs = JobScheduler(self.root)
+        self.model_ready = False
+        self.model_error = None
+        self.interactive_seconds = None
         
         # State variables
         self.current_mode = tk.StringVar(value="training")
@@ -44,11 +54,17 @@ class HebrewSpeechCorrectorGUI:
         # Setup GUI
         self.setup_ui()
         
-        # Load model if exists
-        self.load_model_if_exists()
+        # Load model if exists: behind the open window, or before it appears
+        if STARTUP_BACKGROUND_LOAD:
+            self.status_var.set("Loading model...")
+            self.jobs.submit('startup', self.load_model_if_exists, on_done=self.on_model_loaded,
+                             on_error=self.on_model_load_failed)
+        else:
+            self.load_model_now()
         
         # Initialize Training Mode as default
         self.setup_initial_mode()
+        self.root.after_idle(self.on_interactive)
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -278,11 +294,17 @@ class HebrewSpeechCorrectorGUI:
         )
         self.analyze_btn.grid(row=0, column=2, padx=5)
         
+        # Waveform of the take, with the analysis drawn over it
+        waveform_frame = ttk.LabelFrame(self.correction_frame, text="Waveform", padding="5")
+        waveform_frame.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        self.waveform = WaveformView(waveform_frame)
+        self.waveform.pack(fill=tk.X, expand=True)
+        
         # Results display
         results_frame = ttk.LabelFrame(self.correction_frame, text="Analysis Results", padding="10")
-        results_frame.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
+        results_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
         
-        self.correction_frame.rowconfigure(2, weight=1)
+        self.correction_frame.rowconfigure(3, weight=1)
         
         self.results_text = scrolledtext.ScrolledText(
             results_frame,
@@ -296,7 +318,7 @@ class HebrewSpeechCorrectorGUI:
         
         # Playback controls
         playback_frame = ttk.Frame(self.correction_frame)
-        playback_frame.grid(row=3, column=0, pady=10)
+        playback_frame.grid(row=4, column=0, pady=10)
         
         ttk.Button(
             playback_frame,
@@ -354,7 +376,7 @@ class HebrewSpeechCorrectorGUI:
                 self.current_syllable_label.config(text="✓ All Complete!")
                 self.pronunciation_label.config(text="")
                 print("DEBUG: All syllables complete")
-                
+            
             # Force UI update
             self.root.update_idletasks()
         except Exception as e:
@@ -392,7 +414,12 @@ class HebrewSpeechCorrectorGUI:
             return
         
         try:
-            self.recorder.start_recording()
+            # Silence is trimmed while recording; the take ends by itself after a pause
+            self.recorder.start_recording(
+                trim_silence=VAD_TRIM_TRAINING,
+                auto_stop_ms=VAD_AUTO_STOP_MS if VAD_TRIM_TRAINING else None,
+                on_auto_stop=lambda: self.root.after(0, self.on_training_auto_stop)
+            )
             self.train_record_btn.config(state=tk.DISABLED)
             self.train_stop_btn.config(state=tk.NORMAL)
             # Flash red to indicate recording
@@ -405,6 +432,11 @@ class HebrewSpeechCorrectorGUI:
             self.train_record_btn.config(state=tk.NORMAL)
             self.train_stop_btn.config(state=tk.DISABLED)
     
+    def on_training_auto_stop(self):
+        """The recorder heard the syllable followed by silence"""
+        if self.recorder.is_recording():
+            self.stop_training_recording()
+    
     def stop_training_recording(self):
         """Stop recording and save training data"""
         try:
@@ -417,37 +449,34 @@ class HebrewSpeechCorrectorGUI:
                 self.status_var.set("Processing audio...")
                 self.root.update()
                 
-                # Save the recording in a thread to avoid freezing
-                def save_in_thread():
-                    try:
-                        filepath = self.training_system.save_syllable_recording(
-                            self.current_training_syllable,
-                            audio
-                        )
-                        
-                        # Update model with new reference
-                        features = self.analyzer.extract_features(audio)
-                        self.model.add_syllable_reference(self.current_training_syllable, features)
-                        
-                        # Update UI in main thread with visual feedback
-                        self.root.after(0, lambda: self.current_syllable_label.config(foreground="green"))
-                        self.root.after(0, lambda: self.status_var.set(f"✓ Saved '{self.current_training_syllable}' successfully!"))
-                        self.root.after(0, self.update_training_progress)
-                        
-                        # Auto-advance to next syllable after 1.5 seconds
-                        self.root.after(1500, self.next_training_syllable)
-                    except Exception as e:
-                        self.root.after(0, lambda: messagebox.showerror(
-                            "Error",
-                            f"Failed to save recording: {str(e)}"
-                        ))
-                        self.root.after(0, lambda: self.status_var.set("Error"))
-                        self.root.after(0, lambda: self.current_syllable_label.config(foreground="#2E86AB"))
-                    finally:
-                        self.root.after(0, lambda: self.train_record_btn.config(state=tk.NORMAL))
-                        self.root.after(0, lambda: self.train_stop_btn.config(state=tk.DISABLED))
+                # Save the recording in the background to avoid freezing
+                syllable = self.current_training_syllable
+                
+                def save_take():
+                    self.training_system.save_syllable_recording(syllable, audio)
+                    return self.analyzer.extract_features(audio)
                 
-                threading.Thread(target=save_in_thread, daemon=True).start()
+                def on_saved(features):
+                    # Update model with new reference and give visual feedback
+                    self.model.add_syllable_reference(syllable, features)
+                    self.current_syllable_label.config(foreground="green")
+                    self.status_var.set(f"✓ Saved '{syllable}' successfully!")
+                    self.update_training_progress()
+                    self.train_record_btn.config(state=tk.NORMAL)
+                    self.train_stop_btn.config(state=tk.DISABLED)
+                    
+                    # Auto-advance to next syllable after 1.5 seconds
+                    self.root.after(1500, self.next_training_syllable)
+                
+                def on_save_failed(e):
+                    messagebox.showerror("Error", f"Failed to save recording: {str(e)}")
+                    self.status_var.set("Error")
+                    self.current_syllable_label.config(foreground="#2E86AB")
+                    self.train_record_btn.config(state=tk.NORMAL)
+                    self.train_stop_btn.config(state=tk.DISABLED)
+                
+                # Every take is kept, so saves never coalesce
+                self.jobs.submit('save', save_take, on_done=on_saved, on_error=on_save_failed, coalesce=False)
             else:
                 messagebox.showerror("Error", "No audio recorded")
                 self.train_record_btn.config(state=tk.NORMAL)
@@ -468,24 +497,27 @@ class HebrewSpeechCorrectorGUI:
             return
         
         try:
-            import soundfile as sf
             import sounddevice as sd
             
             # Check if syllable has been recorded
-            recordings = self.training_system.progress.get(self.current_training_syllable, {}).get('recordings', [])
-            if not recordings:
+            if self.training_system.get_syllable_reference(self.current_training_syllable) is None:
                 messagebox.showinfo("Not Recorded", f"Syllable '{self.current_training_syllable}' has not been recorded yet")
                 return
             
-            # Get the latest recording file
-            latest_recording = recordings[-1]
+            # Latest take, from the packed reference bank or the audio cache
+            syllable = self.current_training_syllable
+            self.status_var.set(f"▶ Playing: {syllable}")
             
-            # Load and play audio
-            audio, sr = sf.read(latest_recording)
-            self.status_var.set(f"▶ Playing: {self.current_training_syllable}")
-            sd.play(audio, sr)
-            sd.wait()
-            self.status_var.set("Ready")
+            def play_take():
+                sd.play(self.corrector.get_replacement_audio(syllable), self.corrector.sample_rate)
+                sd.wait()
+            
+            def on_play_failed(e):
+                messagebox.showerror("Playback Error", f"Could not play recording: {str(e)}")
+                self.status_var.set("Ready")
+            
+            self.jobs.submit('playback', play_take, on_done=lambda _: self.status_var.set("Ready"),
+                             on_error=on_play_failed)
         except Exception as e:
             messagebox.showerror("Playback Error", f"Could not play recording: {str(e)}")
             self.status_var.set("Ready")
@@ -508,7 +540,13 @@ class HebrewSpeechCorrectorGUI:
     
     def start_recording(self):
         """Start recording for correction"""
-        self.recorder.start_recording()
+        self.waveform.start_live()
+        self.recorder.add_chunk_listener(self.waveform.append)
+        if RECORD_SESSIONS_TO_DISK:
+            # Long sessions go straight to a file instead of piling up in memory
+            self.recorder.start_recording(output_path=self.recorder.new_recording_path())
+        else:
+            self.recorder.start_recording()
         self.record_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         self.analyze_btn.config(state=tk.DISABLED)
@@ -517,10 +555,13 @@ class HebrewSpeechCorrectorGUI:
     def stop_recording(self):
         """Stop recording"""
         self.recording_audio = self.recorder.stop_recording()
+        self.recorder.remove_chunk_listener(self.waveform.append)
+        self.waveform.stop_live(self.recording_audio)
         
         if self.recording_audio is not None:
-            # Save recording
-            self.recorder.save_recording(self.recording_audio)
+            # Save recording (already on disk when recorded to a file)
+            if self.recorder.output_path is None:
+                self.recorder.save_recording(self.recording_audio)
             
             self.record_btn.config(state=tk.NORMAL)
             self.stop_btn.config(state=tk.DISABLED)
@@ -539,6 +580,12 @@ class HebrewSpeechCorrectorGUI:
             return
         
         # Check if model is trained
+        if self.model_error is not None:
+            messagebox.showerror("Error", f"The model could not be loaded:\n{self.model_error}")
+            return
+        if not self.model_ready:
+            messagebox.showinfo("Loading", "The model is still loading, please try again in a moment")
+            return
         if len(self.model.syllable_references) == 0:
             messagebox.showwarning(
                 "Training Required",
@@ -549,20 +596,44 @@ class HebrewSpeechCorrectorGUI:
         self.status_var.set("Analyzing and correcting...")
         self.results_text.delete(1.0, tk.END)
         
-        # Run analysis in background thread
-        def analyze_thread():
-            try:
-                corrected, report = self.corrector.correct_audio(self.recording_audio)
-                self.corrected_audio = corrected
-                
-                # Display results
-                self.root.after(0, lambda: self.display_results(report))
-                self.root.after(0, lambda: self.status_var.set("Analysis complete"))
-            except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", f"Analysis failed: {str(e)}"))
-                self.root.after(0, lambda: self.status_var.set("Error during analysis"))
-        
-        threading.Thread(target=analyze_thread, daemon=True).start()
+        # Run analysis in the background; a newer request supersedes this one.
+        # Rows appear as syllables are scored, then the full report replaces them
+        self.results_text.insert(tk.END, "🎵 Syllables as they are analyzed:\n")
+        self.waveform.set_overlays([], [])
+        
+        def analyze(audio, token, progress):
+            for event, value in self.corrector.iter_correct_audio(audio, token=token):
+                if event == 'done':
+                    return value
+                progress((event, value))
+        
+        def on_progress(item):
+            event, value = item
+            if event == 'syllable':
+                self.waveform.add_syllable(value)
+                status_icon = "✓" if value['quality_score'] >= 0.85 else "⚠" if value['quality_score'] >= 0.70 else "✗"
+                self.results_text.insert(
+                    tk.END,
+                    f"   {status_icon} '{value['matched_syllable']}' [{value['start_time']:.2f}s] - "
+                    f"Quality: {value['quality_score']:.0%}\n"
+                )
+            else:
+                self.waveform.add_correction(value)
+                self.results_text.insert(tk.END, f"      ✗ → ✓  corrected '{value['syllable']}'\n")
+            self.results_text.see(tk.END)
+        
+        def on_analyzed(result):
+            self.corrected_audio, report = result
+            self.waveform.set_overlays(report['syllables_analyzed'], report['corrections'])
+            self.display_results(report)
+            self.status_var.set("Analysis complete")
+        
+        def on_analysis_failed(e):
+            messagebox.showerror("Error", f"Analysis failed: {str(e)}")
+            self.status_var.set("Error during analysis")
+        
+        self.jobs.submit('analysis', analyze, self.recording_audio, on_done=on_analyzed,
+                         on_error=on_analysis_failed, on_progress=on_progress, with_token=True)
     
     def display_results(self, report):
         """Display analysis results with visual syllable breakdown"""
@@ -642,10 +713,7 @@ class HebrewSpeechCorrectorGUI:
             messagebox.showinfo("Info", "No recording to play")
             return
         
-        threading.Thread(
-            target=lambda: self.corrector.play_audio(self.recording_audio),
-            daemon=True
-        ).start()
+        self.jobs.submit('playback', self.corrector.play_audio, self.recording_audio)
     
     def play_corrected(self):
         """Play corrected audio"""
@@ -653,10 +721,7 @@ class HebrewSpeechCorrectorGUI:
             messagebox.showinfo("Info", "No corrected audio available")
             return
         
-        threading.Thread(
-            target=lambda: self.corrector.play_audio(self.corrected_audio),
-            daemon=True
-        ).start()
+        self.jobs.submit('playback', self.corrector.play_audio, self.corrected_audio)
     
     def save_corrected(self):
         """Save corrected audio"""
@@ -668,38 +733,102 @@ class HebrewSpeechCorrectorGUI:
         messagebox.showinfo("Success", f"Corrected audio saved to:\n{filepath}")
     
     def load_model_if_exists(self):
-        """Load existing model if available"""
+        """
+        Load existing model if available, add the trained syllables and warm
+        up the analysis path (no widgets touched, so it can run in the background)
+        Returns the loaded model
+        """
+        model = PronunciationModel()
         model_path = os.path.join(MODELS_DIR, 'pronunciation_model.pth')
         if os.path.exists(model_path):
             try:
-                self.model.load_model(model_path)
-                self.status_var.set(f"Model loaded ({len(self.model.syllable_references)} syllables)")
+                model.load_model(model_path)
             except Exception as e:
                 print(f"Could not load model: {e}")
         
-        # Load trained syllables into model
-        trained_syllables = self.training_system.get_all_trained_syllables()
-        for syllable in trained_syllables:
-            ref_data = self.training_system.get_syllable_reference(syllable)
-            if ref_data:
-                self.model.add_syllable_reference(syllable, ref_data['features'])
+        # Load trained syllables into model (one consistent read while saves may run)
+        for syllable, ref_data in self.training_system.get_trained_references().items():
+            model.add_syllable_reference(syllable, ref_data['features'])
+        
+        # Pay librosa's and torch's first-call costs now rather than on the first analysis;
+        # a failed warm-up only means the first analysis is slower
+        warm_start = time.perf_counter()
+        try:
+            self.analyzer.warm_up()
+            model.warm_up()
+            print(f"DEBUG: Warm-up took {time.perf_counter() - warm_start:.2f}s")
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+        return model
+    
+    def load_model_now(self):
+        """Load the model on the GUI thread; on failure the model is never marked ready"""
+        try:
+            model = self.load_model_if_exists()
+        except Exception as e:
+            print(f"Could not load model: {e}")
+            self.model_error = e
+            self.status_var.set(f"Model failed to load: {e}")
+            return
+        self.on_model_loaded(model)
+    
+    def on_model_load_failed(self, error):
+        """Background load failed: retry once on the GUI thread"""
+        print(f"Background model load failed: {error}")
+        self.status_var.set("Loading model...")
+        self.load_model_now()
+    
+    def on_model_loaded(self, model):
+        """Switch to the loaded model (on the GUI thread)"""
+        if model is not self.model:
+            # Takes saved while loading went into the placeholder model
+            for syllable, reference in self.model.syllable_references.items():
+                model.add_syllable_reference(syllable, reference['features'])
+            self.model = model
+            self.corrector.model = model
+        self.model_ready = True
+        
+        status = f"Model loaded ({len(self.model.syllable_references)} syllables)"
+        if self.interactive_seconds is not None:
+            status += (f" - interactive after {self.interactive_seconds:.2f}s, "
+                       f"warm after {time.perf_counter() - self.started:.2f}s")
+        self.status_var.set(status)
+    
+    def on_interactive(self):
+        """First idle moment of the event loop: the window is up and responding"""
+        self.interactive_seconds = time.perf_counter() - self.started
+        print(f"DEBUG: Time to interactive {self.interactive_seconds:.2f}s")
+        if not self.model_ready and self.model_error is None:
+            self.status_var.set(f"Ready in {self.interactive_seconds:.2f}s (loading model in the background...)")
     
     def on_closing(self):
         """Handle application closing"""
         if self.recorder.is_recording():
             self.recorder.stop_recording()
         
-        # Save model
-        if len(self.model.syllable_references) > 0:
+        # Drop pending analyses and playback; every queued save finishes and is delivered first
+        self.jobs.shutdown(wait=True)
+        
+        # Save model (unless it never finished loading, so a placeholder never replaces the saved one)
+        if self.model_ready and len(self.model.syllable_references) > 0:
             self.model.save_model()
         
+        # Fold journaled takes into the progress snapshot
+        if self.training_system.progress_store.journal_events:
+            self.training_system.save_progress()
+        
         self.root.destroy()
 
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description=WINDOW_TITLE)
+    parser.add_argument('--source', default=AUDIO_SOURCE,
+                        help="Audio input: 'microphone', 'synthetic', or an audio file to replay")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = HebrewSpeechCorrectorGUI(root)
+    app = HebrewSpeechCorrectorGUI(root, audio_source=create_audio_source(args.source))
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
 
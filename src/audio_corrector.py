@@ -2,16 +2,107 @@
 Audio correction engine for replacing mispronounced syllables
 """
 import numpy as np
-import librosa
-import soundfile as sf
-from pydub import AudioSegment
-from pydub.playback import play
+import threading
 import os
 import sys
+from collections import OrderedDict
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import SAMPLE_RATE, RECORDINGS_DIR
+from config import (SAMPLE_RATE, RECORDINGS_DIR, REFERENCE_AUDIO_CACHE_BYTES, CROSSFADE_MS,
+                    TIME_STRETCH_BACKEND)
 from src.syllable_analyzer import SyllableAnalyzer
 from src.pronunciation_model import PronunciationModel
+from src.reference_bank import ReferenceBank
+from src.time_stretch import time_stretch
+from src.lazy_import import lazy_import
+
+librosa = lazy_import('librosa')
+sf = lazy_import('soundfile')
+
+
+class ReferenceAudioCache:
+    """
+    Byte-bounded LRU cache of decoded, resampled reference waveforms
+    Keyed by (filepath, mtime) so a file rewritten in place is reloaded;
+    cached arrays are float32 and read-only. Safe to share between the
+    analysis, playback and save threads (decoding happens outside the lock)
+    """
+    
+    def __init__(self, max_bytes=REFERENCE_AUDIO_CACHE_BYTES, sample_rate=SAMPLE_RATE):
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self.entries = OrderedDict()  # (filepath, mtime_ns) -> (audio, syllable)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+    
+    def get(self, filepath, syllable=None):
+        """
+        Get the waveform of a reference file, decoding it on a miss
+        Returns float32 audio at the cache sample rate
+        """
+        key = (filepath, os.stat(filepath).st_mtime_ns)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        audio, _ = librosa.load(filepath, sr=self.sample_rate)
+        audio = audio.astype(np.float32)
+        audio.flags.writeable = False
+        
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                return entry[0]  # Decoded by another thread meanwhile
+            self._drop(lambda entry_key, entry_syllable: entry_key[0] == filepath)  # Older versions of the file
+            if audio.nbytes <= self.max_bytes:
+                self.entries[key] = (audio, syllable)
+                self.current_bytes += audio.nbytes
+                while self.current_bytes > self.max_bytes:
+                    _, (evicted, _) = self.entries.popitem(last=False)
+                    self.current_bytes -= evicted.nbytes
+        return audio
+    
+    def invalidate(self, filepath=None, syllable=None):
+        """Drop cached waveforms of a file and/or a syllable (everything if neither is given)"""
+        with self.lock:
+            self._drop(lambda key, entry_syllable: filepath is None and syllable is None
+                       or key[0] == filepath or (syllable is not None and entry_syllable == syllable))
+    
+    def _drop(self, matches):
+        """Remove entries for which matches(key, syllable) holds (lock held)"""
+        for key, (audio, entry_syllable) in list(self.entries.items()):
+            if matches(key, entry_syllable):
+                del self.entries[key]
+                self.current_bytes -= audio.nbytes
+    
+    def clear(self):
+        """Drop everything and reset the counters"""
+        self.invalidate()
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        """Hit/miss counters and memory use"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes
+            }
 
 
 class AudioCorrector:
@@ -19,11 +110,22 @@ class AudioCorrector:
     Corrects audio by replacing mispronounced syllables with correct ones
     """
     
-    def __init__(self, pronunciation_model, training_system):
+    def __init__(self, pronunciation_model, training_system, analyzer=None):
         self.model = pronunciation_model
         self.training_system = training_system
-        self.analyzer = SyllableAnalyzer()
+        self.analyzer = analyzer or SyllableAnalyzer()
         self.sample_rate = SAMPLE_RATE
+        self.stretch_backend = TIME_STRETCH_BACKEND
+        self.reference_cache = ReferenceAudioCache(sample_rate=self.sample_rate)
+        self.reference_bank = ReferenceBank(sample_rate=self.sample_rate)
+        
+        # A new take replaces the syllable's reference audio
+        if hasattr(training_system, 'add_recording_listener'):
+            training_system.add_recording_listener(self._on_new_recording)
+    
+    def _on_new_recording(self, syllable, filepath):
+        """Drop cached reference audio superseded by a new training take"""
+        self.reference_cache.invalidate(filepath=filepath, syllable=syllable)
     
     def analyze_and_assess(self, audio):
         """
@@ -34,51 +136,59 @@ class AudioCorrector:
         syllables = self.analyzer.analyze_audio(audio)
         print(f"DEBUG: {len(syllables)} syllables extracted")
         
-        # For each syllable, find best matching reference
-        assessed_syllables = []
-        
+        return self.assess_syllables(syllables)
+    
+    def assess_syllables(self, syllables):
+        """
+        Match already-segmented syllables (with features) against the references
+        Returns list of syllables with assessment
+        """
+        # Drop syllables without usable features
+        valid_syllables = []
         for i, syllable in enumerate(syllables):
             features = syllable['features']
             print(f"DEBUG: Syllable {i} feature shape: {np.shape(features)}")
             if features is None or len(features) == 0:
                 print(f"DEBUG: Syllable {i} has empty features, skipping")
                 continue
-            
-            # Find best matching reference syllable
-            best_match = None
-            best_score = 0.0
-            
-            for ref_syllable in self.model.syllable_references.keys():
-                ref_features = self.model.syllable_references[ref_syllable]['features']
-                score = self.model.compare_syllables(features, ref_features)
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = ref_syllable
-            
-            # Assess pronunciation quality
-            if best_match:
-                assessment = self.model.assess_pronunciation(features, best_match)
-            else:
-                assessment = {
-                    'quality_score': 0.0,
-                    'needs_correction': True,
-                    'message': 'No reference syllable found'
-                }
-            
-            assessed_syllables.append({
-                'index': i,
-                'audio': syllable['audio'],
-                'start_time': syllable['start_time'],
-                'end_time': syllable['end_time'],
-                'features': features,
-                'matched_syllable': best_match,
-                'quality_score': assessment['quality_score'],
-                'needs_correction': assessment['needs_correction'],
-                'message': assessment['message']
-            })
-        
-        return assessed_syllables
+            valid_syllables.append((i, syllable))
+        
+        if not valid_syllables:
+            return []
+        
+        # Score every syllable against every reference in one batch
+        matches = self.model.match_features(np.vstack([s['features'] for _, s in valid_syllables]))
+        
+        return [self._assessed_syllable(i, syllable, match) for (i, syllable), match in zip(valid_syllables, matches)]
+    
+    def _assessed_syllable(self, i, syllable, match):
+        """Assessment entry of one syllable from its match_features result"""
+        best_match = match['best_match']
+        
+        # Assess pronunciation quality
+        if best_match:
+            assessment = self.model.assessment_from_score(match['quality_score'])
+        else:
+            assessment = {
+                'quality_score': 0.0,
+                'needs_correction': True,
+                'message': 'No reference syllable found'
+            }
+        
+        return {
+            'index': syllable.get('index', i),
+            'audio': syllable['audio'],
+            'start_time': syllable['start_time'],
+            'end_time': syllable['end_time'],
+            'features': syllable['features'],
+            'matched_syllable': best_match,
+            'quality_score': assessment['quality_score'],
+            'needs_correction': assessment['needs_correction'],
+            'message': assessment['message'],
+            'top_matches': match['matches'],
+            'top_scores': match['scores'],
+            'match_margin': match['margin']
+        }
     
     def get_replacement_audio(self, syllable_name):
         """
@@ -89,24 +199,28 @@ class AudioCorrector:
         if ref_data is None:
             return None
         
-        # Load the reference audio file
-        audio, _ = librosa.load(ref_data['filepath'], sr=self.sample_rate)
-        return audio
+        # Zero-copy slice of the packed bank if it holds this take
+        audio = self.reference_bank.get(syllable_name, ref_data['filepath'])
+        if audio is not None:
+            return audio
+        
+        # Otherwise decoded once, then served from the cache
+        return self.reference_cache.get(ref_data['filepath'], syllable=syllable_name)
     
-    def replace_syllable(self, original_audio, syllable_info, replacement_audio):
+    def fit_replacement(self, syllable_info, replacement_audio):
         """
-        Replace a syllable in the original audio with replacement audio
+        Time-stretch and trim/pad replacement audio to the syllable's slot
+        Returns (start_sample, end_sample, fitted audio)
         """
-        start_sample = int(syllable_info['start_time'] * self.sample_rate)
-        end_sample = int(syllable_info['end_time'] * self.sample_rate)
+        start_sample = int(round(syllable_info['start_time'] * self.sample_rate))
+        end_sample = int(round(syllable_info['end_time'] * self.sample_rate))
         
         # Time-stretch replacement audio to match original duration
         original_duration = syllable_info['end_time'] - syllable_info['start_time']
         replacement_duration = len(replacement_audio) / self.sample_rate
         stretch_factor = replacement_duration / original_duration
         
-        if stretch_factor != 1.0:
-            replacement_audio = librosa.effects.time_stretch(replacement_audio, rate=stretch_factor)
+        replacement_audio = time_stretch(replacement_audio, stretch_factor, backend=self.stretch_backend)
         
         # Ensure replacement audio matches the segment length
         segment_length = end_sample - start_sample
@@ -116,62 +230,123 @@ class AudioCorrector:
             # Pad with zeros
             replacement_audio = np.pad(replacement_audio, (0, segment_length - len(replacement_audio)))
         
-        # Create new audio with replacement
-        corrected_audio = original_audio.copy()
-        corrected_audio[start_sample:end_sample] = replacement_audio
+        return start_sample, end_sample, replacement_audio
+    
+    def crossfade_edges(self, segment, original, crossfade_ms=CROSSFADE_MS):
+        """
+        Equal-power crossfade from original into segment at its start and back at its end
+        segment is modified in place; original is the audio it overwrites
+        """
+        fade_length = min(int(crossfade_ms * self.sample_rate / 1000), len(segment) // 2)
+        if fade_length <= 0:
+            return segment
+        
+        phase = (np.arange(fade_length) + 0.5) / fade_length * (np.pi / 2)
+        fade_in = np.sin(phase)
+        fade_out = np.cos(phase)
+        segment[:fade_length] = original[:fade_length] * fade_out + segment[:fade_length] * fade_in
+        segment[-fade_length:] = segment[-fade_length:] * fade_out + original[-fade_length:] * fade_in
+        return segment
+    
+    def render_corrections(self, audio, corrections, crossfade_ms=CROSSFADE_MS):
+        """
+        Splice all replacements into a single copy of the audio
+        corrections is a list of (syllable_info, replacement_audio); each replacement
+        is stretched to its slot and crossfaded into it in the same pass
+        Returns corrected audio
+        """
+        corrected_audio = audio.copy()
+        
+        for syllable_info, replacement_audio in corrections:
+            start_sample, end_sample, replacement_audio = self.fit_replacement(syllable_info, replacement_audio)
+            slot = corrected_audio[start_sample:end_sample]
+            slot[:] = replacement_audio
+            self.crossfade_edges(slot, audio[start_sample:end_sample], crossfade_ms)
         
         return corrected_audio
     
+    def replace_syllable(self, original_audio, syllable_info, replacement_audio):
+        """
+        Replace a syllable in the original audio with replacement audio
+        """
+        return self.render_corrections(original_audio, [(syllable_info, replacement_audio)])
+    
     def correct_audio(self, audio, min_quality_threshold=None):
         """
         Correct all mispronounced syllables in the audio
+        Syllables are featurized and scored in one batch (analyze_and_assess);
+        the model's SIMILARITY_THRESHOLD decides which need correcting
+        (min_quality_threshold is accepted but not used, as before)
         Returns corrected audio and correction report
         """
-        if min_quality_threshold is None:
-            from config import SIMILARITY_THRESHOLD
-            min_quality_threshold = SIMILARITY_THRESHOLD
-        
-        # Analyze and assess all syllables
-        assessed_syllables = self.analyze_and_assess(audio)
-        
-        # Identify syllables that need correction
-        syllables_to_correct = [
-            s for s in assessed_syllables 
-            if s['needs_correction'] and s['matched_syllable']
-        ]
-        
-        corrected_audio = audio.copy()
+        for kind, result in self._corrections(audio, self.analyze_and_assess(audio)):
+            if kind == 'done':
+                return result
+    
+    def iter_correct_audio(self, audio, token=None):
+        """
+        correct_audio, reporting progress as it goes (syllables are scored
+        one at a time so the first results arrive early)
+        Yields ('syllable', assessed syllable) as each syllable is scored,
+        ('correction', correction) right after it for syllables that get
+        replaced, and finally ('done', (corrected audio, report))
+        Stops early, without 'done', once token.cancelled is set
+        """
+        yield from self._corrections(audio, self._iter_assessed(audio, token), token)
+    
+    def _iter_assessed(self, audio, token=None):
+        """Assessed syllables one at a time, until token.cancelled is set"""
+        for i, syllable in enumerate(self.analyzer.iter_analyze_audio(audio)):
+            if token is not None and token.cancelled:
+                return
+            if syllable['features'] is None or len(syllable['features']) == 0:
+                continue
+            yield self._assessed_syllable(i, syllable, self.model.match_features(syllable['features'])[0])
+    
+    def _corrections(self, audio, assessed_syllables, token=None):
+        """
+        Shared by correct_audio and iter_correct_audio: collect a replacement
+        for every syllable that needs one, then render them all and report
+        Yields the same events as iter_correct_audio
+        """
+        assessed_list = []
+        replacements = []
         corrections_made = []
-        
-        # Replace each problematic syllable
-        for syllable in syllables_to_correct:
-            replacement_audio = self.get_replacement_audio(syllable['matched_syllable'])
+        for assessed in assessed_syllables:
+            assessed_list.append(assessed)
+            yield 'syllable', assessed
             
-            if replacement_audio is not None:
-                corrected_audio = self.replace_syllable(
-                    corrected_audio,
-                    syllable,
-                    replacement_audio
-                )
-                
-                corrections_made.append({
-                    'index': syllable['index'],
-                    'syllable': syllable['matched_syllable'],
-                    'original_quality': syllable['quality_score'],
-                    'start_time': syllable['start_time'],
-                    'end_time': syllable['end_time']
-                })
-        
-        # Generate report
-        report = {
+            if assessed['needs_correction'] and assessed['matched_syllable']:
+                replacement_audio = self.get_replacement_audio(assessed['matched_syllable'])
+                if replacement_audio is not None:
+                    replacements.append((assessed, replacement_audio))
+                    correction = self._correction_entry(assessed)
+                    corrections_made.append(correction)
+                    yield 'correction', correction
+        
+        if token is not None and token.cancelled:
+            return
+        # Splice them all in one pass over a single output buffer
+        corrected_audio = self.render_corrections(audio, replacements)
+        yield 'done', (corrected_audio, self._correction_report(assessed_list, corrections_made))
+    
+    def _correction_entry(self, syllable):
+        return {
+            'index': syllable['index'],
+            'syllable': syllable['matched_syllable'],
+            'original_quality': syllable['quality_score'],
+            'start_time': syllable['start_time'],
+            'end_time': syllable['end_time']
+        }
+    
+    def _correction_report(self, assessed_syllables, corrections_made):
+        return {
             'total_syllables': len(assessed_syllables),
             'syllables_corrected': len(corrections_made),
             'corrections': corrections_made,
             'average_quality_before': np.mean([s['quality_score'] for s in assessed_syllables]),
             'syllables_analyzed': assessed_syllables
         }
-        
-        return corrected_audio, report
     
     def save_corrected_audio(self, audio, filename=None):
         """Save corrected audio to file"""
@@ -187,6 +362,9 @@ class AudioCorrector:
     
     def play_audio(self, audio):
         """Play audio using pydub"""
+        from pydub import AudioSegment
+        from pydub.playback import play
+        
         # Convert numpy array to pydub AudioSegment
         audio_int16 = (audio * 32767).astype(np.int16)
         audio_segment = AudioSegment(
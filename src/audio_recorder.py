@@ -1,8 +1,6 @@
 """
 Real-time audio recording module for Hebrew speech
 """
-import sounddevice as sd
-import soundfile as sf
 import numpy as np
 import queue
 import threading
@@ -10,51 +8,212 @@ from datetime import datetime
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import SAMPLE_RATE, CHANNELS, RECORDINGS_DIR
+from config import SAMPLE_RATE, CHANNELS, RECORDINGS_DIR, RECORDER_MODE, RECORDER_BUFFER_SECONDS
+from src.disk_recording import DiskRecordingWriter, open_wav_memmap
+from src.vad import EnergyVAD
+from src.audio_sources import create_audio_source
+from src.lazy_import import lazy_import
+
+sf = lazy_import('soundfile')
+
+
+class AudioRingBuffer:
+    """
+    Preallocated float32 buffer written directly by the audio callback
+    Single writer, no locks: a block is copied in before the frame count
+    that publishes it is advanced. The capacity is fixed when the take
+    starts, so the callback never allocates; once full it wraps and
+    overwrites the oldest audio
+    """
+    
+    def __init__(self, capacity_frames, channels=CHANNELS):
+        self.channels = channels
+        self.data = np.zeros((max(1, int(capacity_frames)), channels), dtype=np.float32)
+        self.frames = 0  # Total frames ever written
+        self.overruns = 0  # Blocks that overwrote audio not yet read back
+    
+    def __len__(self):
+        """Frames currently held"""
+        return min(self.frames, len(self.data))
+    
+    def write(self, block):
+        """Append a (frames, channels) block"""
+        count = len(block)
+        capacity = len(self.data)
+        if count > capacity:
+            block = block[-capacity:]
+            self.frames += count - capacity
+            count = capacity
+        start = self.frames % capacity
+        if self.frames + count > capacity:
+            self.overruns += 1
+        first = min(count, capacity - start)
+        self.data[start:start + first] = block[:first]
+        self.data[:count - first] = block[first:]
+        self.frames += count
+    
+    def view(self):
+        """
+        Held audio, oldest first
+        A view of the buffer until it has wrapped, then a single copy
+        """
+        capacity = len(self.data)
+        if self.frames <= capacity:
+            return self.data[:self.frames]
+        start = self.frames % capacity
+        return np.concatenate([self.data[start:], self.data[:start]])
 
 
 class AudioRecorder:
     """
     Handles real-time audio recording with start/stop functionality
+    
+    mode 'ring' writes each block straight into an AudioRingBuffer from the
+    audio callback; 'queue' hands blocks to a collector thread, which chunk
+    listeners need (ring mode falls back to it while any are attached)
+    
+    start_recording(output_path=...) records to disk instead: blocks are
+    streamed to the file by a background writer and stop_recording returns
+    the finished file memory-mapped
+    
+    start_recording(trim_silence=True) runs the VAD on every captured block;
+    stop_recording then returns only the speech (plus padding), and with
+    auto_stop_ms the on_auto_stop callback fires after that much silence
+    
+    Audio comes from an AudioSource (the microphone unless AUDIO_SOURCE or
+    source= says otherwise)
     """
     
-    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS, mode=RECORDER_MODE, source=None):
         self.sample_rate = sample_rate
         self.channels = channels
+        self.source = source if source is not None else create_audio_source(sample_rate=sample_rate,
+                                                                             channels=channels)
+        self.mode = mode
         self.recording = False
         self.audio_queue = queue.Queue()
         self.recorded_data = []
+        self.chunk_listeners = []
+        self.ring_buffer = None
+        self.disk_writer = None
+        self.output_path = None  # File of the last record-to-disk take
+        self.active_mode = mode
+        self.overruns = 0  # Input overflows reported by the audio device
+        self.vad = EnergyVAD(sample_rate)
+        self.trim_silence = False
+        self.on_auto_stop = None
+        self.auto_stopped = False
+        self.captured_samples = 0
         
         # Ensure recordings directory exists
         os.makedirs(RECORDINGS_DIR, exist_ok=True)
     
+    def add_chunk_listener(self, listener):
+        """
+        Call listener(chunk) with every captured block while recording
+        Listeners run on the collector thread, not the audio callback
+        """
+        if listener not in self.chunk_listeners:
+            self.chunk_listeners.append(listener)
+    
+    def remove_chunk_listener(self, listener):
+        """Stop calling a chunk listener"""
+        if listener in self.chunk_listeners:
+            self.chunk_listeners.remove(listener)
+    
     def _audio_callback(self, indata, frames, time_info, status):
         """Callback function for audio stream"""
         if status:
+            if status.input_overflow:
+                self.overruns += 1
             print(f"Audio status: {status}")
-        if self.recording:
-            self.audio_queue.put(indata.copy())
+        if self.recording and not self.auto_stopped:
+            if self.trim_silence and self.vad.process(indata):
+                # Enough trailing silence: stop keeping audio and tell the owner
+                self.auto_stopped = True
+                if self.on_auto_stop is not None:
+                    self.on_auto_stop()
+            self.captured_samples += len(indata)
+            if self.disk_writer is not None:
+                self.disk_writer.put(indata)
+            elif self.ring_buffer is not None:
+                self.ring_buffer.write(indata)
+            else:
+                self.audio_queue.put(indata.copy())
+    
+    def _prepare_capture(self, output_path=None, trim_silence=False, auto_stop_ms=None, on_auto_stop=None):
+        """Set up the buffers of a new take"""
+        self.recorded_data = []
+        self.overruns = 0
+        self.captured_samples = 0
+        self.auto_stopped = False
+        self.trim_silence = trim_silence and output_path is None
+        self.on_auto_stop = on_auto_stop
+        self.vad.reset(auto_stop_ms if self.trim_silence else None)
+        self.active_mode = self.mode
+        self.disk_writer = None
+        self.output_path = output_path
+        if output_path is not None:
+            self.active_mode = 'disk'
+            self.ring_buffer = None
+            self.disk_writer = DiskRecordingWriter(output_path, self.sample_rate, self.channels,
+                                                   listeners=self.chunk_listeners)
+            return
+        if self.mode == 'ring' and self.chunk_listeners:
+            print("DEBUG: Chunk listeners attached, recording through the collector thread")
+            self.active_mode = 'queue'
+        
+        if self.active_mode == 'ring':
+            # A fresh buffer per take (the previous take may still be in use as a
+            # view), allocated here so the callback only ever copies into it
+            self.ring_buffer = AudioRingBuffer(int(RECORDER_BUFFER_SECONDS * self.sample_rate), self.channels)
+        else:
+            self.ring_buffer = None
+    
+    def get_overruns(self):
+        """Device input overflows plus blocks the ring buffer overwrote or the disk writer dropped"""
+        overruns = self.overruns
+        if self.ring_buffer is not None:
+            overruns += self.ring_buffer.overruns
+        if self.disk_writer is not None:
+            overruns += self.disk_writer.dropped_blocks
+        return overruns
     
-    def start_recording(self):
-        """Start recording audio"""
+    def new_recording_path(self, extension='wav'):
+        """Timestamped file path in the recordings directory"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(RECORDINGS_DIR, f"recording_{timestamp}.{extension}")
+    
+    def calibrate_vad(self, duration=0.5):
+        """Record a moment of background noise to set the VAD thresholds"""
+        blocks = []
+        self.source.start(lambda indata, frames, time_info, status: blocks.append(indata.copy()))
+        self.source.wait(duration)
+        self.source.stop()
+        if blocks:
+            self.vad.calibrate(np.concatenate(blocks)[:int(duration * self.sample_rate)])
+    
+    def start_recording(self, output_path=None, trim_silence=False, auto_stop_ms=None, on_auto_stop=None):
+        """
+        Start recording audio
+        With output_path (.wav or .flac) the take is streamed to that file
+        trim_silence/auto_stop_ms/on_auto_stop apply to in-memory takes
+        (on_auto_stop is called from the audio thread)
+        """
         if self.recording:
             print("Already recording!")
             return
         
+        self._prepare_capture(output_path, trim_silence, auto_stop_ms, on_auto_stop)
         self.recording = True
-        self.recorded_data = []
         
         # Start audio stream
-        self.stream = sd.InputStream(
-            samplerate=self.sample_rate,
-            channels=self.channels,
-            callback=self._audio_callback
-        )
-        self.stream.start()
+        self.source.start(self._audio_callback)
         
-        # Start thread to collect audio data
-        self.record_thread = threading.Thread(target=self._collect_audio)
-        self.record_thread.start()
+        if self.active_mode == 'queue':
+            # Start thread to collect audio data
+            self.record_thread = threading.Thread(target=self._collect_audio)
+            self.record_thread.start()
         
         print("Recording started...")
     
@@ -66,9 +225,18 @@ class AudioRecorder:
                 self.recorded_data.append(data)
             except queue.Empty:
                 continue
+            
+            for listener in list(self.chunk_listeners):
+                try:
+                    listener(data)
+                except Exception as e:
+                    print(f"Chunk listener error: {e}")
     
     def stop_recording(self):
-        """Stop recording and return the recorded audio"""
+        """
+        Stop recording and return the recorded audio
+        Returned as 1-D mono samples, which the analyzer and VAD expect
+        """
         if not self.recording:
             print("Not currently recording!")
             return None
@@ -81,18 +249,33 @@ class AudioRecorder:
             if self.record_thread.is_alive():
                 print("Warning: Recording thread did not finish in time")
         
-        # Stop and close stream
-        if hasattr(self, 'stream'):
-            try:
-                self.stream.stop()
-                self.stream.close()
-            except Exception as e:
-                print(f"Error closing stream: {e}")
+        # Stop the source (no callbacks run after this)
+        try:
+            self.source.stop()
+        except Exception as e:
+            print(f"Error closing stream: {e}")
+        
+        if self.disk_writer is not None:
+            self.disk_writer.close()
+            print(f"Recording stopped. Saved to {self.output_path} ({self.get_overruns()} overruns).")
+            mapped = open_wav_memmap(self.output_path)
+            if mapped is not None:
+                return self._mono(mapped[0])
+            audio_data, _ = sf.read(self.output_path, dtype='float32', always_2d=True)
+            return self._mono(audio_data)
+        
+        if self.ring_buffer is not None:
+            audio_data = self._trim(self._mono(self.ring_buffer.view()))
+            if len(audio_data) == 0:
+                print("No audio data recorded.")
+                return None
+            print(f"Recording stopped. Captured {len(audio_data)} samples ({self.get_overruns()} overruns).")
+            return audio_data
         
         # Combine all recorded chunks
         if self.recorded_data:
             try:
-                audio_data = np.concatenate(self.recorded_data, axis=0)
+                audio_data = self._trim(self._mono(np.concatenate(self.recorded_data, axis=0)))
                 print(f"Recording stopped. Captured {len(audio_data)} samples.")
                 return audio_data
             except Exception as e:
@@ -102,6 +285,32 @@ class AudioRecorder:
             print("No audio data recorded.")
             return None
     
+    def _mono(self, audio_data):
+        """(frames, channels) audio as 1-D samples (a view when there is one channel)"""
+        if audio_data.ndim == 1:
+            return audio_data
+        if audio_data.shape[1] == 1:
+            return audio_data[:, 0]
+        return audio_data.mean(axis=1).astype(np.float32)
+    
+    def _trim(self, audio_data):
+        """
+        Cut a finished take down to the speech the VAD found (a slice, no copy)
+        The take is kept whole if no speech was detected
+        """
+        if not self.trim_silence:
+            return audio_data
+        bounds = self.vad.speech_bounds(self.captured_samples)
+        if bounds is None:
+            print("DEBUG: No speech detected, keeping the whole take")
+            return audio_data
+        
+        # audio_data holds the last len(audio_data) captured samples
+        offset = self.captured_samples - len(audio_data)
+        start, end = max(0, bounds[0] - offset), max(0, bounds[1] - offset)
+        print(f"DEBUG: Trimmed {len(audio_data) - (end - start)} samples of silence")
+        return audio_data[start:end]
+    
     def save_recording(self, audio_data, filename=None):
         """Save recorded audio to file"""
         if audio_data is None or len(audio_data) == 0:
@@ -109,10 +318,9 @@ class AudioRecorder:
             return None
         
         if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"recording_{timestamp}.wav"
-        
-        filepath = os.path.join(RECORDINGS_DIR, filename)
+            filepath = self.new_recording_path()
+        else:
+            filepath = os.path.join(RECORDINGS_DIR, filename)
         sf.write(filepath, audio_data, self.sample_rate)
         print(f"Audio saved to: {filepath}")
         return filepath
@@ -0,0 +1,259 @@
+"""
+Audio input sources
+Everything that consumes live audio takes an AudioSource: the microphone,
+a WAV file replayed in real time or as fast as possible, or a generator of
+synthetic Hebrew-like syllables for headless load testing
+"""
+import numpy as np
+import threading
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (SAMPLE_RATE, CHANNELS, CHUNK_SIZE, AUDIO_SOURCE, SYNTHETIC_SYLLABLE_RATE,
+                    SYNTHETIC_NOISE_LEVEL)
+
+# Rough first and second formants (Hz) of the five Hebrew vowels
+VOWEL_FORMANTS = {
+    'a': (750, 1250),
+    'e': (500, 1850),
+    'i': (300, 2250),
+    'o': (500, 900),
+    'u': (330, 800)
+}
+CONSONANT_KINDS = ('plosive', 'fricative', 'nasal')
+
+
+class AudioSource:
+    """
+    Delivers audio blocks to callback(indata, frames, time_info, status),
+    the sounddevice InputStream callback signature, from a background thread
+    
+    Subclasses provide read_block(); realtime paces delivery like a live
+    input, otherwise blocks arrive as fast as the consumer takes them.
+    stop() returns only after the last callback has finished
+    """
+    
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS, block_size=CHUNK_SIZE, realtime=True):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.realtime = realtime
+        self.callback = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.finished = threading.Event()
+    
+    def read_block(self, frames):
+        """Next (frames, channels) float32 block, shorter at the end, or None when exhausted"""
+        return None
+    
+    def rewind(self):
+        """Go back to the start"""
+    
+    def start(self, callback):
+        """Start (or resume) delivering blocks to callback"""
+        self.stop()
+        self.callback = callback
+        self.stop_event.clear()
+        self.finished.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def _run(self):
+        started = time.perf_counter()
+        delivered = 0
+        while not self.stop_event.is_set():
+            block = self.read_block(self.block_size)
+            if block is None or len(block) == 0:
+                break
+            if self.realtime:
+                # A block is available once all of its samples have "arrived"
+                due = started + (delivered + len(block)) / self.sample_rate
+                if self.stop_event.wait(max(0.0, due - time.perf_counter())):
+                    break
+            try:
+                self.callback(block, len(block), None, None)
+            except Exception as e:
+                print(f"Audio source callback error: {e}")
+            delivered += len(block)
+        self.finished.set()
+    
+    def stop(self):
+        """Stop delivering blocks"""
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+    
+    def close(self):
+        """Release the source"""
+        self.stop()
+    
+    def wait(self, timeout=None):
+        """Wait until a finite source has delivered everything; returns True if it has"""
+        return self.finished.wait(timeout)
+    
+    def is_active(self):
+        return self.thread is not None and not self.finished.is_set()
+
+
+class MicrophoneSource(AudioSource):
+    """The default input device through sounddevice"""
+    
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS, block_size=0):
+        super().__init__(sample_rate, channels, block_size, realtime=True)
+        self.stream = None
+    
+    def start(self, callback):
+        import sounddevice as sd
+        
+        self.stop()
+        self.callback = callback
+        self.stop_event.clear()
+        self.stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            blocksize=self.block_size,
+            callback=callback
+        )
+        self.stream.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.stream is not None:
+            try:
+                self.stream.stop()
+                self.stream.close()
+            except Exception as e:
+                print(f"Error closing stream: {e}")
+            self.stream = None
+    
+    def wait(self, timeout=None):
+        # A microphone never runs out: just let timeout seconds of input arrive
+        self.stop_event.wait(timeout)
+        return False
+    
+    def is_active(self):
+        return self.stream is not None
+
+
+class WavFileSource(AudioSource):
+    """Replays an audio file, in real time or as fast as possible"""
+    
+    def __init__(self, path, sample_rate=SAMPLE_RATE, channels=CHANNELS, block_size=CHUNK_SIZE,
+                 realtime=True, loop=False):
+        import librosa
+        
+        super().__init__(sample_rate, channels, block_size, realtime)
+        self.path = path
+        self.loop = loop
+        audio, _ = librosa.load(path, sr=sample_rate)
+        self.audio = np.repeat(audio.astype(np.float32)[:, None], channels, axis=1)
+        self.position = 0
+    
+    def rewind(self):
+        self.position = 0
+    
+    def start(self, callback):
+        """Replay the file from the beginning"""
+        self.rewind()
+        super().start(callback)
+    
+    def read_block(self, frames):
+        if self.position >= len(self.audio):
+            if not self.loop or len(self.audio) == 0:
+                return None
+            self.position = 0
+        block = self.audio[self.position:self.position + frames]
+        self.position += len(block)
+        return block
+
+
+class SyntheticSyllableSource(AudioSource):
+    """
+    Endless (or duration-limited) stream of consonant-vowel bursts
+    Consonants are plosive bursts, fricative noise or nasal murmurs; vowels
+    are harmonic tones shaped by the formants of a Hebrew vowel. Syllable
+    onsets, offsets and vowels are logged in self.syllables as ground truth
+    """
+    
+    def __init__(self, syllables_per_second=SYNTHETIC_SYLLABLE_RATE, noise_level=SYNTHETIC_NOISE_LEVEL,
+                 duration=None, seed=0, sample_rate=SAMPLE_RATE, channels=CHANNELS, block_size=CHUNK_SIZE,
+                 realtime=True):
+        super().__init__(sample_rate, channels, block_size, realtime)
+        self.syllables_per_second = syllables_per_second
+        self.noise_level = noise_level
+        self.duration = duration
+        self.seed = seed
+        self.rewind()
+    
+    def rewind(self):
+        self.rng = np.random.default_rng(self.seed)
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.generated = 0  # Samples generated so far (including the buffer)
+        self.delivered = 0
+        self.syllables = []  # (start_sample, end_sample, vowel)
+    
+    def _consonant(self):
+        kind = CONSONANT_KINDS[self.rng.integers(len(CONSONANT_KINDS))]
+        if kind == 'plosive':
+            closure = np.zeros(int(self.rng.uniform(0.02, 0.04) * self.sample_rate))
+            burst = self.rng.standard_normal(int(0.012 * self.sample_rate)) * 0.15
+            return np.concatenate([closure, burst * np.linspace(1, 0, len(burst))])
+        if kind == 'fricative':
+            length = int(self.rng.uniform(0.04, 0.09) * self.sample_rate)
+            hiss = np.diff(self.rng.standard_normal(length + 1))  # Tilted towards high frequencies
+            return hiss * 0.04 * np.sin(np.pi * np.arange(length) / length)
+        length = int(self.rng.uniform(0.04, 0.06) * self.sample_rate)
+        t = np.arange(length) / self.sample_rate
+        return 0.1 * np.sin(2 * np.pi * 250 * t) * np.sin(np.pi * np.arange(length) / length)
+    
+    def _vowel(self, vowel):
+        length = int(self.rng.uniform(0.1, 0.2) * self.sample_rate)
+        t = np.arange(length) / self.sample_rate
+        f0 = self.rng.uniform(100, 220) * (1 - 0.1 * t / t[-1])  # Slight pitch declination
+        phase = 2 * np.pi * np.cumsum(f0) / self.sample_rate
+        harmonics = np.arange(1, int(4000 / f0.max()) + 1)
+        weights = sum(1 / (1 + ((harmonics * f0.mean() - formant) / 120) ** 2) for formant in VOWEL_FORMANTS[vowel])
+        voiced = np.sin(np.outer(phase, harmonics)) @ weights
+        envelope = np.minimum(1, np.minimum(t, t[-1] - t) / 0.02)
+        return 0.4 * voiced / np.abs(voiced).max() * envelope
+    
+    def _generate_syllable(self):
+        vowel = list(VOWEL_FORMANTS)[self.rng.integers(len(VOWEL_FORMANTS))]
+        syllable = np.concatenate([self._consonant(), self._vowel(vowel)])
+        period = int(self.sample_rate / self.syllables_per_second * self.rng.uniform(0.8, 1.2))
+        gap = np.zeros(max(int(0.02 * self.sample_rate), period - len(syllable)))
+        
+        start = self.generated
+        self.syllables.append((start, start + len(syllable), vowel))
+        audio = np.concatenate([syllable, gap])
+        audio += self.noise_level * self.rng.standard_normal(len(audio))
+        self.buffer = np.concatenate([self.buffer, audio.astype(np.float32)])
+        self.generated += len(audio)
+    
+    def read_block(self, frames):
+        limit = int(self.duration * self.sample_rate) if self.duration is not None else None
+        if limit is not None:
+            frames = min(frames, limit - self.delivered)
+            if frames <= 0:
+                return None
+        while len(self.buffer) < frames:
+            self._generate_syllable()
+        block = self.buffer[:frames]
+        self.buffer = self.buffer[frames:]
+        self.delivered += frames
+        return np.repeat(block[:, None], self.channels, axis=1)
+
+
+def create_audio_source(spec=AUDIO_SOURCE, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """
+    Source from a short description: 'microphone', 'synthetic', or the
+    path of an audio file to replay in real time
+    """
+    if spec in (None, '', 'microphone'):
+        return MicrophoneSource(sample_rate, channels)
+    if spec == 'synthetic':
+        return SyntheticSyllableSource(sample_rate=sample_rate, channels=channels)
+    return WavFileSource(spec, sample_rate, channels)
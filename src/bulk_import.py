@@ -0,0 +1,228 @@
+"""
+Bulk import of already-labelled syllable recordings
+Walks a directory tree laid out like data/syllables (one folder per
+syllable), decodes and featurizes the clips in a process pool and stores
+them in the training system a batch at a time. A state log (one JSON line
+per finished clip, appended per batch) records which clips are done, so an
+interrupted import resumes where it stopped
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import BULK_IMPORT_BATCH_SIZE, PROGRESS_BACKEND, DEFAULT_SPEAKER
+from src.syllable_analyzer import SyllableAnalyzer
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg')
+STATE_FILE = 'bulk_import_state.jsonl'
+
+_worker_analyzer = None
+
+
+def _init_worker(sample_rate):
+    global _worker_analyzer
+    _worker_analyzer = SyllableAnalyzer(sample_rate=sample_rate)
+
+
+def _featurize(filepath):
+    """
+    Decode and featurize one clip (runs in a worker process)
+    Returns (filepath, features or None, error message or None)
+    """
+    try:
+        audio, _ = _worker_analyzer.load_audio(filepath)
+        if len(audio) == 0:
+            return filepath, None, "empty audio"
+        return filepath, _worker_analyzer.extract_features(audio), None
+    except Exception as e:
+        return filepath, None, str(e) or type(e).__name__
+
+
+def find_recordings(root, syllable_list):
+    """
+    (syllable, filepath) for every audio file under root, in a stable order
+    The first folder below root names the syllable ('/' may be written as '_')
+    """
+    names = {syllable.replace('/', '_'): syllable for syllable in syllable_list}
+    found = []
+    unknown = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        relative = os.path.relpath(dirpath, root)
+        if relative == '.':
+            continue
+        folder = relative.split(os.sep)[0]
+        syllable = names.get(folder)
+        if syllable is None:
+            unknown.add(folder)
+            continue
+        for filename in sorted(filenames):
+            if filename.lower().endswith(AUDIO_EXTENSIONS):
+                found.append((syllable, os.path.join(dirpath, filename)))
+    
+    if unknown:
+        print(f"DEBUG: Skipping {len(unknown)} folders that are not syllables: {sorted(unknown)[:5]}")
+    return found
+
+
+def load_state(state_path, root):
+    """
+    Resume state of an import of root, rebuilt from the state log
+    Returns {'root', 'done': set of sources, 'failed': {source: error}},
+    or None if there is no log for root (missing, or for another root)
+    """
+    if not os.path.exists(state_path):
+        return None
+    state = {'root': root, 'done': set(), 'failed': {}}
+    try:
+        with open(state_path, 'rb') as f:
+            log = f.read()
+        valid_length = 0
+        for number, line in enumerate(log.splitlines(keepends=True)):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("unterminated line")
+                record = json.loads(line.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError):
+                break  # Torn write from a crash: that batch is imported again
+            if number == 0:
+                if record.get('root') != root:
+                    return None
+            elif 'error' in record:
+                state['failed'][record['source']] = record['error']
+            else:
+                state['done'].add(record['source'])
+            valid_length += len(line)
+        
+        if valid_length == 0:
+            return None
+        if valid_length < len(log):
+            # Later appends must start on a fresh line
+            with open(state_path, 'r+b') as f:
+                f.truncate(valid_length)
+    except Exception as e:
+        print(f"Error reading import state {state_path}: {e}")
+        return None
+    return state
+
+
+def start_state(state_path, root):
+    """Start a new state log for an import of root (replacing any earlier one)"""
+    with open(state_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'root': root}, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    return {'root': root, 'done': set(), 'failed': {}}
+
+
+def append_state(state_path, records):
+    """Append finished-clip records to the state log with one sync"""
+    lines = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+    with open(state_path, 'a', encoding='utf-8') as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def bulk_import(training_system, root, workers=None, batch_size=BULK_IMPORT_BATCH_SIZE, copy_files=True,
+                label='correct', state_path=None, restart=False, progress_callback=None):
+    """
+    Import every clip under root into training_system
+    Each batch is featurized in parallel, stored in one transaction and then
+    checkpointed in the state log (next to the training progress by default)
+    progress_callback(done, total) is called after every batch
+    Returns counts: found, imported, skipped (done in an earlier run), failed
+    """
+    root = os.path.abspath(root)
+    if state_path is None:
+        state_path = os.path.join(os.path.dirname(training_system.progress_file), STATE_FILE)
+    state = None if restart else load_state(state_path, root)
+    if state is None:
+        state = start_state(state_path, root)
+    
+    found = find_recordings(root, training_system.syllable_list)
+    pending = [(syllable, filepath) for syllable, filepath in found
+               if filepath not in state['done'] and filepath not in state['failed']]
+    total = len(found)
+    done = total - len(pending)
+    if progress_callback:
+        progress_callback(done, total)
+    
+    imported = 0
+    failed = 0
+    if pending:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(training_system.analyzer.sample_rate,)) as pool:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                chunksize = max(1, len(batch) // (workers * 4))
+                results = pool.map(_featurize, [filepath for _, filepath in batch], chunksize=chunksize)
+                
+                takes = []
+                records = []
+                for (syllable, source), (_, features, error) in zip(batch, results):
+                    if error is not None:
+                        print(f"Error importing {source}: {error}")
+                        state['failed'][source] = error
+                        records.append({'source': source, 'error': error})
+                        failed += 1
+                        continue
+                    timestamp = datetime.fromtimestamp(os.path.getmtime(source)).strftime("%Y%m%d_%H%M%S")
+                    filepath = training_system.store_recording_file(source) if copy_files else source
+                    takes.append((syllable, {'filepath': filepath, 'timestamp': timestamp, 'label': label}, features))
+                    state['done'].add(source)
+                    records.append({'source': source})
+                
+                imported += training_system.add_recordings(takes)
+                append_state(state_path, records)
+                
+                done += len(batch)
+                if progress_callback:
+                    progress_callback(done, total)
+    
+    return {
+        'found': total,
+        'imported': imported,
+        'skipped': total - len(pending),
+        'failed': failed
+    }
+
+
+def main():
+    """Command-line entry point: import a folder of labelled syllable recordings"""
+    from src.training_system import SyllableTrainingSystem
+    
+    parser = argparse.ArgumentParser(description="Import labelled syllable recordings (one folder per syllable)")
+    parser.add_argument('root', help="Folder with one sub-folder of recordings per syllable")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=BULK_IMPORT_BATCH_SIZE,
+                        help="Recordings stored per transaction")
+    parser.add_argument('--label', default='correct', help="Label given to imported takes")
+    parser.add_argument('--no-copy', action='store_true',
+                        help="Reference the files where they are instead of copying them into the recording store")
+    parser.add_argument('--restart', action='store_true', help="Ignore the state of an earlier, interrupted import")
+    parser.add_argument('--backend', default=PROGRESS_BACKEND, choices=['json', 'sqlite'])
+    parser.add_argument('--speaker', default=DEFAULT_SPEAKER)
+    args = parser.parse_args()
+    
+    def report_progress(done, total):
+        print(f"\rImported {done}/{total} recordings", end='', flush=True)
+    
+    training_system = SyllableTrainingSystem(backend=args.backend, speaker=args.speaker)
+    counts = bulk_import(
+        training_system, args.root, workers=args.workers, batch_size=args.batch_size,
+        copy_files=not args.no_copy, label=args.label, restart=args.restart,
+        progress_callback=report_progress
+    )
+    print()
+    print("Bulk import report:")
+    for key, value in counts.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
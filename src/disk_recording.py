@@ -0,0 +1,188 @@
+"""
+Streaming long recordings to disk
+The audio callback hands blocks to a bounded queue; a writer thread
+appends them to a WAV (32-bit float) or FLAC file and refreshes the file
+header every few seconds, so a crash loses at most the last few seconds.
+Finished WAV files can be opened as memory maps instead of being loaded
+"""
+import numpy as np
+import queue
+import struct
+import threading
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CHANNELS, RECORDER_DISK_QUEUE_BLOCKS, RECORDER_FLUSH_SECONDS
+from src.lazy_import import lazy_import
+
+sf = lazy_import('soundfile')
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavStreamWriter:
+    """
+    Appends float32 frames to a WAV file with a plain 44-byte header
+    flush() rewrites the sizes in the header and syncs, leaving a valid
+    file on disk at every flush
+    """
+    
+    def __init__(self, path, sample_rate, channels=CHANNELS):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = 0
+        self.file = open(path, 'wb')
+        self.file.write(self._header())
+    
+    def _header(self):
+        data_bytes = self.frames * self.channels * 4
+        return (b'RIFF' + struct.pack('<I', 36 + data_bytes) + b'WAVE'
+                + b'fmt ' + struct.pack('<IHHIIHH', 16, WAVE_FORMAT_IEEE_FLOAT, self.channels, self.sample_rate,
+                                        self.sample_rate * self.channels * 4, self.channels * 4, 32)
+                + b'data' + struct.pack('<I', data_bytes))
+    
+    def write(self, block):
+        block = np.asarray(block, dtype=np.float32).reshape(-1, self.channels)
+        self.file.write(block.tobytes())
+        self.frames += len(block)
+    
+    def flush(self):
+        """Make everything written so far a complete WAV file on disk"""
+        self.file.flush()
+        position = self.file.tell()
+        self.file.seek(0)
+        self.file.write(self._header())
+        self.file.seek(position)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def open_wav_memmap(path):
+    """
+    Memory-map the samples of an uncompressed WAV file
+    Returns (array of shape (frames, channels), sample_rate), or None if the
+    file is not a WAV this can map (compressed or unusual sample format)
+    """
+    dtypes = {
+        (WAVE_FORMAT_PCM, 16): np.int16,
+        (WAVE_FORMAT_PCM, 32): np.int32,
+        (WAVE_FORMAT_IEEE_FLOAT, 32): np.float32,
+        (WAVE_FORMAT_IEEE_FLOAT, 64): np.float64
+    }
+    try:
+        with open(path, 'rb') as f:
+            if f.read(4) != b'RIFF':
+                return None
+            f.read(4)
+            if f.read(4) != b'WAVE':
+                return None
+            
+            file_size = os.fstat(f.fileno()).st_size
+            fmt = None
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    return None
+                chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+                if chunk_id == b'fmt ':
+                    fmt = f.read(chunk_size)
+                    f.seek(chunk_size % 2, 1)
+                elif chunk_id == b'data':
+                    offset = f.tell()
+                    break
+                else:
+                    f.seek(chunk_size + chunk_size % 2, 1)
+    except OSError as e:
+        print(f"Error reading {path}: {e}")
+        return None
+    
+    if fmt is None:
+        return None
+    format_tag, channels, sample_rate = struct.unpack('<HHI', fmt[:8])
+    bits = struct.unpack('<H', fmt[14:16])[0]
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack('<H', fmt[24:26])[0]  # First two bytes of the subformat GUID
+    dtype = dtypes.get((format_tag, bits))
+    if dtype is None:
+        return None
+    
+    # A file cut short by a crash keeps its last flushed size; trust the bytes present
+    frame_bytes = channels * np.dtype(dtype).itemsize
+    frames = min(chunk_size, file_size - offset) // frame_bytes
+    if frames == 0:
+        return np.zeros((0, channels), dtype=dtype), sample_rate
+    audio = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(frames, channels))
+    return audio, sample_rate
+
+
+class DiskRecordingWriter:
+    """
+    Background writer for the record-to-disk mode
+    put() never blocks the audio callback: when the queue is full the
+    block is dropped and counted. Chunk listeners run on the writer thread
+    """
+    
+    def __init__(self, path, sample_rate, channels=CHANNELS, queue_blocks=RECORDER_DISK_QUEUE_BLOCKS,
+                 flush_seconds=RECORDER_FLUSH_SECONDS, listeners=None):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.listeners = listeners if listeners is not None else []
+        self.dropped_blocks = 0
+        self.queue = queue.Queue(maxsize=queue_blocks)
+        
+        if path.lower().endswith('.wav'):
+            self.file = WavStreamWriter(path, sample_rate, channels)
+        else:
+            self.file = sf.SoundFile(path, 'w', sample_rate, channels)
+        
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def put(self, block):
+        """Queue a block for writing (called from the audio callback)"""
+        try:
+            self.queue.put_nowait(block.copy())
+            return True
+        except queue.Full:
+            self.dropped_blocks += 1
+            return False
+    
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                block = self.queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                block = None
+            if block is False:  # Sentinel from close()
+                break
+            
+            if block is not None:
+                try:
+                    self.file.write(block)
+                except Exception as e:
+                    print(f"Error writing recording: {e}")
+                for listener in list(self.listeners):
+                    try:
+                        listener(block)
+                    except Exception as e:
+                        print(f"Chunk listener error: {e}")
+            
+            if time.monotonic() - last_flush >= self.flush_seconds:
+                self.file.flush()
+                last_flush = time.monotonic()
+        self.file.close()
+    
+    def close(self):
+        """Write out the queued blocks and finish the file"""
+        self.queue.put(False)
+        self.thread.join()
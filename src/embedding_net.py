@@ -0,0 +1,54 @@
+"""
+Torch network and dataset of the pronunciation model
+Kept apart from pronunciation_model so torch is only imported once a
+network is actually created, trained or loaded
+"""
+import torch
+import torch.nn as nn
+from torch.utils.data import Dataset
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import EMBEDDING_DIM
+
+
+class SyllableEmbeddingNet(nn.Module):
+    """
+    Neural network for creating syllable embeddings
+    Maps acoustic features to a lower-dimensional space for comparison
+    """
+    
+    def __init__(self, input_dim=29, embedding_dim=EMBEDDING_DIM):
+        super(SyllableEmbeddingNet, self).__init__()
+        
+        self.network = nn.Sequential(
+            nn.Linear(input_dim, 256),
+            nn.ReLU(),
+            nn.BatchNorm1d(256),
+            nn.Dropout(0.3),
+            
+            nn.Linear(256, 128),
+            nn.ReLU(),
+            nn.BatchNorm1d(128),
+            nn.Dropout(0.3),
+            
+            nn.Linear(128, embedding_dim),
+            nn.Tanh()
+        )
+    
+    def forward(self, x):
+        return self.network(x)
+
+
+class SyllableDataset(Dataset):
+    """Dataset for syllable training"""
+    
+    def __init__(self, features, labels):
+        self.features = torch.FloatTensor(features)
+        self.labels = labels
+    
+    def __len__(self):
+        return len(self.features)
+    
+    def __getitem__(self, idx):
+        return self.features[idx], self.labels[idx]
@@ -0,0 +1,132 @@
+"""
+Incremental statistics of a syllable's feature vectors
+Adding, removing or moving a take is O(1) in the number of takes
+"""
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import FEATURE_RECENCY_DECAY
+
+
+class SyllableFeatureStats:
+    """
+    Count, mean and Welford sum of squared deviations of one syllable's takes,
+    plus an optional exponentially weighted mean favouring recent takes
+    
+    Each take is identified by a key (its file path); the key remembers the
+    take's order so it can be removed again without a rescan
+    """
+    
+    def __init__(self, dim, decay=FEATURE_RECENCY_DECAY):
+        self.dim = dim
+        self.decay = decay
+        self.count = 0
+        self.mean = np.zeros(dim)
+        self.m2 = np.zeros(dim)
+        
+        # Recency weights are decay ** (latest_seq - seq), kept relative to latest_seq
+        self.take_seq = {}
+        self.next_seq = 0
+        self.latest_seq = 0
+        self.weight_sum = 0.0
+        self.weighted_sum = np.zeros(dim)
+        self.weighted_squares = np.zeros(dim)
+    
+    @classmethod
+    def from_takes(cls, takes, dim=None, decay=FEATURE_RECENCY_DECAY):
+        """Build from (key, features) pairs, oldest first"""
+        takes = list(takes)
+        if dim is None:
+            dim = len(takes[0][1]) if takes else 0
+        stats = cls(dim, decay=decay)
+        for key, features in takes:
+            stats.add(features, key)
+        return stats
+    
+    def __len__(self):
+        return self.count
+    
+    def __contains__(self, key):
+        return key in self.take_seq
+    
+    def add(self, features, key):
+        """Add a take"""
+        x = np.asarray(features, dtype=np.float64)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        
+        seq = self.next_seq
+        self.next_seq += 1
+        self.take_seq[key] = seq
+        if self.decay is not None:
+            # Age the existing weights, then add the new take with weight 1
+            aging = self.decay ** (seq - self.latest_seq)
+            self.latest_seq = seq
+            self.weight_sum = self.weight_sum * aging + 1.0
+            self.weighted_sum = self.weighted_sum * aging + x
+            self.weighted_squares = self.weighted_squares * aging + x * x
+    
+    def remove(self, features, key):
+        """Remove a previously added take (features as they were added)"""
+        if key not in self.take_seq:
+            return False
+        x = np.asarray(features, dtype=np.float64)
+        seq = self.take_seq.pop(key)
+        
+        if self.count <= 1:
+            self.count = 0
+            self.mean = np.zeros(self.dim)
+            self.m2 = np.zeros(self.dim)
+            self.weight_sum = 0.0
+            self.weighted_sum = np.zeros(self.dim)
+            self.weighted_squares = np.zeros(self.dim)
+            return True
+        
+        # Welford update run backwards
+        previous_mean = self.mean
+        self.mean = (self.count * previous_mean - x) / (self.count - 1)
+        self.m2 = np.maximum(self.m2 - (x - self.mean) * (x - previous_mean), 0.0)
+        self.count -= 1
+        
+        if self.decay is not None:
+            weight = self.decay ** (self.latest_seq - seq)
+            self.weight_sum -= weight
+            self.weighted_sum -= weight * x
+            self.weighted_squares -= weight * x * x
+        return True
+    
+    def variance(self, ddof=0):
+        """Per-dimension variance of the takes (None with too few takes)"""
+        if self.count - ddof <= 0:
+            return None
+        return self.m2 / (self.count - ddof)
+    
+    def recency_mean(self):
+        """Exponentially weighted mean (the plain mean if recency weighting is off)"""
+        if self.decay is None or self.weight_sum <= 0:
+            return self.mean.copy()
+        return self.weighted_sum / self.weight_sum
+    
+    def recency_variance(self):
+        """Exponentially weighted variance (the plain variance if recency weighting is off)"""
+        if self.decay is None or self.weight_sum <= 0:
+            return self.variance()
+        mean = self.weighted_sum / self.weight_sum
+        return np.maximum(self.weighted_squares / self.weight_sum - mean * mean, 0.0)
+    
+    def reference_vector(self):
+        """Vector stored as the syllable's average feature vector"""
+        return self.recency_mean() if self.decay is not None else self.mean.copy()
+    
+    def summary(self):
+        """Count, mean, variance and recency-weighted mean as plain lists"""
+        variance = self.variance()
+        return {
+            'count': self.count,
+            'mean': self.mean.tolist(),
+            'variance': variance.tolist() if variance is not None else None,
+            'recency_mean': self.recency_mean().tolist()
+        }
@@ -0,0 +1,89 @@
+"""
+Binary storage for feature vectors
+A growable float32 matrix on disk, one row per item, written through the
+file and read through a memory map
+"""
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.syllable_analyzer import FEATURE_DIM
+
+
+class FeatureStore:
+    """
+    float32 rows of fixed width in a flat file
+    Rows are addressed by index; appended rows never move, so indices can be
+    kept in the progress JSON instead of the numbers themselves
+    """
+    
+    def __init__(self, path, dim=FEATURE_DIM):
+        self.path = path
+        self.dim = dim
+        self.row_bytes = dim * np.dtype(np.float32).itemsize
+        self.rows = os.path.getsize(path) // self.row_bytes if os.path.exists(path) else 0
+        self._map = None
+    
+    def __len__(self):
+        return self.rows
+    
+    def _to_bytes(self, features):
+        return np.asarray(features, dtype=np.float32).reshape(-1, self.dim).tobytes()
+    
+    def append(self, features):
+        """Append one row; returns its index"""
+        return self.append_many([features]).start
+    
+    def append_many(self, matrix):
+        """Append rows; returns range of their indices"""
+        data = self._to_bytes(matrix)
+        with open(self.path, 'ab') as f:
+            # A torn earlier append would misalign every later row
+            f.truncate(self.rows * self.row_bytes)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        start = self.rows
+        self.rows += len(data) // self.row_bytes
+        return range(start, self.rows)
+    
+    def write(self, row, features):
+        """Overwrite a row in place (row == len(self) appends); returns the row"""
+        if row >= self.rows:
+            return self.append(features)
+        self.write_many([row], [features])
+        return row
+    
+    def write_many(self, rows, matrix):
+        """Overwrite existing rows in place with one sync"""
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, self.dim)
+        with open(self.path, 'r+b') as f:
+            for row, features in zip(rows, matrix):
+                f.seek(row * self.row_bytes)
+                f.write(features.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def matrix(self):
+        """Read-only memory map of all rows (shape (rows, dim))"""
+        if self.rows == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self._map is None or len(self._map) != self.rows:
+            self._map = np.memmap(self.path, dtype=np.float32, mode='r', shape=(self.rows, self.dim))
+        return self._map
+    
+    def read(self, row):
+        """One row (a view of the memory map)"""
+        return self.matrix()[row]
+    
+    def rows_view(self, rows):
+        """
+        Rows in the given order
+        Consecutive indices give a zero-copy slice of the memory map
+        """
+        rows = list(rows)
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if rows == list(range(rows[0], rows[0] + len(rows))):
+            return self.matrix()[rows[0]:rows[0] + len(rows)]
+        return self.matrix()[rows]
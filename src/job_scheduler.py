@@ -0,0 +1,207 @@
+"""
+Background jobs for the GUI
+Work runs on a small thread pool; results come back to the Tk thread
+through one pump that drains them in batches. Jobs of the same kind can
+coalesce: while one runs, only the newest request waits behind it and
+the superseded job is cancelled, so its result is never delivered
+"""
+import queue
+import threading
+import itertools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import JOB_WORKERS, JOB_PUMP_MS, JOB_PUMP_BATCH
+
+
+class CancelToken:
+    """Cooperative cancellation flag handed to long jobs"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+    
+    def cancel(self):
+        self.event.set()
+    
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+
+class Job:
+    """One submitted piece of work"""
+    
+    def __init__(self, job_id, kind, fn, args, on_done, on_error, on_progress, with_token):
+        self.id = job_id
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.with_token = with_token
+        self.token = CancelToken()
+        self.future = None
+    
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+
+class JobScheduler:
+    """
+    Bounded worker pool with per-kind coalescing
+    on_done(result) / on_error(exception) run on the thread calling pump();
+    with a Tk root the pump reschedules itself every pump_ms. With
+    on_progress, fn is also passed progress=callable, and every item it
+    reports reaches on_progress(item) the same way, in order.
+    Cancelled jobs are skipped if not started, told through job.token if
+    running (with_token=True passes it as fn(..., token=token)), and their
+    results are dropped either way
+    """
+    
+    def __init__(self, root=None, max_workers=JOB_WORKERS, pump_ms=JOB_PUMP_MS, batch=JOB_PUMP_BATCH):
+        self.root = root
+        self.pump_ms = pump_ms
+        self.batch = batch
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.completed = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.running = {}  # kind -> coalescing job currently on the pool
+        self.waiting = {}  # kind -> newest job queued behind it
+        self.active = 0  # Jobs submitted whose result has not been pumped yet
+        self.closed = False
+        
+        if root is not None:
+            self.root.after(self.pump_ms, self._pump_loop)
+    
+    def submit(self, kind, fn, *args, on_done=None, on_error=None, on_progress=None, coalesce=True,
+               with_token=False):
+        """
+        Run fn(*args) in the background
+        With coalesce, a job of the same kind still running is cancelled and
+        this one starts after it; an older job still waiting is dropped
+        Returns the Job
+        """
+        job = Job(next(self.ids), kind, fn, args, on_done, on_error, on_progress, with_token)
+        with self.lock:
+            if self.closed:
+                job.token.cancel()
+                return job
+            self.active += 1
+            if coalesce:
+                current = self.running.get(kind)
+                if current is not None:
+                    current.token.cancel()
+                    superseded = self.waiting.pop(kind, None)
+                    if superseded is not None:
+                        superseded.token.cancel()
+                        self.active -= 1
+                    self.waiting[kind] = job
+                    return job
+                self.running[kind] = job
+            self._start(job)
+        return job
+    
+    def _start(self, job):
+        job.future = self.executor.submit(self._run, job)
+    
+    def _run(self, job):
+        result = error = None
+        if not job.cancelled:
+            kwargs = {}
+            if job.with_token:
+                kwargs['token'] = job.token
+            if job.on_progress:
+                kwargs['progress'] = lambda item: self.completed.put((job, item, None, False))
+            try:
+                result = job.fn(*job.args, **kwargs)
+            except Exception as e:
+                error = e
+        self.completed.put((job, result, error, True))
+        
+        with self.lock:
+            if self.running.get(job.kind) is job:
+                del self.running[job.kind]
+                successor = self.waiting.pop(job.kind, None)
+                if successor is not None and not self.closed:
+                    self.running[job.kind] = successor
+                    self._start(successor)
+    
+    def cancel(self, kind):
+        """Cancel the running and waiting jobs of a kind"""
+        with self.lock:
+            for jobs in (self.running, self.waiting):
+                job = jobs.get(kind)
+                if job is not None:
+                    job.token.cancel()
+    
+    def pump(self):
+        """
+        Deliver up to batch finished results and progress items on the
+        calling thread
+        Returns the number of jobs finished
+        """
+        drained = 0
+        finished = 0
+        while drained < self.batch:
+            try:
+                job, result, error, final = self.completed.get_nowait()
+            except queue.Empty:
+                break
+            drained += 1
+            finished += final
+            if job.cancelled:
+                continue
+            
+            try:
+                if not final:
+                    job.on_progress(result)
+                elif error is not None:
+                    if job.on_error:
+                        job.on_error(error)
+                    else:
+                        print(f"Background job '{job.kind}' failed: {error}")
+                elif job.on_done:
+                    job.on_done(result)
+            except Exception as e:
+                print(f"Error handling result of '{job.kind}': {e}")
+        
+        with self.lock:
+            self.active -= finished
+        return finished
+    
+    def _pump_loop(self):
+        if self.closed:
+            return
+        self.pump()
+        self.root.after(self.pump_ms, self._pump_loop)
+    
+    def is_idle(self):
+        """Whether every submitted job has finished and been pumped"""
+        with self.lock:
+            return self.active == 0
+    
+    def is_busy(self, kind):
+        """Whether a job of a coalescing kind is running or waiting"""
+        with self.lock:
+            return kind in self.running or kind in self.waiting
+    
+    def shutdown(self, wait=False):
+        """
+        Stop accepting jobs and cancel the coalescing ones
+        Non-coalesced jobs (saves) still run, even if queued; with wait, this
+        blocks until they have finished and delivers their results here
+        """
+        with self.lock:
+            self.closed = True
+            for job in list(self.running.values()) + list(self.waiting.values()):
+                job.token.cancel()
+            self.waiting.clear()
+        self.executor.shutdown(wait=wait)
+        
+        if wait:
+            while not self.completed.empty():
+                self.pump()
@@ -0,0 +1,32 @@
+"""
+Deferred imports of heavy dependencies
+librosa, torch, scipy and soundfile take seconds to import; modules bind
+them through lazy_import() so that importing src (the syllable database,
+the training store, the CLIs) stays fast and the cost is paid on first use
+"""
+import importlib
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access"""
+    
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+    
+    def _load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+    
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+    
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Module proxy for name; the real import happens when it is first used"""
+    return LazyModule(name)
@@ -0,0 +1,531 @@
+"""
+Crash-safe storage for training progress
+JournalProgressStore: a JSON snapshot plus an append-only journal of
+progress events; saving a take appends one line, and the journal is folded
+into the snapshot every few events
+SQLiteProgressStore: multi-speaker database with indexed queries
+"""
+import numpy as np
+import json
+import sqlite3
+import threading
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import PROGRESS_COMPACT_EVENTS, DEFAULT_SPEAKER
+
+GENERATION_KEY = '_generation'  # Snapshot key holding the compaction count (not a syllable)
+
+
+def atomic_write_json(path, data):
+    """Write JSON to a temp file, fsync it and rename it over path"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    
+    # Make the rename itself durable (not supported on Windows)
+    try:
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+    except OSError:
+        pass
+
+
+def _set_vector(data, event):
+    """Events point at a row of the syllable vector file (older journals carry the vector itself)"""
+    if 'vector_row' in event:
+        data['vector_row'] = event['vector_row']
+    else:
+        data['feature_vector'] = event['feature_vector']
+
+
+def apply_event(progress, event):
+    """
+    Apply one journal event to a progress dict
+    Events are idempotent, so replaying a journal already folded into the
+    snapshot (crash between the two writes) gives the same state
+    """
+    syllable = event['syllable']
+    if event['op'] == 'add_recording':
+        data = progress.setdefault(syllable, {
+            'trained': False,
+            'recordings': [],
+            'quality_score': 0.0,
+            'vector_row': None
+        })
+        if event['recording'] not in data['recordings']:
+            data['recordings'].append(event['recording'])
+        _set_vector(data, event)
+        data['quality_score'] = event['quality_score']
+        data['trained'] = True
+    elif event['op'] == 'remove_recording':
+        data = progress.get(syllable)
+        if data is not None:
+            data['recordings'] = [rec for rec in data['recordings'] if rec['filepath'] != event['filepath']]
+            _set_vector(data, event)
+            data['trained'] = len(data['recordings']) > 0
+            if not data['trained']:
+                data['quality_score'] = 0.0
+    elif event['op'] == 'set_syllable':
+        progress[syllable] = event['data']
+    else:
+        print(f"DEBUG: Unknown progress event '{event['op']}', skipping")
+
+
+class JournalProgressStore:
+    """
+    Snapshot file (same format as the old training_progress.json) plus a
+    journal of events appended since the last compaction
+    seed_path is read instead of the snapshot until the first compaction
+    writes one; it is never written
+    
+    Every compaction starts a new generation. Events are tagged with the
+    generation they were journaled in, and events of an older one (already
+    folded into the snapshot when a crash kept the journal) are skipped.
+    before_compact(progress, generation) runs before the snapshot is written
+    and may rewrite progress for the new generation; after_compact(generation)
+    runs once it is
+    """
+    
+    def __init__(self, snapshot_path, journal_path=None, compact_every=PROGRESS_COMPACT_EVENTS, seed_path=None,
+                 before_compact=None, after_compact=None):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + '.journal'
+        self.seed_path = seed_path
+        self.compact_every = compact_every
+        self.before_compact = before_compact
+        self.after_compact = after_compact
+        self.journal_events = 0
+        self.generation = 0
+    
+    def load(self):
+        """
+        Read the snapshot and replay the journal on top of it
+        Returns progress dict, or None if nothing has been saved yet
+        """
+        progress = None
+        snapshot_path = self.snapshot_path
+        if not os.path.exists(snapshot_path) and self.seed_path is not None:
+            snapshot_path = self.seed_path
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'r', encoding='utf-8') as f:
+                progress = json.load(f)
+        self.generation = progress.pop(GENERATION_KEY, 0) if progress is not None else 0
+        
+        self.journal_events = 0
+        if not os.path.exists(self.journal_path):
+            return progress
+        if progress is None:
+            progress = {}
+        
+        with open(self.journal_path, 'rb') as f:
+            journal = f.read()
+        
+        valid_length = 0
+        for line in journal.splitlines(keepends=True):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("unterminated line")
+                event = json.loads(line.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError):
+                # Torn write from a crash: drop it and everything after
+                print(f"DEBUG: Truncated progress journal at byte {valid_length}")
+                break
+            valid_length += len(line)
+            if event.pop('generation', 0) != self.generation:
+                continue
+            apply_event(progress, event)
+            self.journal_events += 1
+        
+        if valid_length < len(journal):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_length)
+        return progress
+    
+    def append(self, event, progress):
+        """
+        Journal an event already applied to progress
+        Compacts once compact_every events have accumulated
+        """
+        line = json.dumps({**event, 'generation': self.generation}, ensure_ascii=False) + '\n'
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_events += 1
+        
+        if self.journal_events >= self.compact_every:
+            self.compact(progress)
+    
+    def compact(self, progress):
+        """Write progress as the new snapshot (the next generation) and empty the journal"""
+        generation = self.generation + 1
+        if self.before_compact is not None:
+            self.before_compact(progress, generation)
+        atomic_write_json(self.snapshot_path, {**progress, GENERATION_KEY: generation})
+        self.generation = generation
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_events = 0
+        if self.after_compact is not None:
+            self.after_compact(generation)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS speakers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS syllables (
+    id INTEGER PRIMARY KEY,
+    speaker_id INTEGER NOT NULL REFERENCES speakers(id) ON DELETE CASCADE,
+    syllable TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    trained INTEGER NOT NULL DEFAULT 0,
+    quality_score REAL NOT NULL DEFAULT 0.0,
+    feature_vector BLOB,
+    UNIQUE (speaker_id, syllable)
+);
+CREATE INDEX IF NOT EXISTS idx_syllables_trained ON syllables (speaker_id, trained, position);
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    syllable_id INTEGER NOT NULL REFERENCES syllables(id) ON DELETE CASCADE,
+    filepath TEXT NOT NULL,
+    timestamp TEXT,
+    label TEXT,
+    features BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_recordings_syllable ON recordings (syllable_id, id);
+CREATE INDEX IF NOT EXISTS idx_recordings_filepath ON recordings (filepath);
+"""
+
+
+def features_to_blob(features):
+    """float32 bytes of a feature vector (None stays None)"""
+    if features is None:
+        return None
+    return np.asarray(features, dtype=np.float32).tobytes()
+
+
+def blob_to_features(blob):
+    """Feature vector from float32 bytes"""
+    if blob is None:
+        return None
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class SQLiteProgressStore:
+    """
+    Training progress of one speaker in a shared SQLite database (WAL mode)
+    Status, next-syllable and reference lookups are indexed queries instead
+    of scans over the whole progress dict; progress dicts in the JSON format
+    can be imported and exported
+    """
+    
+    def __init__(self, db_path, speaker=DEFAULT_SPEAKER):
+        self.db_path = db_path
+        self.speaker = speaker
+        self.lock = threading.RLock()
+        
+        # Saves run on worker threads; every access goes through the lock
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+        
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO speakers (name) VALUES (?)', (speaker,))
+        self.speaker_id = self.connection.execute(
+            'SELECT id FROM speakers WHERE name = ?', (speaker,)
+        ).fetchone()[0]
+    
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.connection.close()
+    
+    def _syllable_id(self, syllable):
+        row = self.connection.execute(
+            'SELECT id FROM syllables WHERE speaker_id = ? AND syllable = ?', (self.speaker_id, syllable)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def is_empty(self):
+        """Whether no speaker has any syllables yet (a new database)"""
+        with self.lock:
+            return self.connection.execute('SELECT 1 FROM syllables LIMIT 1').fetchone() is None
+    
+    def ensure_syllables(self, syllable_list):
+        """Add any missing syllables, ordered as in syllable_list"""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO syllables (speaker_id, syllable, position) VALUES (?, ?, ?)',
+                [(self.speaker_id, syllable, position) for position, syllable in enumerate(syllable_list)]
+            )
+    
+    def status_counts(self):
+        """Returns (trained count, total count)"""
+        with self.lock:
+            trained = self.connection.execute(
+                'SELECT COUNT(*) FROM syllables WHERE speaker_id = ? AND trained = 1', (self.speaker_id,)
+            ).fetchone()[0]
+            total = self.connection.execute(
+                'SELECT COUNT(*) FROM syllables WHERE speaker_id = ?', (self.speaker_id,)
+            ).fetchone()[0]
+        return trained, total
+    
+    def next_untrained(self):
+        """First untrained syllable in list order, or None"""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT syllable FROM syllables WHERE speaker_id = ? AND trained = 0 '
+                'ORDER BY position LIMIT 1', (self.speaker_id,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def trained_syllables(self):
+        """Trained syllables in list order"""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT syllable FROM syllables WHERE speaker_id = ? AND trained = 1 ORDER BY position',
+                (self.speaker_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def recording_takes(self, syllable):
+        """(filepath, features) of all takes of a syllable, oldest first"""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT r.filepath, r.features FROM recordings r JOIN syllables s ON r.syllable_id = s.id '
+                'WHERE s.speaker_id = ? AND s.syllable = ? ORDER BY r.id', (self.speaker_id, syllable)
+            ).fetchall()
+        return [(filepath, blob_to_features(features)) for filepath, features in rows]
+    
+    def get_take(self, syllable, filepath):
+        """A take as a recording dict, or None"""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT r.filepath, r.timestamp, r.label, r.features FROM recordings r '
+                'JOIN syllables s ON r.syllable_id = s.id '
+                'WHERE s.speaker_id = ? AND s.syllable = ? AND r.filepath = ?', (self.speaker_id, syllable, filepath)
+            ).fetchone()
+        if row is None:
+            return None
+        features = blob_to_features(row[3])
+        return {'filepath': row[0], 'timestamp': row[1], 'label': row[2],
+                'features': features.tolist() if features is not None else None}
+    
+    def add_recording(self, syllable, recording, feature_vector, quality_score):
+        """Store a take and mark its syllable as trained"""
+        self.add_recordings([(syllable, recording, feature_vector, quality_score)])
+    
+    def add_recordings(self, entries):
+        """Store (syllable, recording, feature_vector, quality_score) takes in one transaction"""
+        with self.lock, self.connection:
+            for syllable, recording, feature_vector, quality_score in entries:
+                self._insert_recording(syllable, recording, feature_vector, quality_score)
+    
+    def _insert_recording(self, syllable, recording, feature_vector, quality_score):
+        self.connection.execute(
+            'INSERT OR IGNORE INTO syllables (speaker_id, syllable, position) '
+            'VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM syllables WHERE speaker_id = ?))',
+            (self.speaker_id, syllable, self.speaker_id)
+        )
+        syllable_id = self._syllable_id(syllable)
+        self.connection.execute(
+            'INSERT INTO recordings (syllable_id, filepath, timestamp, label, features) VALUES (?, ?, ?, ?, ?)',
+            (syllable_id, recording['filepath'], recording.get('timestamp'), recording.get('label'),
+             features_to_blob(recording.get('features')))
+        )
+        self.connection.execute(
+            'UPDATE syllables SET trained = 1, quality_score = ?, feature_vector = ? WHERE id = ?',
+            (quality_score, features_to_blob(feature_vector), syllable_id)
+        )
+    
+    def remove_recording(self, syllable, filepath, feature_vector):
+        """Delete a take; the syllable stays trained while it has other takes"""
+        with self.lock, self.connection:
+            syllable_id = self._syllable_id(syllable)
+            if syllable_id is None:
+                return
+            self.connection.execute(
+                'DELETE FROM recordings WHERE syllable_id = ? AND filepath = ?', (syllable_id, filepath)
+            )
+            self.connection.execute(
+                'UPDATE syllables SET feature_vector = ?, '
+                'trained = EXISTS (SELECT 1 FROM recordings WHERE syllable_id = ?), '
+                'quality_score = CASE WHEN EXISTS (SELECT 1 FROM recordings WHERE syllable_id = ?) '
+                'THEN quality_score ELSE 0.0 END WHERE id = ?',
+                (features_to_blob(feature_vector), syllable_id, syllable_id, syllable_id)
+            )
+    
+    def get_reference(self, syllable):
+        """
+        Latest take and average features of a trained syllable
+        Returns dict like SyllableTrainingSystem.get_syllable_reference, or None
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT r.filepath, s.feature_vector, s.quality_score '
+                'FROM syllables s JOIN recordings r ON r.syllable_id = s.id '
+                'WHERE s.speaker_id = ? AND s.syllable = ? AND s.trained = 1 '
+                'ORDER BY r.id DESC LIMIT 1', (self.speaker_id, syllable)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'filepath': row[0],
+            'features': blob_to_features(row[1]).astype(np.float64),
+            'quality_score': row[2]
+        }
+    
+    def recordings(self):
+        """All takes of this speaker as (recording id, syllable, filepath)"""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT r.id, s.syllable, r.filepath FROM recordings r JOIN syllables s ON r.syllable_id = s.id '
+                'WHERE s.speaker_id = ? ORDER BY r.id', (self.speaker_id,)
+            ).fetchall()
+    
+    def update_features(self, updates):
+        """
+        Replace the features of many takes in one transaction
+        updates is a list of (recording id, features); average vectors of the
+        touched syllables are recomputed
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'UPDATE recordings SET features = ? WHERE id = ?',
+                [(features_to_blob(features), recording_id) for recording_id, features in updates]
+            )
+            syllable_ids = {row[0] for row in self.connection.execute(
+                'SELECT DISTINCT syllable_id FROM recordings WHERE id IN (%s)' % ','.join('?' * len(updates)),
+                [recording_id for recording_id, _ in updates]
+            )} if updates else set()
+            for syllable_id in syllable_ids:
+                self._refresh_vector(syllable_id)
+    
+    def _refresh_vector(self, syllable_id):
+        """Set a syllable's vector to the mean of its takes"""
+        features = [blob_to_features(row[0]) for row in self.connection.execute(
+            'SELECT features FROM recordings WHERE syllable_id = ?', (syllable_id,)
+        )]
+        if features:
+            self.connection.execute(
+                'UPDATE syllables SET feature_vector = ? WHERE id = ?',
+                (features_to_blob(np.mean(features, axis=0)), syllable_id)
+            )
+    
+    def relocate_recordings(self, updates):
+        """
+        Point many takes at new file paths in one transaction
+        updates is a list of (recording id, filepath); takes of a syllable
+        that end up on the same file are merged
+        Returns number of merged takes
+        """
+        if not updates:
+            return 0
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'UPDATE recordings SET filepath = ? WHERE id = ?',
+                [(filepath, recording_id) for recording_id, filepath in updates]
+            )
+            duplicates = self.connection.execute(
+                'SELECT r.id, r.syllable_id FROM recordings r JOIN syllables s ON r.syllable_id = s.id '
+                'WHERE s.speaker_id = ? AND r.id NOT IN '
+                '(SELECT MIN(id) FROM recordings GROUP BY syllable_id, filepath)', (self.speaker_id,)
+            ).fetchall()
+            self.connection.executemany('DELETE FROM recordings WHERE id = ?', [(row[0],) for row in duplicates])
+            for syllable_id in {row[1] for row in duplicates}:
+                self._refresh_vector(syllable_id)
+        return len(duplicates)
+    
+    def filepath_in_use(self, filepath):
+        """Whether a take of any speaker uses the file"""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT 1 FROM recordings WHERE filepath = ? LIMIT 1', (filepath,)
+            ).fetchone() is not None
+    
+    def reset_syllable(self, syllable):
+        """Forget all takes of a syllable"""
+        with self.lock, self.connection:
+            syllable_id = self._syllable_id(syllable)
+            if syllable_id is None:
+                return
+            self.connection.execute('DELETE FROM recordings WHERE syllable_id = ?', (syllable_id,))
+            self.connection.execute(
+                'UPDATE syllables SET trained = 0, quality_score = 0.0, feature_vector = NULL WHERE id = ?',
+                (syllable_id,)
+            )
+    
+    def reset_all(self):
+        """Forget all takes of this speaker (other speakers are kept)"""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM recordings WHERE syllable_id IN (SELECT id FROM syllables WHERE speaker_id = ?)',
+                (self.speaker_id,)
+            )
+            self.connection.execute(
+                'UPDATE syllables SET trained = 0, quality_score = 0.0, feature_vector = NULL WHERE speaker_id = ?',
+                (self.speaker_id,)
+            )
+    
+    def trained_feature_vectors(self):
+        """Returns (syllables, float32 matrix of average feature vectors) of trained syllables"""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT syllable, feature_vector FROM syllables '
+                'WHERE speaker_id = ? AND trained = 1 AND feature_vector IS NOT NULL ORDER BY position',
+                (self.speaker_id,)
+            ).fetchall()
+        return [row[0] for row in rows], [blob_to_features(row[1]) for row in rows]
+    
+    def import_progress(self, progress):
+        """Load a JSON-format progress dict for this speaker (replaces its data)"""
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM syllables WHERE speaker_id = ?', (self.speaker_id,))
+            for position, (syllable, data) in enumerate(progress.items()):
+                cursor = self.connection.execute(
+                    'INSERT INTO syllables (speaker_id, syllable, position, trained, quality_score, feature_vector) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (self.speaker_id, syllable, position, int(bool(data['trained'])),
+                     data['quality_score'], features_to_blob(data['feature_vector']))
+                )
+                self.connection.executemany(
+                    'INSERT INTO recordings (syllable_id, filepath, timestamp, label, features) VALUES (?, ?, ?, ?, ?)',
+                    [(cursor.lastrowid, rec['filepath'], rec.get('timestamp'), rec.get('label'),
+                      features_to_blob(rec.get('features'))) for rec in data['recordings']]
+                )
+    
+    def export_progress(self):
+        """This speaker's progress as a JSON-format progress dict"""
+        with self.lock:
+            syllables = self.connection.execute(
+                'SELECT id, syllable, trained, quality_score, feature_vector FROM syllables '
+                'WHERE speaker_id = ? ORDER BY position', (self.speaker_id,)
+            ).fetchall()
+            progress = {}
+            for syllable_id, syllable, trained, quality_score, feature_vector in syllables:
+                recordings = self.connection.execute(
+                    'SELECT filepath, timestamp, label, features FROM recordings WHERE syllable_id = ? ORDER BY id',
+                    (syllable_id,)
+                ).fetchall()
+                progress[syllable] = {
+                    'trained': bool(trained),
+                    'recordings': [
+                        {'filepath': filepath, 'timestamp': timestamp, 'label': label,
+                         'features': blob_to_features(features).tolist() if features is not None else None}
+                        for filepath, timestamp, label, features in recordings
+                    ],
+                    'quality_score': quality_score,
+                    'feature_vector': blob_to_features(feature_vector).tolist() if feature_vector is not None else None
+                }
+        return progress
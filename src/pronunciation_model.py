@@ -3,59 +3,82 @@ Machine Learning model for Hebrew pronunciation assessment
 Uses neural network to compare syllables and assess pronunciation quality
 """
 import numpy as np
-import torch
-import torch.nn as nn
-import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
-from sklearn.metrics.pairwise import cosine_similarity
 import os
 import pickle
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import (MODELS_DIR, EMBEDDING_DIM, SIMILARITY_THRESHOLD,
-                    BATCH_SIZE, LEARNING_RATE, EPOCHS)
+from config import (MODELS_DIR, SIMILARITY_THRESHOLD,
+                    BATCH_SIZE, LEARNING_RATE, EPOCHS, MATCH_TOP_K)
+from src.lazy_import import lazy_import
 
+torch = lazy_import('torch')
 
-class SyllableEmbeddingNet(nn.Module):
+
+def __getattr__(name):
+    # The torch classes live in embedding_net; import them only when asked for
+    if name in ('SyllableEmbeddingNet', 'SyllableDataset'):
+        from src import embedding_net
+        return getattr(embedding_net, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class ReferenceIndex:
     """
-    Neural network for creating syllable embeddings
-    Maps acoustic features to a lower-dimensional space for comparison
+    Contiguous array of L2-normalized reference embeddings, one row per syllable
+    Rows are appended for new syllables and overwritten on re-record
     """
     
-    def __init__(self, input_dim=29, embedding_dim=EMBEDDING_DIM):
-        super(SyllableEmbeddingNet, self).__init__()
-        
-        self.network = nn.Sequential(
-            nn.Linear(input_dim, 256),
-            nn.ReLU(),
-            nn.BatchNorm1d(256),
-            nn.Dropout(0.3),
-            
-            nn.Linear(256, 128),
-            nn.ReLU(),
-            nn.BatchNorm1d(128),
-            nn.Dropout(0.3),
-            
-            nn.Linear(128, embedding_dim),
-            nn.Tanh()
-        )
+    def __init__(self, initial_capacity=128):
+        self.initial_capacity = initial_capacity
+        self.clear()
     
-    def forward(self, x):
-        return self.network(x)
-
-
-class SyllableDataset(Dataset):
-    """Dataset for syllable training"""
-    
-    def __init__(self, features, labels):
-        self.features = torch.FloatTensor(features)
-        self.labels = labels
+    def clear(self):
+        """Drop all rows"""
+        self.names = []
+        self.rows = {}
+        self._embeddings = None
     
     def __len__(self):
-        return len(self.features)
+        return len(self.names)
+    
+    def upsert(self, name, embedding):
+        """Append a row for a new syllable or overwrite an existing one"""
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        embedding = embedding / max(np.linalg.norm(embedding), 1e-12)
+        
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.initial_capacity, embedding.shape[0]), dtype=np.float32)
+        elif self._embeddings.shape[1] != embedding.shape[0]:
+            raise ValueError(f"Embedding of '{name}' has {embedding.shape[0]} dimensions, "
+                             f"the index holds {self._embeddings.shape[1]}")
+        
+        row = self.rows.get(name)
+        if row is None:
+            row = len(self.names)
+            if row == len(self._embeddings):
+                # Grow geometrically so appends stay amortized O(1)
+                grown = np.zeros((2 * row, self._embeddings.shape[1]), dtype=np.float32)
+                grown[:row] = self._embeddings
+                self._embeddings = grown
+            self.names.append(name)
+            self.rows[name] = row
+        self._embeddings[row] = embedding
     
-    def __getitem__(self, idx):
-        return self.features[idx], self.labels[idx]
+    @property
+    def dim(self):
+        """Embedding width, or None while empty"""
+        return None if self._embeddings is None else self._embeddings.shape[1]
+    
+    def get(self, name):
+        """Normalized embedding of a syllable, or None"""
+        row = self.rows.get(name)
+        return None if row is None else self._embeddings[row]
+    
+    def matrix(self):
+        """(R, D) view of all rows, ordered like self.names"""
+        if self._embeddings is None:
+            return None
+        return self._embeddings[:len(self.names)]
 
 
 class PronunciationModel:
@@ -64,26 +87,66 @@ class PronunciationModel:
     """
     
     def __init__(self, model_path=None):
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self._device = None
         self.model = None
         self.syllable_references = {}
         self.scaler = None
         
+        # Stored reference embeddings, valid for the current network and scaler
+        self.reference_index = ReferenceIndex()
+        self._reference_index_valid = True
+        
         os.makedirs(MODELS_DIR, exist_ok=True)
         
         if model_path and os.path.exists(model_path):
             self.load_model(model_path)
     
+    @property
+    def device(self):
+        """Torch device, chosen (and torch imported) on first use"""
+        if self._device is None:
+            self._device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        return self._device
+    
     def create_model(self, input_dim=29):
         """Create a new model"""
+        from src.embedding_net import SyllableEmbeddingNet
+        
         self.model = SyllableEmbeddingNet(input_dim=input_dim).to(self.device)
+        # Inference mode (dropout off, running batch-norm stats); train_model switches back
+        self.model.eval()
+        self.invalidate_reference_index()
         return self.model
     
+    def invalidate_reference_index(self):
+        """Mark stored reference embeddings stale (network or scaler changed)"""
+        self._reference_index_valid = False
+    
+    def _ensure_reference_index(self):
+        """Re-embed all references in one batch if the index is stale"""
+        if self._reference_index_valid:
+            return
+        
+        self.reference_index.clear()
+        names = list(self.syllable_references.keys())
+        if names:
+            features = np.vstack([self.syllable_references[name]['features'] for name in names])
+            embeddings = self._embed(features, normalize=False)
+            for name, embedding in zip(names, embeddings):
+                self.syllable_references[name]['embedding'] = embedding
+                self.reference_index.upsert(name, embedding)
+        self._reference_index_valid = True
+    
     def train_model(self, features, labels, epochs=EPOCHS):
         """
         Train the model on syllable data
         Uses triplet loss to learn good embeddings
         """
+        import torch.nn as nn
+        import torch.optim as optim
+        from torch.utils.data import DataLoader
+        from src.embedding_net import SyllableDataset
+        
         if self.model is None:
             self.create_model(input_dim=features.shape[1])
         
@@ -122,6 +185,9 @@ class PronunciationModel:
                 avg_loss = total_loss / len(dataloader)
                 print(f"Epoch [{epoch+1}/{epochs}], Loss: {avg_loss:.4f}")
         
+        # New weights and scaler: stored reference embeddings are stale
+        self.model.eval()
+        self.invalidate_reference_index()
         print("Training completed!")
     
     def load_training_data(self, data_path):
@@ -131,28 +197,28 @@ class PronunciationModel:
     
     def add_syllable_reference(self, syllable, features):
         """Add or update reference features for a syllable"""
-        if self.scaler:
-            features_normalized = (features - self.scaler['mean']) / (self.scaler['std'] + 1e-8)
-        else:
-            features_normalized = features
-        
-        with torch.no_grad():
-            features_tensor = torch.FloatTensor(features_normalized).unsqueeze(0).to(self.device)
-            if self.model:
-                embedding = self.model(features_tensor).cpu().numpy()[0]
-            else:
-                embedding = features_normalized
+        embedding = self._embed(features, normalize=False)[0]
         
         self.syllable_references[syllable] = {
             'features': features,
             'embedding': embedding
         }
+        
+        # Append a row, or overwrite this syllable's row on re-record; an
+        # embedding of another width (the network changed) rebuilds all rows
+        if self._reference_index_valid:
+            if self.reference_index.dim not in (None, len(embedding)):
+                self.invalidate_reference_index()
+            else:
+                self.reference_index.upsert(syllable, embedding)
     
     def compare_syllables(self, features1, features2):
         """
         Compare two syllables based on their features
         Returns similarity score (0-1, higher is more similar)
         """
+        from sklearn.metrics.pairwise import cosine_similarity
+        
         # Normalize features if scaler exists
         if self.scaler:
             features1 = (features1 - self.scaler['mean']) / (self.scaler['std'] + 1e-8)
@@ -179,17 +245,89 @@ class PronunciationModel:
         similarity = (similarity + 1) / 2
         return similarity
     
-    def assess_pronunciation(self, syllable_features, reference_syllable):
+    def embed_features(self, features):
         """
-        Assess how well a syllable is pronounced compared to reference
-        Returns quality score and whether it needs correction
+        Embed a batch of feature vectors in one forward pass
+        Returns (N, D) float32 matrix of L2-normalized embeddings
         """
-        if reference_syllable not in self.syllable_references:
-            return {'quality_score': 0.0, 'needs_correction': True, 'message': 'No reference found'}
+        return self._embed(features, normalize=True)
+    
+    def _embed(self, features, normalize):
+        """Scale and embed a batch of feature vectors, optionally L2-normalizing"""
+        features = np.atleast_2d(np.asarray(features, dtype=np.float32))
+        if self.scaler:
+            features = (features - self.scaler['mean']) / (self.scaler['std'] + 1e-8)
+        
+        if self.model:
+            with torch.no_grad():
+                features_tensor = torch.as_tensor(features, dtype=torch.float32, device=self.device)
+                embeddings = self.model(features_tensor).cpu().numpy()
+        else:
+            embeddings = features.astype(np.float32)
+        
+        if not normalize:
+            return embeddings
+        
+        # Zero vectors stay zero (cosine similarity 0), as with sklearn
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+    
+    def get_reference_matrix(self):
+        """
+        Stored embeddings of all reference syllables
+        Returns (names, (R, D) matrix of L2-normalized embeddings)
+        """
+        self._ensure_reference_index()
+        return list(self.reference_index.names), self.reference_index.matrix()
+    
+    def score_against_reference(self, features, reference_syllable):
+        """
+        Similarity (0-1) of features to a reference syllable's stored embedding
+        Returns None if the syllable has no reference
+        """
+        self._ensure_reference_index()
+        reference_embedding = self.reference_index.get(reference_syllable)
+        if reference_embedding is None:
+            return None
+        return float((self.embed_features(features)[0] @ reference_embedding + 1) / 2)
+    
+    def match_features(self, features, top_k=MATCH_TOP_K):
+        """
+        Find the closest reference syllables for a batch of feature vectors
+        with a single similarity matmul
+        Returns list of dicts with best match, top-k matches/scores and the
+        margin between the best and second-best score (scores are 0-1)
+        """
+        names, reference_matrix = self.get_reference_matrix()
+        features = np.atleast_2d(features)
+        if reference_matrix is None or len(features) == 0:
+            return [
+                {'best_match': None, 'quality_score': 0.0, 'matches': [], 'scores': [], 'margin': 0.0}
+                for _ in range(len(features))
+            ]
         
-        ref_features = self.syllable_references[reference_syllable]['features']
-        similarity = self.compare_syllables(syllable_features, ref_features)
+        scores = (self.embed_features(features) @ reference_matrix.T + 1) / 2
         
+        top_k = min(top_k, len(names))
+        top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        
+        results = []
+        for row_indices, row_scores in zip(top, top_scores):
+            margin = row_scores[0] - row_scores[1] if len(row_scores) > 1 else row_scores[0]
+            results.append({
+                'best_match': names[row_indices[0]],
+                'quality_score': float(row_scores[0]),
+                'matches': [names[i] for i in row_indices],
+                'scores': row_scores.tolist(),
+                'margin': float(margin)
+            })
+        return results
+    
+    def assessment_from_score(self, similarity):
+        """Turn a 0-1 similarity score into a pronunciation assessment"""
         needs_correction = similarity < SIMILARITY_THRESHOLD
         
         return {
@@ -199,6 +337,23 @@ class PronunciationModel:
             'message': 'Good pronunciation' if not needs_correction else 'Needs improvement'
         }
     
+    def assess_pronunciation(self, syllable_features, reference_syllable):
+        """
+        Assess how well a syllable is pronounced compared to reference
+        Returns quality score and whether it needs correction
+        """
+        similarity = self.score_against_reference(syllable_features, reference_syllable)
+        if similarity is None:
+            return {'quality_score': 0.0, 'needs_correction': True, 'message': 'No reference found'}
+        
+        return self.assessment_from_score(similarity)
+    
+    def warm_up(self, input_dim=29):
+        """Embed and match dummy features once so the first real query is not the slow one"""
+        features = np.zeros((2, input_dim), dtype=np.float32)
+        self._embed(features, normalize=True)
+        self.match_features(features)
+    
     def save_model(self, path=None):
         """Save model to disk"""
         if path is None:
@@ -223,10 +378,10 @@ class PronunciationModel:
             input_dim = checkpoint['model_state']['network.0.weight'].shape[1]
             self.create_model(input_dim=input_dim)
             self.model.load_state_dict(checkpoint['model_state'])
-            self.model.eval()
         
         self.syllable_references = checkpoint['syllable_references']
         self.scaler = checkpoint['scaler']
+        self.invalidate_reference_index()
         
         print(f"Model loaded from {path}")
         print(f"Loaded {len(self.syllable_references)} syllable references")
@@ -0,0 +1,135 @@
+"""
+Content-addressed storage of syllable recordings
+Each distinct take is stored once, as blobs/<2 hex digits>/<sha256>.wav
+inside SYLLABLES_DIR, and training progress keeps only that relative
+path. The data can then be moved freely, and syncing two machines means
+copying the blobs one of them is missing
+"""
+import hashlib
+import io
+import os
+import shutil
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SYLLABLES_DIR, SAMPLE_RATE
+from src.lazy_import import lazy_import
+
+sf = lazy_import('soundfile')
+
+BLOB_DIR = 'blobs'
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """sha256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RecordingStore:
+    """
+    Blob store rooted at a syllables directory
+    Stored paths are '/'-separated and relative to the root; absolute paths
+    (takes not yet migrated, or referenced in place) pass through unchanged
+    """
+    
+    def __init__(self, root=SYLLABLES_DIR):
+        self.root = root
+    
+    def blob_path(self, digest, extension='.wav'):
+        """Stored path of the blob with the given digest"""
+        return f"{BLOB_DIR}/{digest[:2]}/{digest}{extension}"
+    
+    def is_blob(self, path):
+        """Whether a stored path points into the blob store"""
+        return not os.path.isabs(path) and path.startswith(BLOB_DIR + '/')
+    
+    def resolve(self, path):
+        """Absolute file path of a stored path"""
+        if os.path.isabs(path):
+            return path
+        return os.path.join(self.root, *path.split('/'))
+    
+    def key(self, path):
+        """Stored path for a file path (inverse of resolve for blobs)"""
+        if os.path.isabs(path):
+            relative = os.path.relpath(path, self.root)
+            if relative.split(os.sep)[0] == BLOB_DIR:
+                return '/'.join(relative.split(os.sep))
+        return path
+    
+    def exists(self, path):
+        return os.path.exists(self.resolve(path))
+    
+    def _store(self, stored_path, data=None, source=None, move=False):
+        """Write a blob unless it is already there; returns True if it was new"""
+        target = self.resolve(stored_path)
+        if os.path.exists(target):
+            if move:
+                os.remove(source)
+            return False
+        
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = target + '.tmp'
+        if data is not None:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        elif move:
+            shutil.move(source, temp_path)
+        else:
+            shutil.copyfile(source, temp_path)
+            with open(temp_path, 'rb') as f:
+                os.fsync(f.fileno())
+        os.replace(temp_path, target)
+        return True
+    
+    def put_audio(self, audio, sample_rate=SAMPLE_RATE):
+        """
+        Store audio as a 16-bit WAV blob
+        Returns (stored path, True if the content was new)
+        """
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, sample_rate, format='WAV', subtype='PCM_16')
+        data = buffer.getvalue()
+        stored_path = self.blob_path(hashlib.sha256(data).hexdigest())
+        return stored_path, self._store(stored_path, data=data)
+    
+    def put_file(self, source, move=False):
+        """
+        Store an audio file as it is (copied, or moved with move=True)
+        Returns (stored path, True if the content was new)
+        """
+        extension = os.path.splitext(source)[1].lower() or '.wav'
+        stored_path = self.blob_path(hash_file(source), extension)
+        return stored_path, self._store(stored_path, source=source, move=move)
+    
+    def list_blobs(self):
+        """Stored paths of all blobs present"""
+        blobs = []
+        blob_root = os.path.join(self.root, BLOB_DIR)
+        for dirpath, _, filenames in os.walk(blob_root):
+            for filename in filenames:
+                if not filename.endswith('.tmp'):
+                    relative = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                    blobs.append('/'.join(relative.split(os.sep)))
+        return sorted(blobs)
+    
+    def missing(self, paths):
+        """Stored paths whose file is not present (what a sync has to copy)"""
+        return sorted({path for path in paths if not self.exists(path)})
+
+
+if __name__ == "__main__":
+    from src.training_system import SyllableTrainingSystem
+    
+    # Loading migrates old absolute paths; then list what a sync has to fetch
+    training_system = SyllableTrainingSystem()
+    missing = training_system.missing_recordings()
+    print(f"{len(training_system.recording_store.list_blobs())} blobs in {training_system.recording_store.root}")
+    print(f"{len(missing)} recordings missing:")
+    for path in missing:
+        print(f"  {path}")
@@ -0,0 +1,177 @@
+"""
+Packed, memory-mapped bank of reference syllable audio
+All current reference takes in one contiguous float32 file plus a JSON
+offset index, so correction and playback get zero-copy slices instead of
+opening and decoding one WAV file per syllable
+
+Each build writes its audio to a new generation file and only then
+replaces the index naming it, so a crash mid-build leaves the previous
+index and audio intact
+"""
+import numpy as np
+import json
+import glob
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SAMPLE_RATE, REFERENCE_BANK_DIR
+from src.lazy_import import lazy_import
+
+librosa = lazy_import('librosa')
+
+BANK_AUDIO_FILE = 'references-{generation}.f32'
+BANK_INDEX_FILE = 'references.json'
+
+
+def build_reference_bank(training_system, bank_dir=REFERENCE_BANK_DIR, sample_rate=SAMPLE_RATE):
+    """
+    Pack the current reference take of every trained syllable
+    References whose audio file is missing are left out
+    Returns the bank index
+    """
+    os.makedirs(bank_dir, exist_ok=True)
+    generation = time.time_ns()
+    audio_file = BANK_AUDIO_FILE.format(generation=generation)
+    audio_path = os.path.join(bank_dir, audio_file)
+    index_path = os.path.join(bank_dir, BANK_INDEX_FILE)
+    
+    entries = {}
+    offset = 0
+    with open(audio_path + '.tmp', 'wb') as f:
+        for syllable in training_system.get_all_trained_syllables():
+            ref_data = training_system.get_syllable_reference(syllable)
+            if ref_data is None:
+                continue
+            filepath = ref_data['filepath']
+            if not os.path.exists(filepath):
+                print(f"DEBUG: Missing reference file {filepath}, skipping")
+                continue
+            
+            audio, _ = librosa.load(filepath, sr=sample_rate)
+            audio = audio.astype(np.float32)
+            f.write(audio.tobytes())
+            
+            entries[syllable] = {
+                'offset': offset,
+                'length': len(audio),
+                'filepath': filepath,
+                'mtime_ns': os.stat(filepath).st_mtime_ns
+            }
+            offset += len(audio)
+    
+        f.flush()
+        os.fsync(f.fileno())
+    
+    index = {
+        'generation': generation,
+        'audio_file': audio_file,
+        'sample_rate': sample_rate,
+        'dtype': 'float32',
+        'total_samples': offset,
+        'entries': entries
+    }
+    
+    # New audio under its own name first, then the index that points into it;
+    # the old generation stays valid until the index is replaced
+    os.replace(audio_path + '.tmp', audio_path)
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(index_path + '.tmp', index_path)
+    _remove_old_generations(bank_dir, audio_file)
+    
+    print(f"DEBUG: Reference bank built: {len(entries)} syllables, {offset / sample_rate:.1f}s of audio")
+    return index
+
+
+def _remove_old_generations(bank_dir, current_file):
+    """Delete audio files of earlier builds (and of crashed ones)"""
+    for path in glob.glob(os.path.join(bank_dir, 'references*.f32*')):
+        if os.path.basename(path) == current_file:
+            continue
+        try:
+            os.remove(path)
+        except OSError as e:
+            # Still mapped by a reader on some platforms; removed by the next build
+            print(f"DEBUG: Could not remove old reference bank file {path}: {e}")
+
+
+class ReferenceBank:
+    """
+    Read-only view of a packed reference bank
+    get() returns a slice of the memory map (no copy, not writable)
+    """
+    
+    def __init__(self, bank_dir=REFERENCE_BANK_DIR, sample_rate=SAMPLE_RATE):
+        self.bank_dir = bank_dir
+        self.sample_rate = sample_rate
+        self.reload()
+    
+    def reload(self):
+        """Map the bank files from disk (empty bank if not built or built at another rate)"""
+        self.entries = {}
+        self.audio = np.zeros(0, dtype=np.float32)
+        
+        index_path = os.path.join(self.bank_dir, BANK_INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            audio_path = os.path.join(self.bank_dir, index['audio_file'])
+            audio_size = os.path.getsize(audio_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"DEBUG: Reference bank unreadable, ignoring: {e}")
+            return
+        if index['sample_rate'] != self.sample_rate:
+            print(f"DEBUG: Reference bank is at {index['sample_rate']} Hz, ignoring")
+            return
+        if audio_size != index['total_samples'] * np.dtype(np.float32).itemsize:
+            # The index must describe exactly this audio file, or slices would be wrong
+            print(f"DEBUG: Reference bank audio does not match its index, ignoring")
+            return
+        
+        if index['total_samples'] > 0:
+            self.audio = np.memmap(audio_path, dtype=np.float32, mode='r', shape=(index['total_samples'],))
+        self.entries = index['entries']
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __contains__(self, syllable):
+        return syllable in self.entries
+    
+    def is_current(self, syllable, filepath):
+        """
+        Whether the packed audio is still the given reference take
+        A take whose file no longer exists is served from the bank
+        """
+        entry = self.entries.get(syllable)
+        if entry is None or entry['filepath'] != filepath:
+            return False
+        if os.path.exists(filepath):
+            return os.stat(filepath).st_mtime_ns == entry['mtime_ns']
+        return True
+    
+    def get(self, syllable, filepath=None):
+        """
+        Get the packed reference audio of a syllable
+        With filepath, returns None if the bank holds a different or older take
+        """
+        if filepath is not None and not self.is_current(syllable, filepath):
+            return None
+        entry = self.entries.get(syllable)
+        if entry is None:
+            return None
+        return self.audio[entry['offset']:entry['offset'] + entry['length']]
+
+
+if __name__ == "__main__":
+    from src.training_system import SyllableTrainingSystem
+    
+    index = build_reference_bank(SyllableTrainingSystem())
+    print(f"Packed {len(index['entries'])} reference syllables "
+          f"({index['total_samples'] / index['sample_rate']:.1f}s) into {REFERENCE_BANK_DIR}")
@@ -0,0 +1,305 @@
+"""
+Real-time streaming correction for Hebrew speech
+Scores syllables as the online segmenter finalizes them and splices
+replacements into an output stream played with a fixed delay
+"""
+import numpy as np
+import argparse
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (SAMPLE_RATE, CHUNK_SIZE, MODELS_DIR, MAX_SYLLABLE_DURATION,
+                    STREAM_OUTPUT_DELAY_MS)
+from src.streaming_segmenter import StreamingSyllableSegmenter
+from src.audio_sources import WavFileSource, SyntheticSyllableSource
+from src.lazy_import import lazy_import
+
+sf = lazy_import('soundfile')
+
+
+class OutputRingBuffer:
+    """
+    Fixed-capacity float32 ring addressed by absolute stream sample position
+    """
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.float32)
+    
+    def write(self, position, samples):
+        """Write samples starting at an absolute stream position"""
+        start = position % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:len(samples) - first] = samples[first:]
+    
+    def read(self, position, length, out=None):
+        """Read samples starting at an absolute stream position (into out if given)"""
+        if out is None:
+            out = np.empty(length, dtype=np.float32)
+        start = position % self.capacity
+        first = min(length, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        out[first:length] = self.buffer[:length - first]
+        return out
+
+
+class StreamingCorrector:
+    """
+    Corrects speech while it is being recorded
+    Input chunks go into a ring buffer and come back out delay_ms later;
+    in between, finalized syllables are scored and mispronounced ones are
+    overwritten in the ring with the stretched reference take
+    
+    The default delay covers the longest syllable plus the decision lag, so
+    every syllable is replaced whole. With a shorter delay, a syllable whose
+    start has already been played is counted as late and only its unplayed
+    tail is replaced
+    """
+    
+    def __init__(self, corrector, delay_ms=STREAM_OUTPUT_DELAY_MS, segmenter=None):
+        self.corrector = corrector
+        self.sample_rate = corrector.sample_rate
+        self.delay_samples = int(delay_ms * self.sample_rate / 1000)
+        self.segmenter = segmenter or StreamingSyllableSegmenter(
+            analyzer=corrector.analyzer, sample_rate=self.sample_rate
+        )
+        
+        # Room for the delay plus the longest syllable still waiting to be finalized
+        capacity = self.delay_samples + int((MAX_SYLLABLE_DURATION + 1.0) * self.sample_rate)
+        self.ring = OutputRingBuffer(capacity)
+        self.playback_stream = None
+        self.reset()
+    
+    def reset(self):
+        """Start a new stream"""
+        self.segmenter.reset()
+        self.input_position = 0
+        self.output_position = -self.delay_samples
+        self.assessed_syllables = []
+        self.corrections = []
+        self.latency = []
+    
+    def attach(self, recorder):
+        """Correct chunks from an AudioRecorder as they are captured"""
+        recorder.add_chunk_listener(self.process_chunk)
+    
+    def detach(self, recorder):
+        """Stop correcting chunks from an AudioRecorder"""
+        recorder.remove_chunk_listener(self.process_chunk)
+    
+    def start_playback(self):
+        """Play the corrected output stream as it is produced"""
+        import sounddevice as sd
+        
+        self.playback_stream = sd.OutputStream(samplerate=self.sample_rate, channels=1, dtype='float32')
+        self.playback_stream.start()
+    
+    def stop_playback(self):
+        """Stop playing the corrected output stream"""
+        if self.playback_stream is not None:
+            try:
+                self.playback_stream.stop()
+                self.playback_stream.close()
+            except Exception as e:
+                print(f"Error closing playback stream: {e}")
+            self.playback_stream = None
+    
+    def process_chunk(self, chunk):
+        """
+        Add a chunk of input audio
+        Returns the same number of output samples, delayed by delay_ms
+        """
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if chunk.ndim > 1:
+            chunk = chunk.mean(axis=1)
+        
+        self.ring.write(self.input_position, chunk)
+        self.input_position += len(chunk)
+        
+        for syllable in self.segmenter.process_chunk(chunk):
+            self._handle_syllable(syllable)
+        
+        return self._emit(len(chunk))
+    
+    def flush(self):
+        """
+        End of stream: finalize the last syllable and drain the delay
+        Returns the remaining output samples
+        """
+        for syllable in self.segmenter.flush():
+            self._handle_syllable(syllable)
+        
+        return self._emit(self.input_position - self.output_position)
+    
+    def _emit(self, length):
+        """Read the next output samples (silence before the stream starts)"""
+        output = np.zeros(length, dtype=np.float32)
+        lead = min(max(0, -self.output_position), length)
+        if length > lead:
+            self.ring.read(self.output_position + lead, length - lead, out=output[lead:])
+        self.output_position += length
+        
+        if self.playback_stream is not None:
+            self.playback_stream.write(output)
+        return output
+    
+    def _handle_syllable(self, syllable):
+        """Score a finalized syllable and splice its correction if still unplayed"""
+        decision_start = time.perf_counter()
+        
+        assessed = self.corrector.assess_syllables([syllable])
+        if not assessed:
+            return
+        assessed = assessed[0]
+        self.assessed_syllables.append(assessed)
+        
+        corrected = False
+        late = False
+        if assessed['needs_correction'] and assessed['matched_syllable']:
+            try:
+                replacement_audio = self.corrector.get_replacement_audio(assessed['matched_syllable'])
+            except Exception as e:
+                # A missing reference file must not stop the stream
+                print(f"Error loading reference for {assessed['matched_syllable']}: {e}")
+                replacement_audio = None
+            if replacement_audio is not None:
+                start_sample, end_sample, replacement_audio = self.corrector.fit_replacement(
+                    assessed, replacement_audio
+                )
+                # Part of the syllable may already have been played
+                played = max(0, self.output_position - start_sample)
+                late = played > 0
+                if played < len(replacement_audio):
+                    # Splice what is still unplayed, crossfaded at the cut
+                    segment = replacement_audio[played:].astype(np.float32)
+                    position = start_sample + played
+                    self.corrector.crossfade_edges(segment, self.ring.read(position, len(segment)))
+                    self.ring.write(position, segment)
+                    corrected = True
+                    self.corrections.append({
+                        'index': assessed['index'],
+                        'syllable': assessed['matched_syllable'],
+                        'original_quality': assessed['quality_score'],
+                        'start_time': assessed['start_time'],
+                        'end_time': assessed['end_time'],
+                        'partial': late
+                    })
+        
+        decision_time = time.perf_counter() - decision_start
+        end_sample = int(round(assessed['end_time'] * self.sample_rate))
+        self.latency.append({
+            'index': assessed['index'],
+            'syllable': assessed['matched_syllable'],
+            'decision_ms': decision_time * 1000,
+            # Audio received after the syllable ended, plus time spent deciding
+            'lag_ms': ((self.input_position - end_sample) / self.sample_rate + decision_time) * 1000,
+            'corrected': corrected,
+            'late': late
+        })
+    
+    def latency_report(self):
+        """Summary of per-syllable decision times and end-to-end lag"""
+        decisions = np.array([entry['decision_ms'] for entry in self.latency])
+        lags = np.array([entry['lag_ms'] for entry in self.latency])
+        report = {
+            'output_delay_ms': self.delay_samples * 1000 / self.sample_rate,
+            'syllables': len(self.latency),
+            'corrections': len(self.corrections),
+            'late_corrections': sum(1 for entry in self.latency if entry['late']),
+            'partial_corrections': sum(1 for entry in self.corrections if entry['partial'])
+        }
+        if len(self.latency):
+            report.update({
+                'decision_ms_mean': float(decisions.mean()),
+                'decision_ms_p95': float(np.percentile(decisions, 95)),
+                'decision_ms_max': float(decisions.max()),
+                'lag_ms_mean': float(lags.mean()),
+                'lag_ms_max': float(lags.max())
+            })
+        return report
+    
+    def run_file(self, audio_path, realtime=False, play=False, block_size=CHUNK_SIZE):
+        """
+        Stream a WAV file through the corrector without a microphone
+        realtime paces the input like a live recording; otherwise it runs as
+        fast as possible (benchmark mode)
+        Returns (corrected audio aligned with the input, latency report)
+        """
+        # Playback pacing comes from the output stream when playing
+        source = WavFileSource(audio_path, self.sample_rate, channels=1, block_size=block_size,
+                               realtime=realtime and not play)
+        return self.run_source(source, play=play)
+    
+    def run_source(self, source, play=False, timeout=None):
+        """
+        Stream a finite AudioSource (or the first timeout seconds of any
+        source) through the corrector
+        Returns (corrected audio aligned with the input, latency report)
+        """
+        self.reset()
+        if play:
+            self.start_playback()
+        
+        outputs = []
+        try:
+            source.start(lambda indata, frames, time_info, status: outputs.append(self.process_chunk(indata)))
+            source.wait(timeout)
+            source.stop()
+            outputs.append(self.flush())
+        finally:
+            if play:
+                self.stop_playback()
+        
+        corrected_audio = np.concatenate(outputs)[self.delay_samples:]
+        return corrected_audio, self.latency_report()
+
+
+def build_corrector():
+    """AudioCorrector with the saved model and all trained references loaded"""
+    from src.pronunciation_model import PronunciationModel
+    from src.training_system import SyllableTrainingSystem
+    from src.audio_corrector import AudioCorrector
+    
+    model = PronunciationModel(os.path.join(MODELS_DIR, 'pronunciation_model.pth'))
+    training_system = SyllableTrainingSystem()
+    for syllable, ref_data in training_system.get_trained_references().items():
+        model.add_syllable_reference(syllable, ref_data['features'])
+    return AudioCorrector(model, training_system)
+
+
+def main():
+    """Command-line entry point: stream a WAV file through the corrector"""
+    parser = argparse.ArgumentParser(description="Real-time streaming correction of a WAV file or synthetic input")
+    parser.add_argument('input', help="WAV file to correct, or 'synthetic' for generated syllables")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of synthetic input")
+    parser.add_argument('--delay-ms', type=float, default=STREAM_OUTPUT_DELAY_MS,
+                        help="Fixed output delay in milliseconds")
+    parser.add_argument('--block-size', type=int, default=CHUNK_SIZE, help="Input chunk size in samples")
+    parser.add_argument('--realtime', action='store_true', help="Feed the file at real-time speed")
+    parser.add_argument('--play', action='store_true', help="Play the corrected stream")
+    parser.add_argument('--output', help="Save the corrected audio to this file")
+    args = parser.parse_args()
+    
+    streaming = StreamingCorrector(build_corrector(), delay_ms=args.delay_ms)
+    if args.input == 'synthetic':
+        source = SyntheticSyllableSource(duration=args.duration, sample_rate=streaming.sample_rate, channels=1,
+                                         block_size=args.block_size, realtime=args.realtime and not args.play)
+        corrected_audio, report = streaming.run_source(source, play=args.play)
+    else:
+        corrected_audio, report = streaming.run_file(
+            args.input, realtime=args.realtime, play=args.play, block_size=args.block_size
+        )
+    
+    if args.output:
+        sf.write(args.output, corrected_audio, streaming.sample_rate)
+        print(f"Corrected audio saved to: {args.output}")
+    
+    print("Streaming correction report:")
+    for key, value in report.items():
+        print(f"  {key}: {value:.1f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Streaming syllable segmentation for live audio
+Finds syllable boundaries incrementally while the learner is still speaking
+"""
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SAMPLE_RATE, MAX_SYLLABLE_DURATION
+from src.syllable_analyzer import SyllableAnalyzer, N_FFT, HOP_LENGTH, TOP_DB
+from src.lazy_import import lazy_import
+
+librosa = lazy_import('librosa')
+
+# Onset picking parameters, same as SyllableAnalyzer.detect_syllable_boundaries
+# (librosa.onset.onset_detect defaults with delta=0.05, wait=10)
+PRE_MAX = int(np.ceil(0.03 * SAMPLE_RATE // HOP_LENGTH))
+POST_MAX = int(np.ceil(0.00 * SAMPLE_RATE // HOP_LENGTH + 1))
+PRE_AVG = int(np.ceil(0.10 * SAMPLE_RATE // HOP_LENGTH))
+POST_AVG = int(np.ceil(0.10 * SAMPLE_RATE // HOP_LENGTH + 1))
+ONSET_DELTA = 0.05
+ONSET_WAIT = 10
+
+# librosa.onset.onset_strength shifts the envelope right by lag + n_fft / (2 * hop)
+ENVELOPE_SHIFT = 1 + N_FFT // (2 * HOP_LENGTH)
+
+
+class SlidingBuffer:
+    """
+    Preallocated float32 buffer that is appended to along its last axis
+    and dropped from the front
+    Appends copy in after a write index and drops only move the start index;
+    when an append does not fit, the held part slides back to the front (or
+    the buffer doubles if it is more than half full). view() is a
+    contiguous slice, valid until the next append
+    """
+    
+    def __init__(self, capacity, rows=None):
+        shape = (max(1, int(capacity)),) if rows is None else (rows, max(1, int(capacity)))
+        self.data = np.zeros(shape, dtype=np.float32)
+        self.start = 0
+        self.end = 0
+    
+    def __len__(self):
+        return self.end - self.start
+    
+    def view(self):
+        """Held values, oldest first"""
+        return self.data[..., self.start:self.end]
+    
+    def append(self, values):
+        """Add values (same leading shape, any length along the last axis)"""
+        count = values.shape[-1]
+        capacity = self.data.shape[-1]
+        if self.end + count > capacity:
+            held = len(self)
+            target = self.data
+            if held + count > capacity // 2:
+                # Rare: grow geometrically so appends stay amortized O(1)
+                target = np.zeros(self.data.shape[:-1] + (max(2 * capacity, held + count),), dtype=np.float32)
+            target[..., :held] = self.data[..., self.start:self.end]
+            self.data, self.start, self.end = target, 0, held
+        self.data[..., self.end:self.end + count] = values
+        self.end += count
+    
+    def drop(self, count):
+        """Forget the oldest count values"""
+        self.start = min(self.start + count, self.end)
+
+
+class StreamingSyllableSegmenter:
+    """
+    Online version of SyllableAnalyzer.analyze_audio
+    Feed recorder chunks to process_chunk() as they arrive; finalized syllables
+    (same dicts as analyze_audio, with features) are returned and passed to
+    on_syllable once the next onset is confirmed
+    
+    The onset envelope is normalized by its running range instead of the
+    whole-recording range, so boundaries can differ slightly from offline
+    detection at the very start of a recording
+    """
+    
+    def __init__(self, analyzer=None, on_syllable=None, sample_rate=SAMPLE_RATE):
+        self.analyzer = analyzer or SyllableAnalyzer(sample_rate=sample_rate)
+        self.sample_rate = sample_rate
+        self.on_syllable = on_syllable
+        self.reset()
+    
+    @property
+    def lookahead_seconds(self):
+        """
+        Audio needed past the next onset before a syllable is finalized
+        (peak-picking window plus half an analysis window), ~93 ms at 22.05 kHz;
+        backtracking the onset to the preceding envelope minimum adds a few frames
+        """
+        return ((POST_AVG - ENVELOPE_SHIFT) * HOP_LENGTH + N_FFT // 2) / self.sample_rate
+    
+    def reset(self):
+        """Start a new stream"""
+        self.total_samples = 0
+        self.syllable_count = 0
+        
+        # Retained audio and STFT frames, both starting at frame self.frame_offset
+        # (room for the longest syllable plus the lookahead before they grow)
+        self.frame_offset = 0
+        retained_samples = int((MAX_SYLLABLE_DURATION + 1.0) * self.sample_rate)
+        self.audio_buffer = SlidingBuffer(retained_samples)
+        self.magnitude_buffer = SlidingBuffer(retained_samples // HOP_LENGTH, rows=1 + N_FFT // 2)
+        self.mel_power_buffer = SlidingBuffer(retained_samples // HOP_LENGTH,
+                                              rows=self.analyzer._get_mel_basis().shape[0])
+        self.next_frame = 0
+        
+        # Rolling onset-strength / energy state (absolute frame indexing)
+        self.db_max = -np.inf
+        self.previous_db = None
+        self.envelope = [0.0] * ENVELOPE_SHIFT
+        self.rms = []
+        self.envelope_offset = 0
+        self.envelope_min = 0.0
+        self.envelope_max = 0.0
+        self.peak_cursor = 0
+        
+        # Start frame of the syllable still waiting for its closing onset
+        self.open_boundary = None
+        self.finished = False
+    
+    @property
+    def audio(self):
+        """Retained audio (a view, valid until the next chunk)"""
+        return self.audio_buffer.view()
+    
+    @property
+    def magnitude(self):
+        """Retained STFT magnitude frames (freq, frames)"""
+        return self.magnitude_buffer.view()
+    
+    @property
+    def mel_power(self):
+        """Retained mel power frames (mels, frames)"""
+        return self.mel_power_buffer.view()
+    
+    def attach(self, recorder):
+        """Receive chunks from an AudioRecorder as they are captured"""
+        recorder.add_chunk_listener(self.process_chunk)
+    
+    def detach(self, recorder):
+        """Stop receiving chunks from an AudioRecorder"""
+        recorder.remove_chunk_listener(self.process_chunk)
+    
+    def run_source(self, source, timeout=None):
+        """
+        Segment everything a finite AudioSource delivers (or until timeout)
+        Returns all syllables found, in order
+        """
+        syllables = []
+        self.reset()
+        source.start(lambda indata, frames, time_info, status: syllables.extend(self.process_chunk(indata)))
+        source.wait(timeout)
+        source.stop()
+        syllables.extend(self.flush())
+        return syllables
+    
+    def current_rms(self):
+        """RMS energy of the most recent analysis frame"""
+        return self.rms[-1] if self.rms else 0.0
+    
+    def process_chunk(self, chunk):
+        """
+        Add a chunk of audio (frames,) or (frames, channels)
+        Returns list of syllables finalized by this chunk
+        """
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if chunk.ndim > 1:
+            chunk = chunk.mean(axis=1)
+        self.audio_buffer.append(chunk)
+        self.total_samples += len(chunk)
+        
+        # Frames whose whole window is now available
+        last_frame = (self.total_samples - N_FFT // 2) // HOP_LENGTH
+        self._compute_frames(last_frame + 1)
+        return self._pick_syllables(final=False)
+    
+    def flush(self):
+        """
+        End of stream: finalize remaining frames and the last syllable
+        Returns list of syllables finalized by the flush
+        """
+        if self.finished:
+            return []
+        self.finished = True
+        
+        # Remaining frames see zero padding past the end, as with center=True
+        self._compute_frames(1 + self.total_samples // HOP_LENGTH)
+        return self._pick_syllables(final=True)
+    
+    def _compute_frames(self, stop_frame):
+        """Compute STFT frames [next_frame, stop_frame) and extend the onset envelope"""
+        if stop_frame <= self.next_frame:
+            return
+        
+        # Window samples for the new frames, zero-padded outside the recording
+        first_sample = self.next_frame * HOP_LENGTH - N_FFT // 2
+        last_sample = (stop_frame - 1) * HOP_LENGTH + N_FFT // 2
+        buffer_start = self.frame_offset * HOP_LENGTH
+        window = np.zeros(last_sample - first_sample, dtype=np.float32)
+        source_start = max(first_sample, 0)
+        source_stop = min(last_sample, self.total_samples)
+        window[source_start - first_sample:source_stop - first_sample] = \
+            self.audio[source_start - buffer_start:source_stop - buffer_start]
+        
+        magnitude = np.abs(librosa.stft(window, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False))
+        mel_power = self.analyzer._mel_power(magnitude)
+        self.magnitude_buffer.append(magnitude)
+        self.mel_power_buffer.append(mel_power)
+        self.next_frame = stop_frame
+        
+        # Onset strength: mean positive dB rise between consecutive mel frames
+        mel_db = librosa.power_to_db(mel_power, top_db=None)
+        self.db_max = max(self.db_max, mel_db.max())
+        mel_db = np.maximum(mel_db, self.db_max - TOP_DB)
+        if self.previous_db is not None:
+            mel_db = np.concatenate([self.previous_db[:, np.newaxis], mel_db], axis=1)
+        rises = np.mean(np.maximum(0.0, np.diff(mel_db, axis=1)), axis=0)
+        self.previous_db = mel_db[:, -1]
+        self.envelope.extend(rises.tolist())
+        if len(rises):
+            self.envelope_min = min(self.envelope_min, float(rises.min()))
+            self.envelope_max = max(self.envelope_max, float(rises.max()))
+        
+        # Frame RMS from the magnitude spectrum (as librosa.feature.rms(S=...))
+        power = magnitude ** 2
+        power[0] *= 0.5
+        power[-1] *= 0.5
+        self.rms.extend((np.sqrt(2 * power.sum(axis=0)) / N_FFT).tolist())
+    
+    def _envelope_at(self, frame):
+        return self.envelope[frame - self.envelope_offset]
+    
+    def _pick_syllables(self, final):
+        """Run the peak picker as far as the lookahead allows"""
+        # The offline envelope has exactly one value per STFT frame
+        available = self.envelope_offset + len(self.envelope)
+        if final:
+            available = min(available, self.next_frame)
+        scale = self.envelope_max - self.envelope_min
+        syllables = []
+        
+        n = self.peak_cursor
+        while n < available:
+            if not final and n + POST_AVG > available:
+                break  # Wait for the full post-average window
+            
+            window_max = max(self.envelope[max(n - PRE_MAX, self.envelope_offset) - self.envelope_offset:
+                                           min(n + POST_MAX, available) - self.envelope_offset])
+            value = self._envelope_at(n)
+            if value != window_max or scale <= 0:
+                n += 1
+                continue
+            
+            average = np.mean(self.envelope[max(n - PRE_AVG, self.envelope_offset) - self.envelope_offset:
+                                            min(n + POST_AVG, available) - self.envelope_offset])
+            if value - average < ONSET_DELTA * scale:
+                n += 1
+                continue
+            
+            syllables.extend(self._add_onset(self._backtrack(n, available)))
+            n += ONSET_WAIT + 1
+        self.peak_cursor = n
+        
+        if final:
+            syllables.extend(self._close_stream())
+        else:
+            self._trim()
+        
+        for syllable in syllables:
+            if self.on_syllable:
+                self.on_syllable(syllable)
+        return syllables
+    
+    def _backtrack(self, onset, available):
+        """Move an onset back to the preceding local minimum of the envelope"""
+        lowest = self.frame_offset if self.open_boundary is None else max(self.open_boundary, self.frame_offset)
+        for i in range(onset, max(lowest, 1) - 1, -1):
+            if i + 1 >= available:
+                continue
+            if (self._envelope_at(i) <= self._envelope_at(i - 1)
+                    and self._envelope_at(i) < self._envelope_at(i + 1)):
+                return i
+        return lowest
+    
+    def _add_onset(self, boundary):
+        """Close the open syllable at a new boundary frame"""
+        syllables = []
+        if self.open_boundary is not None and boundary > self.open_boundary:
+            syllable = self._make_syllable(self.open_boundary * HOP_LENGTH, boundary * HOP_LENGTH)
+            if syllable:
+                syllables.append(syllable)
+        if self.open_boundary is None or boundary > self.open_boundary:
+            self.open_boundary = boundary
+        return syllables
+    
+    def _close_stream(self):
+        """Last syllable runs to the end of the stream"""
+        if self.open_boundary is None:
+            # No onsets: the whole stream is one syllable, as offline
+            # (audio is only trimmed once it is too long for that)
+            if self.frame_offset == 0:
+                syllable = self._make_syllable(0, self.total_samples)
+                return [syllable] if syllable else []
+            return []
+        syllable = self._make_syllable(self.open_boundary * HOP_LENGTH, self.total_samples)
+        return [syllable] if syllable else []
+    
+    def _make_syllable(self, start_sample, end_sample):
+        """Build a finalized syllable dict, or None if its duration is out of range"""
+        start_time = start_sample / self.sample_rate
+        end_time = end_sample / self.sample_rate
+        duration = end_time - start_time
+        if not self.analyzer.min_syllable_duration <= duration <= self.analyzer.max_syllable_duration:
+            print(f"DEBUG: Rejected streaming syllable: {start_time:.2f}s - {end_time:.2f}s ({duration:.2f}s) - out of range")
+            return None
+        
+        buffer_start = self.frame_offset * HOP_LENGTH
+        spectrogram = {
+            'audio': self.audio,
+            'magnitude': self.magnitude,
+            'mel_power': self.mel_power
+        }
+        features = self.analyzer.extract_features_from_spectrogram(
+            spectrogram, start_sample - buffer_start, end_sample - buffer_start
+        )
+        
+        syllable = {
+            'index': self.syllable_count,
+            'audio': self.audio[start_sample - buffer_start:end_sample - buffer_start].copy(),
+            'start_time': start_time,
+            'end_time': end_time,
+            'duration': duration,
+            'start_sample': start_sample,
+            'end_sample': end_sample,
+            'features': features,
+            'finalized_time': self.total_samples / self.sample_rate
+        }
+        self.syllable_count += 1
+        return syllable
+    
+    def _trim(self):
+        """Drop audio, frames and envelope no longer reachable by any pending decision"""
+        keep = min(self.peak_cursor - PRE_AVG - 1, self.next_frame - N_FFT // (2 * HOP_LENGTH))
+        if self.open_boundary is not None:
+            if (keep - self.open_boundary) * HOP_LENGTH > self.analyzer.max_syllable_duration * self.sample_rate:
+                # No onset for longer than any syllable (sustained vowel, noise, music):
+                # whatever closes it would be rejected as too long, so stop keeping it
+                print(f"DEBUG: Rejected streaming syllable from {self.open_boundary * HOP_LENGTH / self.sample_rate:.2f}s - "
+                      f"no onset within {self.analyzer.max_syllable_duration:.2f}s")
+                self.open_boundary = None
+            else:
+                # One frame more: the onset's start sample can round down into it
+                keep = min(keep, self.open_boundary - 1)
+        elif self.total_samples <= self.analyzer.max_syllable_duration * self.sample_rate:
+            return  # Could still become a single whole-stream syllable
+        if keep <= self.frame_offset:
+            return
+        
+        drop = keep - self.frame_offset
+        self.audio_buffer.drop(drop * HOP_LENGTH)
+        self.magnitude_buffer.drop(drop)
+        self.mel_power_buffer.drop(drop)
+        self.frame_offset = keep
+        
+        if keep - 1 > self.envelope_offset:
+            # Keep one earlier value for the local-minimum test
+            drop_envelope = keep - 1 - self.envelope_offset
+            del self.envelope[:drop_envelope]
+            del self.rms[:drop_envelope]
+            self.envelope_offset = keep - 1
+
+
+if __name__ == "__main__":
+    segmenter = StreamingSyllableSegmenter()
+    print("Streaming segmenter initialized successfully!")
+    print(f"Lookahead: {segmenter.lookahead_seconds * 1000:.0f} ms")
@@ -3,14 +3,28 @@ Hebrew syllable analyzer for audio processing
 Detects and extracts syllables from Hebrew speech
 """
 import numpy as np
-import librosa
-import soundfile as sf
-from scipy import signal
 import os
 import sys
+import warnings
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import SAMPLE_RATE, MIN_SYLLABLE_DURATION, MAX_SYLLABLE_DURATION
+from config import (SAMPLE_RATE, MIN_SYLLABLE_DURATION, MAX_SYLLABLE_DURATION,
+                    SHARED_STFT_FEATURES)
 from src.hebrew_syllables import COMMON_HEBREW_SYLLABLES
+from src.disk_recording import open_wav_memmap
+from src.lazy_import import lazy_import
+
+librosa = lazy_import('librosa')
+sf = lazy_import('soundfile')
+scipy_fft = lazy_import('scipy.fft')
+
+# Frame layout shared by boundary detection and feature extraction
+# (these are the librosa defaults the 29-dim feature vector was built with)
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MFCC = 13
+FEATURE_DIM = 29
+TOP_DB = 80.0
+FEATURE_BATCH_SIZE = 64  # Max segments per vectorized STFT call
 
 
 class SyllableAnalyzer:
@@ -18,29 +32,122 @@ class SyllableAnalyzer:
     Analyzes audio to detect and extract Hebrew syllables
     """
     
-    def __init__(self, sample_rate=SAMPLE_RATE):
+    def __init__(self, sample_rate=SAMPLE_RATE, shared_stft=SHARED_STFT_FEATURES):
         self.sample_rate = sample_rate
         self.min_syllable_duration = MIN_SYLLABLE_DURATION
         self.max_syllable_duration = MAX_SYLLABLE_DURATION
+        self.shared_stft = shared_stft
+        self._mel_basis = None
     
-    def load_audio(self, audio_path):
-        """Load audio file"""
+    def load_audio(self, audio_path, mmap=False):
+        """
+        Load audio file
+        With mmap=True a mono float32 WAV at the analyzer's sample rate is
+        memory-mapped instead of read (read-only array)
+        """
+        if mmap:
+            mapped = open_wav_memmap(audio_path)
+            if mapped is not None:
+                audio, sr = mapped
+                if sr == self.sample_rate and audio.dtype == np.float32 and audio.shape[1] == 1:
+                    return audio[:, 0], sr
         audio, sr = librosa.load(audio_path, sr=self.sample_rate)
         return audio, sr
     
-    def detect_syllable_boundaries(self, audio):
+    def _get_mel_basis(self):
+        """Mel filterbank matching librosa.feature.mfcc defaults (cached)"""
+        if self._mel_basis is None:
+            self._mel_basis = librosa.filters.mel(sr=self.sample_rate, n_fft=N_FFT)
+        return self._mel_basis
+    
+    def compute_spectrogram(self, audio):
+        """
+        Compute the STFT-derived frames for a whole recording once
+        Returns dict with the audio, magnitude and mel power frames
+        """
+        magnitude = np.abs(librosa.stft(audio, n_fft=N_FFT, hop_length=HOP_LENGTH))
+        return {
+            'audio': audio,
+            'magnitude': magnitude,
+            'mel_power': self._mel_power(magnitude)
+        }
+    
+    def _mel_power(self, magnitude):
+        """Project (..., freq, frames) magnitudes onto the mel filterbank"""
+        return np.einsum("...ft,mf->...mt", magnitude ** 2, self._get_mel_basis(), optimize=True)
+    
+    def _spectral_centroid(self, magnitude):
+        """Per-frame spectral centroid of (..., freq, frames) magnitudes"""
+        freqs = librosa.fft_frequencies(sr=self.sample_rate, n_fft=N_FFT)
+        total = magnitude.sum(axis=-2)
+        weighted = np.einsum("f,...ft->...t", freqs, magnitude)
+        # Silent frames get a centroid of 0, as in librosa
+        return np.divide(weighted, total, out=np.zeros_like(weighted), where=total > 0)
+    
+    def _spectral_rolloff(self, magnitude, roll_percent=0.85):
+        """Per-frame frequency below which roll_percent of the energy lies"""
+        freqs = librosa.fft_frequencies(sr=self.sample_rate, n_fft=N_FFT)
+        cumulative = np.cumsum(magnitude, axis=-2)
+        reached = cumulative >= roll_percent * cumulative[..., -1:, :]
+        return freqs[np.argmax(reached, axis=-2)]
+    
+    def _zero_crossing_rate(self, audio):
+        """
+        Per-frame zero crossing rate of (..., samples) audio
+        Same framing as librosa.feature.zero_crossing_rate (centered, edge padded)
+        """
+        padding = [(0, 0)] * (audio.ndim - 1) + [(N_FFT // 2, N_FFT // 2)]
+        padded = np.pad(audio, padding, mode='edge')
+        signs = np.signbit(np.where(np.abs(padded) <= 1e-10, 0.0, padded))
+        crossings = np.cumsum(signs[..., 1:] != signs[..., :-1], axis=-1)
+        crossings = np.concatenate([np.zeros_like(crossings[..., :1]), crossings], axis=-1)
+        
+        # Crossings strictly inside each frame: pairs (j-1, j) with j in (start, start + N_FFT)
+        starts = np.arange(1 + audio.shape[-1] // HOP_LENGTH) * HOP_LENGTH
+        counts = crossings[..., starts + N_FFT - 1] - crossings[..., starts]
+        return counts / N_FFT
+    
+    def _features_from_frames(self, magnitude, mel_power, zcr):
+        """
+        Build 29-dim feature vectors from spectrogram frames
+        Works on (freq, frames) or batched (..., freq, frames) arrays
+        """
+        # Same dB scaling as librosa.feature.mfcc, with the top_db floor
+        # taken per segment (per batch row)
+        mel_db = librosa.power_to_db(mel_power, top_db=None)
+        mel_db = np.maximum(mel_db, mel_db.max(axis=(-2, -1), keepdims=True) - TOP_DB)
+        mfccs = scipy_fft.dct(mel_db, axis=-2, type=2, norm='ortho')[..., :N_MFCC, :]
+        
+        return np.concatenate([
+            np.mean(mfccs, axis=-1),
+            np.std(mfccs, axis=-1),
+            np.mean(self._spectral_centroid(magnitude), axis=-1)[..., np.newaxis],
+            np.mean(self._spectral_rolloff(magnitude), axis=-1)[..., np.newaxis],
+            np.mean(zcr, axis=-1)[..., np.newaxis]
+        ], axis=-1)
+    
+    def detect_syllable_boundaries(self, audio, spectrogram=None):
         """
         Detect syllable boundaries in audio using energy and onset detection
+        Pass a precomputed spectrogram (see compute_spectrogram) to reuse its STFT
         Returns list of (start_time, end_time) tuples
         """
         print(f"DEBUG: Audio length: {len(audio)} samples, duration: {len(audio)/self.sample_rate:.2f}s")
         
         # Calculate energy envelope
-        hop_length = 512
-        energy = librosa.feature.rms(y=audio, hop_length=hop_length)[0]
-        
-        # Calculate onset strength with more sensitivity
-        onset_env = librosa.onset.onset_strength(y=audio, sr=self.sample_rate, hop_length=hop_length)
+        hop_length = HOP_LENGTH
+        if spectrogram is not None:
+            energy = librosa.feature.rms(S=spectrogram['magnitude'], frame_length=N_FFT, hop_length=hop_length)[0]
+            onset_env = librosa.onset.onset_strength(
+                S=librosa.power_to_db(spectrogram['mel_power']),
+                sr=self.sample_rate,
+                hop_length=hop_length
+            )
+        else:
+            energy = librosa.feature.rms(y=audio, hop_length=hop_length)[0]
+            
+            # Calculate onset strength with more sensitivity
+            onset_env = librosa.onset.onset_strength(y=audio, sr=self.sample_rate, hop_length=hop_length)
         
         # Detect onsets with lower threshold for better detection
         onsets = librosa.onset.onset_detect(
@@ -102,14 +209,18 @@ class SyllableAnalyzer:
         """
         syllables = []
         for start_time, end_time in boundaries:
-            start_sample = int(start_time * self.sample_rate)
-            end_sample = int(end_time * self.sample_rate)
+            # Rounded: onset times are frame multiples, and truncating
+            # (frame * hop / sr) * sr can land one sample early
+            start_sample = int(round(start_time * self.sample_rate))
+            end_sample = int(round(end_time * self.sample_rate))
             syllable_audio = audio[start_sample:end_sample]
             syllables.append({
                 'audio': syllable_audio,
                 'start_time': start_time,
                 'end_time': end_time,
-                'duration': end_time - start_time
+                'duration': end_time - start_time,
+                'start_sample': start_sample,
+                'end_sample': end_sample
             })
         return syllables
     
@@ -149,27 +260,189 @@ class SyllableAnalyzer:
             print(f"DEBUG: Librosa feature extraction error: {e}, returning zeros")
             return np.zeros(29)
     
+    def extract_features_batch(self, segments):
+        """
+        Extract feature vectors for many audio segments at once
+        Segments are binned by STFT frame count and zero-padded within a bin,
+        which leaves every frame unchanged, so each row equals extract_features
+        of the corresponding segment
+        Returns (N, 29) float32 matrix
+        """
+        features = np.zeros((len(segments), FEATURE_DIM), dtype=np.float32)
+        
+        # Group segment indices by the number of frames they produce
+        bins = {}
+        for i, segment in enumerate(segments):
+            if len(segment) < 512:
+                print(f"DEBUG: Audio segment {i} too short ({len(segment)} samples), returning zeros")
+                continue
+            bins.setdefault(1 + len(segment) // HOP_LENGTH, []).append(i)
+        
+        for num_frames, indices in bins.items():
+            for batch_start in range(0, len(indices), FEATURE_BATCH_SIZE):
+                batch = indices[batch_start:batch_start + FEATURE_BATCH_SIZE]
+                width = max(len(segments[i]) for i in batch)
+                
+                # Zero padding for the STFT (same as its own centering pad);
+                # edge padding for ZCR (same as its 'edge' centering pad)
+                zero_padded = np.zeros((len(batch), width), dtype=np.float32)
+                edge_padded = np.empty((len(batch), width), dtype=np.float32)
+                for row, i in enumerate(batch):
+                    segment = segments[i]
+                    zero_padded[row, :len(segment)] = segment
+                    edge_padded[row, :len(segment)] = segment
+                    edge_padded[row, len(segment):] = segment[-1]
+                
+                try:
+                    magnitude = np.abs(librosa.stft(zero_padded, n_fft=N_FFT, hop_length=HOP_LENGTH))
+                    zcr = self._zero_crossing_rate(edge_padded)[..., :num_frames]
+                    features[batch] = self._features_from_frames(magnitude, self._mel_power(magnitude), zcr)
+                except Exception as e:
+                    print(f"DEBUG: Batched feature extraction error: {e}, returning zeros")
+        
+        return features
+    
+    def extract_features_from_spectrogram(self, spectrogram, start_sample, end_sample):
+        """
+        Extract the 29-dim feature vector of one syllable from the frames of a
+        whole-recording spectrogram (see extract_features_from_spectrogram_batch)
+        Returns feature vector
+        """
+        return self.extract_features_from_spectrogram_batch(spectrogram, [(start_sample, end_sample)])[0]
+    
+    def extract_features_from_spectrogram_batch(self, spectrogram, spans):
+        """
+        Extract feature vectors of many syllables, given as (start_sample,
+        end_sample) spans, from the frames of a whole-recording spectrogram
+        (see compute_spectrogram)
+        Interior frames are sliced from the shared STFT; only the frames whose
+        window crosses a syllable edge are recomputed, for all syllables in one
+        batched STFT, so each row equals extract_features on the cut-out segment
+        Returns (N, 29) float32 matrix
+        """
+        features = np.zeros((len(spans), FEATURE_DIM), dtype=np.float32)
+        shared = spectrogram['magnitude']
+        half_window = N_FFT // 2
+        # Frames 0..head-1 of a segment start before it
+        head = half_window // HOP_LENGTH
+        
+        edges = []  # (row, segment, first frame, first frame running past the end)
+        for row, (start_sample, end_sample) in enumerate(spans):
+            segment = spectrogram['audio'][start_sample:end_sample]
+            if len(segment) < 512:
+                print(f"DEBUG: Audio segment too short ({len(segment)} samples), returning zeros")
+                continue
+            first_frame = start_sample // HOP_LENGTH
+            num_frames = 1 + len(segment) // HOP_LENGTH
+            tail = max(head, (len(segment) - half_window) // HOP_LENGTH + 1)
+            if (start_sample % HOP_LENGTH or tail <= head
+                    or first_frame + num_frames > shared.shape[-1]):
+                # Unaligned or very short syllable: nothing to share
+                features[row] = self.extract_features(segment)
+                continue
+            edges.append((row, segment, first_frame, tail))
+        if not edges:
+            return features
+        
+        # Head and tail patch of every segment, zero-padded to one width
+        # (the same zeros the STFT's centering pad would add)
+        patches = [(segment[:(head - 1) * HOP_LENGTH + half_window], segment[tail * HOP_LENGTH - half_window:])
+                   for _, segment, _, tail in edges]
+        width = max(len(patch) for pair in patches for patch in pair)
+        padded = np.zeros((len(edges), 2, width), dtype=spectrogram['audio'].dtype)
+        for i, (head_patch, tail_patch) in enumerate(patches):
+            padded[i, 0, :len(head_patch)] = head_patch
+            padded[i, 1, :len(tail_patch)] = tail_patch
+        try:
+            with warnings.catch_warnings():
+                # Edge patches are shorter than n_fft by design
+                warnings.simplefilter("ignore", UserWarning)
+                edge_magnitude = np.abs(librosa.stft(padded, n_fft=N_FFT, hop_length=HOP_LENGTH))
+            edge_mel_power = self._mel_power(edge_magnitude)
+        except Exception as e:
+            print(f"DEBUG: Shared-STFT feature extraction error: {e}, returning zeros")
+            return features
+        
+        for i, (row, segment, first_frame, tail) in enumerate(edges):
+            interior = slice(first_frame + head, first_frame + tail)
+            # Tail patch frame head is segment frame tail
+            tail_frames = slice(head, head + 1 + len(segment) // HOP_LENGTH - tail)
+            try:
+                magnitude = np.concatenate([
+                    edge_magnitude[i, 0, :, :head], shared[:, interior], edge_magnitude[i, 1, :, tail_frames]
+                ], axis=1)
+                mel_power = np.concatenate([
+                    edge_mel_power[i, 0, :, :head], spectrogram['mel_power'][:, interior],
+                    edge_mel_power[i, 1, :, tail_frames]
+                ], axis=1)
+                features[row] = self._features_from_frames(magnitude, mel_power, self._zero_crossing_rate(segment))
+            except Exception as e:
+                print(f"DEBUG: Shared-STFT feature extraction error: {e}, returning zeros")
+        return features
+    
     def analyze_audio(self, audio):
         """
         Full analysis pipeline: detect syllables and extract features
+        In shared-STFT mode the whole recording is transformed once and every
+        syllable's features are sliced from that spectrogram (plus one batched
+        STFT of the syllable edges)
         """
+        spectrogram = self.compute_spectrogram(audio) if self.shared_stft else None
+        
         # Detect syllable boundaries
-        boundaries = self.detect_syllable_boundaries(audio)
+        boundaries = self.detect_syllable_boundaries(audio, spectrogram=spectrogram)
         
         # Extract syllable segments
         syllables = self.extract_syllables(audio, boundaries)
         
         # Extract features for each syllable
-        for syllable in syllables:
-            syllable['features'] = self.extract_features(syllable['audio'])
+        if spectrogram is not None:
+            batch_features = self.extract_features_from_spectrogram_batch(
+                spectrogram, [(s['start_sample'], s['end_sample']) for s in syllables]
+            )
+        else:
+            batch_features = self.extract_features_batch([s['audio'] for s in syllables])
+        for syllable, features in zip(syllables, batch_features):
+            syllable['features'] = features
         
         return syllables
     
+    def iter_analyze_audio(self, audio):
+        """
+        analyze_audio one syllable at a time: boundaries are found over the
+        whole recording first, then each syllable is yielded (with features)
+        as soon as they are extracted
+        """
+        spectrogram = self.compute_spectrogram(audio) if self.shared_stft else None
+        boundaries = self.detect_syllable_boundaries(audio, spectrogram=spectrogram)
+        
+        for syllable in self.extract_syllables(audio, boundaries):
+            if spectrogram is not None:
+                syllable['features'] = self.extract_features_from_spectrogram(
+                    spectrogram, syllable['start_sample'], syllable['end_sample']
+                )
+            else:
+                syllable['features'] = self.extract_features(syllable['audio'])
+            yield syllable
+    
     def analyze_file(self, audio_path):
         """Analyze audio file"""
-        audio, _ = self.load_audio(audio_path)
+        audio, _ = self.load_audio(audio_path, mmap=True)
         return self.analyze_audio(audio)
     
+    def warm_up(self):
+        """
+        Run the analysis once on a short synthetic clip so the first real
+        analysis does not pay librosa's one-time costs (filterbanks, JIT)
+        """
+        t = np.arange(int(0.8 * self.sample_rate)) / self.sample_rate
+        clip = (0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 3 * t) > 0)).astype(np.float32)
+        clip += 0.01 * np.random.default_rng(0).standard_normal(len(clip)).astype(np.float32)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            self.analyze_audio(clip)
+            self.extract_features_batch([clip[:self.sample_rate // 4], clip[:self.sample_rate // 5]])
+    
     def get_syllable_count(self, audio):
         """Get the number of syllables detected in audio"""
         boundaries = self.detect_syllable_boundaries(audio)
@@ -2,61 +2,265 @@
 Training system for collecting and managing Hebrew syllable pronunciations
 """
 import os
-import json
+import re
+import functools
+import threading
 import numpy as np
-import soundfile as sf
 from datetime import datetime
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import SYLLABLES_DIR, TRAINING_DATA_DIR, SAMPLE_RATE, TARGET_SYLLABLE_COUNT
+from config import (SYLLABLES_DIR, TRAINING_DATA_DIR, SAMPLE_RATE, TARGET_SYLLABLE_COUNT,
+                    PROGRESS_BACKEND, DEFAULT_SPEAKER)
 from src.hebrew_syllables import get_syllable_list
-from src.syllable_analyzer import SyllableAnalyzer
+from src.syllable_analyzer import SyllableAnalyzer, FEATURE_DIM
+from src.progress_store import JournalProgressStore, SQLiteProgressStore, apply_event, atomic_write_json
+from src.feature_stats import SyllableFeatureStats
+from src.feature_store import FeatureStore
+from src.recording_store import RecordingStore
+
+
+def synchronized(method):
+    """Run a SyllableTrainingSystem method while holding its lock"""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return locked
 
 
 class SyllableTrainingSystem:
     """
     Manages the training process for Hebrew syllables
     Allows users to record correct pronunciations of target syllables
+    
+    backend 'json' keeps progress in memory (snapshot + journal on disk);
+    'sqlite' keeps it in training_progress.db, one speaker per instance,
+    and self.progress is None
+    
+    With the json backend, take features and syllable vectors live in
+    memory-mapped float32 files; progress entries hold only their row
+    indices ('feature_row' per recording, 'vector_row' per syllable).
+    Each compaction writes the syllable vectors to a new file as
+    consecutive rows, so the vector file never holds more than one row
+    per syllable plus the takes saved since.
+    That row-indexed snapshot is training_state.json, local like the
+    .f32 files; training_progress.json keeps the inlined interchange
+    format and is only read, to seed the first snapshot
+    
+    Recording filepaths are stored relative to SYLLABLES_DIR (content-hashed
+    blobs, see RecordingStore); the public methods take and return absolute
+    paths
+    
+    Saves run on worker threads while the GUI and other jobs read, so the
+    public methods that touch progress hold self.lock (a journal compaction
+    never sees progress half-updated)
     """
     
-    def __init__(self):
+    def __init__(self, backend=PROGRESS_BACKEND, speaker=DEFAULT_SPEAKER, analyzer=None):
         self.syllable_list = get_syllable_list()
-        self.analyzer = SyllableAnalyzer()
+        self.analyzer = analyzer or SyllableAnalyzer()
+        self.recording_listeners = []
+        self.feature_stats = {}  # Built per syllable on first use, then updated per take
+        self.lock = threading.RLock()
         
         # Ensure directories exist
         os.makedirs(SYLLABLES_DIR, exist_ok=True)
         os.makedirs(TRAINING_DATA_DIR, exist_ok=True)
+        self.recording_store = RecordingStore(SYLLABLES_DIR)
         
         # Load or initialize training progress
         self.progress_file = os.path.join(TRAINING_DATA_DIR, 'training_progress.json')
-        self.load_progress()
+        self.progress_store = JournalProgressStore(
+            os.path.join(TRAINING_DATA_DIR, 'training_state.json'),
+            journal_path=os.path.join(TRAINING_DATA_DIR, 'training_progress.journal'),
+            seed_path=self.progress_file,
+            before_compact=self._pack_vectors,
+            after_compact=lambda generation: self._remove_vector_files({generation})
+        )
+        self.take_features = FeatureStore(os.path.join(TRAINING_DATA_DIR, 'recording_features.f32'))
+        self.syllable_vectors = None  # Opened once the progress generation is known
+        self.database = None
+        self.progress = None
+        if backend == 'sqlite':
+            self.database = SQLiteProgressStore(os.path.join(TRAINING_DATA_DIR, 'training_progress.db'), speaker)
+            if self.database.is_empty():
+                # New database: start from the JSON progress if there is any
+                progress = self.progress_store.load()
+                self._open_vectors()
+                progress = self._materialize(progress)
+                if progress:
+                    self.database.import_progress(progress)
+            self.database.ensure_syllables(self.syllable_list)
+            self.migrate_recording_paths()
+        else:
+            self.load_progress()
     
+    def add_recording_listener(self, listener):
+        """Call listener(syllable, filepath) whenever a new take is saved"""
+        if listener not in self.recording_listeners:
+            self.recording_listeners.append(listener)
+    
+    def remove_recording_listener(self, listener):
+        """Stop calling a recording listener"""
+        if listener in self.recording_listeners:
+            self.recording_listeners.remove(listener)
+    
+    def _notify_recording(self, syllable, filepath):
+        filepath = self.recording_store.resolve(filepath)
+        for listener in list(self.recording_listeners):
+            try:
+                listener(syllable, filepath)
+            except Exception as e:
+                print(f"Recording listener error: {e}")
+    
+    @synchronized
     def load_progress(self):
-        """Load training progress from file"""
-        if os.path.exists(self.progress_file):
-            with open(self.progress_file, 'r', encoding='utf-8') as f:
-                self.progress = json.load(f)
+        """Load training progress (snapshot plus journaled takes)"""
+        self.feature_stats = {}
+        progress = self.progress_store.load()
+        self._open_vectors()
+        if progress is not None:
+            self.progress = progress
+            if self._migrate_features():
+                self.save_progress()
+            self.migrate_recording_paths()
         else:
             # Initialize progress for all syllables
-            self.progress = {
-                syllable: {
-                    'trained': False,
-                    'recordings': [],
-                    'quality_score': 0.0,
-                    'feature_vector': None
-                }
-                for syllable in self.syllable_list
-            }
+            self.progress = self._initial_progress()
             self.save_progress()
     
+    def _initial_progress(self):
+        """Progress with every syllable untrained"""
+        return {
+            syllable: {
+                'trained': False,
+                'recordings': [],
+                'quality_score': 0.0,
+                'vector_row': None
+            }
+            for syllable in self.syllable_list
+        }
+    
+    def _migrate_features(self):
+        """
+        Move feature lists of an older progress file into the feature files
+        Returns True if anything was moved
+        """
+        recordings = [rec for data in self.progress.values() for rec in data['recordings'] if 'features' in rec]
+        if recordings:
+            rows = self.take_features.append_many([rec.pop('features') for rec in recordings])
+            for recording, row in zip(recordings, rows):
+                recording['feature_row'] = row
+        
+        syllables = [data for data in self.progress.values() if 'feature_vector' in data]
+        for data in syllables:
+            vector = data.pop('feature_vector')
+            data['vector_row'] = self.syllable_vectors.append(vector) if vector is not None else None
+        
+        if recordings or syllables:
+            print(f"DEBUG: Moved features of {len(recordings)} recordings to {self.take_features.path}")
+        return bool(recordings or syllables)
+    
+    def _take_features(self, recording):
+        """Feature vector of a take (a row of the feature file, or the database's list)"""
+        if 'features' in recording:
+            return np.asarray(recording['features'])
+        return self.take_features.read(recording['feature_row'])
+    
+    def _syllable_vector(self, data):
+        """A syllable's average feature vector as float64, or None"""
+        if data.get('vector_row') is not None:
+            if data['vector_row'] >= len(self.syllable_vectors):
+                print(f"DEBUG: Vector row {data['vector_row']} is past the end of {self.syllable_vectors.path}")
+                return None
+            return np.array(self.syllable_vectors.read(data['vector_row']), dtype=np.float64)
+        if data.get('feature_vector') is not None:
+            return np.array(data['feature_vector'])
+        return None
+    
+    def _write_vector(self, vector):
+        """
+        Store a syllable vector in a new row (synced before it is returned)
+        Rows are never overwritten: the progress that points at the old row
+        stays valid until the event naming the new one is journaled
+        """
+        return self.syllable_vectors.append(vector)
+    
+    def _vector_path(self, generation):
+        name = 'syllable_vectors.f32' if generation == 0 else f'syllable_vectors-{generation}.f32'
+        return os.path.join(TRAINING_DATA_DIR, name)
+    
+    def _remove_vector_files(self, keep):
+        """Delete syllable vector files of generations not in keep"""
+        for name in os.listdir(TRAINING_DATA_DIR):
+            match = re.fullmatch(r'syllable_vectors(?:-(\d+))?\.f32', name)
+            if match and int(match.group(1) or 0) not in keep:
+                try:
+                    os.remove(os.path.join(TRAINING_DATA_DIR, name))
+                except OSError as e:
+                    print(f"DEBUG: Could not remove old vector file {name}: {e}")
+    
+    def _open_vectors(self):
+        """Open the vector file of the loaded generation; others are leftovers"""
+        generation = self.progress_store.generation
+        self.syllable_vectors = FeatureStore(self._vector_path(generation))
+        self._remove_vector_files({generation})
+    
+    def _pack_vectors(self, progress, generation):
+        """
+        Copy the syllable vectors into the next generation's file, one row per
+        syllable in progress order with trained ones first (before the snapshot
+        naming them is written)
+        """
+        packed = [(data, self._syllable_vector(data)) for data in progress.values()]
+        packed = sorted([(data, vector) for data, vector in packed if vector is not None],
+                        key=lambda item: not item[0]['trained'])
+        
+        path = self._vector_path(generation)
+        if os.path.exists(path):
+            os.remove(path)  # Left by a compaction that crashed before its snapshot
+        vectors = FeatureStore(path)
+        vectors.append_many(np.array([vector for _, vector in packed]).reshape(-1, vectors.dim))
+        
+        for data in progress.values():
+            data.pop('feature_vector', None)
+            data['vector_row'] = None
+        for row, (data, _) in enumerate(packed):
+            data['vector_row'] = row
+        self.syllable_vectors = vectors
+    
+    def _materialize(self, progress):
+        """Copy of progress with features inlined as lists (the training_progress.json interchange format)"""
+        if progress is None:
+            return None
+        result = {}
+        for syllable, data in progress.items():
+            vector = self._syllable_vector(data)
+            result[syllable] = {
+                'trained': data['trained'],
+                'recordings': [
+                    {**{k: v for k, v in rec.items() if k != 'feature_row'},
+                     'features': self._take_features(rec).tolist()}
+                    for rec in data['recordings']
+                ],
+                'quality_score': data['quality_score'],
+                'feature_vector': vector.tolist() if vector is not None else None
+            }
+        return result
+    
+    @synchronized
     def save_progress(self):
-        """Save training progress to file"""
-        with open(self.progress_file, 'w', encoding='utf-8') as f:
-            json.dump(self.progress, f, ensure_ascii=False, indent=2)
+        """Write a full snapshot of training progress (the database commits as it goes)"""
+        if self.database is None:
+            self.progress_store.compact(self.progress)
     
+    @synchronized
     def get_training_status(self):
         """Get overall training status"""
-        trained_count = sum(1 for data in self.progress.values() if data['trained'])
+        if self.database is not None:
+            trained_count, _ = self.database.status_counts()
+        else:
+            trained_count = sum(1 for data in self.progress.values() if data['trained'])
         total_count = len(self.syllable_list)
         completion_percentage = (trained_count / total_count) * 100
         
@@ -67,57 +271,269 @@ class SyllableTrainingSystem:
             'remaining': total_count - trained_count
         }
     
+    @synchronized
     def get_next_syllable_to_train(self):
         """Get the next syllable that needs training"""
+        if self.database is not None:
+            return self.database.next_untrained()
+        
         for syllable in self.syllable_list:
             if not self.progress[syllable]['trained']:
                 return syllable
         return None
     
+    @synchronized
     def save_syllable_recording(self, syllable, audio_data, label="correct"):
         """
         Save a training recording for a specific syllable
+        Returns the path of the stored audio file
         """
-        # Create syllable-specific directory
-        syllable_dir = os.path.join(SYLLABLES_DIR, syllable.replace('/', '_'))
-        os.makedirs(syllable_dir, exist_ok=True)
-        
-        # Generate filename
+        # Save audio under its content hash; an identical take is stored once
+        filepath, _ = self.recording_store.put_audio(audio_data, SAMPLE_RATE)
+        if self._get_take(syllable, filepath) is not None:
+            print(f"DEBUG: Identical take of {syllable} already stored")
+            return self.recording_store.resolve(filepath)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{label}_{timestamp}.wav"
-        filepath = os.path.join(syllable_dir, filename)
-        
-        # Save audio
-        sf.write(filepath, audio_data, SAMPLE_RATE)
         
         # Extract features
         features = self.analyzer.extract_features(audio_data)
         
-        # Update progress
-        self.progress[syllable]['recordings'].append({
+        recording = {
             'filepath': filepath,
             'timestamp': timestamp,
-            'label': label,
-            'features': features.tolist()
-        })
+            'label': label
+        }
         
-        # Calculate average feature vector
-        all_features = [rec['features'] for rec in self.progress[syllable]['recordings']]
-        avg_features = np.mean(all_features, axis=0)
-        self.progress[syllable]['feature_vector'] = avg_features.tolist()
+        self._add_take(syllable, recording, features)
+        self._notify_recording(syllable, filepath)
         
-        # Mark as trained if we have at least one recording
-        self.progress[syllable]['trained'] = True
-        self.progress[syllable]['quality_score'] = 1.0  # Can be improved with actual quality assessment
+        return self.recording_store.resolve(filepath)
+    
+    def store_recording_file(self, source):
+        """Copy an existing audio file into the recording store; returns its stored path"""
+        filepath, _ = self.recording_store.put_file(source)
+        return filepath
+    
+    @synchronized
+    def add_recordings(self, takes):
+        """
+        Store many (syllable, recording, features) takes at once: one
+        database transaction, or one progress snapshot instead of a
+        journal entry per take
+        Takes already stored under the same filepath are skipped
+        Returns number of takes stored
+        """
+        new_takes = []
+        seen = set()
+        for syllable, recording, features in takes:
+            key = (syllable, recording['filepath'])
+            if key not in seen and self._get_take(*key) is None:
+                seen.add(key)
+                new_takes.append((syllable, recording, features))
+        takes = new_takes
+        if not takes:
+            return 0
+        quality_score = 1.0
         
-        self.save_progress()
+        if self.database is not None:
+            entries = []
+            for syllable, recording, features in takes:
+                stats = self.get_feature_stats(syllable)
+                stats.add(features, recording['filepath'])
+                recording = dict(recording, features=np.asarray(features).tolist())
+                entries.append((syllable, recording, stats.reference_vector(), quality_score))
+            self.database.add_recordings(entries)
+        else:
+            rows = self.take_features.append_many([features for _, _, features in takes])
+            for (syllable, recording, features), row in zip(takes, rows):
+                self.get_feature_stats(syllable).add(features, recording['filepath'])
+                apply_event(self.progress, {
+                    'op': 'add_recording',
+                    'syllable': syllable,
+                    'recording': dict(recording, feature_row=row),
+                    'vector_row': self.progress.get(syllable, {}).get('vector_row'),
+                    'quality_score': quality_score
+                })
+            for syllable in {syllable for syllable, _, _ in takes}:
+                vector = self.get_feature_stats(syllable).reference_vector()
+                self.progress[syllable]['vector_row'] = self._write_vector(vector)
+            self.save_progress()
         
-        return filepath
+        for syllable, recording, _ in takes:
+            self._notify_recording(syllable, recording['filepath'])
+        return len(takes)
+    
+    def _add_take(self, syllable, recording, features):
+        """Store a take and update the syllable's running feature statistics"""
+        stats = self.get_feature_stats(syllable)
+        stats.add(features, recording['filepath'])
+        feature_vector = stats.reference_vector()
+        quality_score = 1.0  # Can be improved with actual quality assessment
+        
+        if self.database is not None:
+            recording = dict(recording, features=np.asarray(features).tolist())
+            self.database.add_recording(syllable, recording, feature_vector, quality_score)
+        else:
+            # A relabelled take keeps its feature row
+            if 'feature_row' not in recording:
+                recording = dict(recording, feature_row=self.take_features.append(features))
+            
+            # Update progress and journal the take (marks the syllable as trained)
+            event = {
+                'op': 'add_recording',
+                'syllable': syllable,
+                'recording': recording,
+                'vector_row': self._write_vector(feature_vector),
+                'quality_score': quality_score
+            }
+            apply_event(self.progress, event)
+            self.progress_store.append(event, self.progress)
+    
+    def _get_take(self, syllable, filepath):
+        """A stored take as a recording dict, or None"""
+        if self.database is not None:
+            return self.database.get_take(syllable, filepath)
+        for recording in self.progress.get(syllable, {}).get('recordings', []):
+            if recording['filepath'] == filepath:
+                return recording
+        return None
+    
+    def _remove_take(self, syllable, recording):
+        """Drop a take and update the syllable's running feature statistics"""
+        stats = self.get_feature_stats(syllable)
+        stats.remove(self._take_features(recording), recording['filepath'])
+        feature_vector = stats.reference_vector() if len(stats) else None
+        
+        if self.database is not None:
+            self.database.remove_recording(syllable, recording['filepath'], feature_vector)
+        else:
+            vector_row = self.progress[syllable].get('vector_row')
+            if feature_vector is not None:
+                vector_row = self._write_vector(feature_vector)
+            event = {
+                'op': 'remove_recording',
+                'syllable': syllable,
+                'filepath': recording['filepath'],
+                'vector_row': vector_row
+            }
+            apply_event(self.progress, event)
+            self.progress_store.append(event, self.progress)
+    
+    @synchronized
+    def get_feature_stats(self, syllable):
+        """
+        Running count/mean/variance of a syllable's take features
+        Built from the stored takes once, then updated in O(1) per take
+        """
+        stats = self.feature_stats.get(syllable)
+        if stats is None:
+            if self.database is not None:
+                takes = self.database.recording_takes(syllable)
+            else:
+                takes = [(rec['filepath'], self._take_features(rec))
+                         for rec in self.progress.get(syllable, {}).get('recordings', [])]
+            stats = SyllableFeatureStats.from_takes(takes, dim=FEATURE_DIM)
+            self.feature_stats[syllable] = stats
+        return stats
+    
+    @synchronized
+    def remove_recording(self, syllable, filepath, delete_file=False):
+        """
+        Remove one take of a syllable
+        The audio file is only deleted once no other take uses it
+        Returns True if the take existed
+        """
+        filepath = self.recording_store.key(filepath)
+        recording = self._get_take(syllable, filepath)
+        if recording is None:
+            return False
+        
+        self._remove_take(syllable, recording)
+        path = self.recording_store.resolve(filepath)
+        if delete_file and os.path.exists(path) and not self._filepath_in_use(filepath):
+            os.remove(path)
+        self._notify_recording(syllable, filepath)
+        return True
+    
+    def _filepath_in_use(self, filepath):
+        if self.database is not None:
+            return self.database.filepath_in_use(filepath)
+        return any(rec['filepath'] == filepath for data in self.progress.values() for rec in data['recordings'])
+    
+    @synchronized
+    def relabel_recording(self, filepath, from_syllable, to_syllable):
+        """
+        Move a take to another syllable (the audio file stays where it is)
+        Returns True if the take existed
+        """
+        filepath = self.recording_store.key(filepath)
+        recording = self._get_take(from_syllable, filepath)
+        if recording is None:
+            return False
+        
+        recording = dict(recording)
+        features = np.array(self._take_features(recording))
+        self._remove_take(from_syllable, recording)
+        if self._get_take(to_syllable, filepath) is None:
+            self._add_take(to_syllable, recording, features)
+        self._notify_recording(from_syllable, filepath)
+        self._notify_recording(to_syllable, filepath)
+        return True
+    
+    @synchronized
+    def recompute_features(self):
+        """
+        Re-extract features for every saved recording in one batched pass
+        Recordings whose audio file is missing keep their stored features
+        Returns number of recordings updated
+        """
+        if self.database is not None:
+            takes = [(recording_id, filepath) for recording_id, _, filepath in self.database.recordings()]
+        else:
+            takes = [((syllable, recording), recording['filepath'])
+                     for syllable, data in self.progress.items() for recording in data['recordings']]
+        
+        entries = []
+        segments = []
+        for key, filepath in takes:
+            filepath = self.recording_store.resolve(filepath)
+            if not os.path.exists(filepath):
+                print(f"DEBUG: Missing recording file {filepath}, skipping")
+                continue
+            audio, _ = self.analyzer.load_audio(filepath)
+            entries.append(key)
+            segments.append(audio)
+        
+        if not segments:
+            return 0
+        
+        features = self.analyzer.extract_features_batch(segments)
+        self.feature_stats = {}
+        if self.database is not None:
+            self.database.update_features(list(zip(entries, features)))
+            return len(entries)
+        
+        self.take_features.write_many([recording['feature_row'] for _, recording in entries], features)
+        
+        # Refresh the average feature vector of every touched syllable
+        for syllable in {syllable for syllable, _ in entries}:
+            vector = self.get_feature_stats(syllable).reference_vector()
+            self.progress[syllable]['vector_row'] = self._write_vector(vector)
+        
+        self.save_progress()
+        return len(entries)
     
+    @synchronized
     def get_syllable_reference(self, syllable):
         """
         Get the reference audio and features for a trained syllable
         """
+        if self.database is not None:
+            ref_data = self.database.get_reference(syllable)
+            if ref_data is not None:
+                ref_data['filepath'] = self.recording_store.resolve(ref_data['filepath'])
+            return ref_data
+        
         if syllable not in self.progress or not self.progress[syllable]['trained']:
             return None
         
@@ -129,54 +545,210 @@ class SyllableTrainingSystem:
         latest_recording = data['recordings'][-1]
         
         return {
-            'filepath': latest_recording['filepath'],
-            'features': np.array(data['feature_vector']),
+            'filepath': self.recording_store.resolve(latest_recording['filepath']),
+            'features': self._syllable_vector(data),
             'quality_score': data['quality_score']
         }
     
+    @synchronized
+    def migrate_recording_paths(self):
+        """
+        Move takes stored under absolute paths into the recording store
+        Files missing where they were are looked up under SYLLABLES_DIR by
+        their folder and file name (data copied from another machine); takes
+        found nowhere keep their path. Takes of a syllable that turn out to be
+        identical are merged
+        Files are copied into the store and the old ones inside the syllables
+        folder are only deleted once the new paths are saved, so a crash
+        mid-way leaves every take reachable
+        Returns number of takes migrated
+        """
+        if self.database is not None:
+            takes = [(recording_id, filepath) for recording_id, _, filepath in self.database.recordings()]
+        else:
+            takes = [((syllable, recording), recording['filepath'])
+                     for syllable, data in self.progress.items() for recording in data['recordings']]
+        takes = [(key, filepath) for key, filepath in takes if not self.recording_store.is_blob(filepath)]
+        if not takes:
+            return 0
+        
+        stored = {}  # Old path -> stored path (a file can back several takes)
+        updates = []
+        moved_sources = []  # Deleted after the new paths are saved
+        missing = 0
+        for key, filepath in takes:
+            if filepath not in stored:
+                source = self._locate_legacy_file(filepath)
+                if source is None:
+                    missing += 1
+                    continue
+                stored[filepath], _ = self.recording_store.put_file(source)
+                # Files inside the syllables folder are moved, anything else is kept
+                if os.path.abspath(source).startswith(os.path.abspath(SYLLABLES_DIR) + os.sep):
+                    moved_sources.append(source)
+            updates.append((key, stored[filepath]))
+        
+        if missing:
+            print(f"DEBUG: {missing} recordings not found, keeping their old paths")
+        if not updates:
+            return 0
+        
+        self.feature_stats = {}
+        if self.database is not None:
+            self.database.relocate_recordings(updates)
+        else:
+            for (syllable, recording), filepath in updates:
+                recording['filepath'] = filepath
+            
+            # Merge identical takes of a syllable
+            for syllable in {syllable for (syllable, _), _ in updates}:
+                data = self.progress[syllable]
+                seen = set()
+                recordings = []
+                for recording in data['recordings']:
+                    if recording['filepath'] not in seen:
+                        seen.add(recording['filepath'])
+                        recordings.append(recording)
+                if len(recordings) < len(data['recordings']):
+                    data['recordings'] = recordings
+                    data['vector_row'] = self._write_vector(self.get_feature_stats(syllable).reference_vector())
+            self.save_progress()
+        
+        for source in moved_sources:
+            try:
+                os.remove(source)
+            except OSError as e:
+                print(f"DEBUG: Could not remove migrated recording {source}: {e}")
+        
+        print(f"DEBUG: Moved {len(updates)} recordings into {self.recording_store.root}")
+        return len(updates)
+    
+    def _locate_legacy_file(self, filepath):
+        """An absolute recording path, or the same <folder>/<file> under SYLLABLES_DIR"""
+        if os.path.exists(filepath):
+            return filepath
+        parts = filepath.replace('\\', '/').split('/')
+        if len(parts) >= 2:
+            candidate = os.path.join(SYLLABLES_DIR, parts[-2], parts[-1])
+            if os.path.exists(candidate):
+                return candidate
+        return None
+    
+    @synchronized
+    def missing_recordings(self):
+        """Stored paths of takes whose audio file is not present"""
+        if self.database is not None:
+            paths = [filepath for _, _, filepath in self.database.recordings()]
+        else:
+            paths = [rec['filepath'] for data in self.progress.values() for rec in data['recordings']]
+        return self.recording_store.missing(paths)
+    
+    @synchronized
     def get_all_trained_syllables(self):
         """Get list of all trained syllables"""
+        if self.database is not None:
+            return self.database.trained_syllables()
         return [syl for syl, data in self.progress.items() if data['trained']]
     
+    @synchronized
+    def get_trained_references(self):
+        """{syllable: reference dict} of every trained syllable, read in one go"""
+        references = {}
+        for syllable in self.get_all_trained_syllables():
+            ref_data = self.get_syllable_reference(syllable)
+            if ref_data:
+                references[syllable] = ref_data
+        return references
+    
+    @synchronized
     def reset_training(self, syllable=None):
         """Reset training progress for a specific syllable or all syllables"""
+        if syllable:
+            self.feature_stats.pop(syllable, None)
+        else:
+            self.feature_stats = {}
+        if self.database is not None:
+            if syllable:
+                self.database.reset_syllable(syllable)
+            else:
+                self.database.reset_all()
+            return
+        
         if syllable:
             if syllable in self.progress:
                 self.progress[syllable] = {
                     'trained': False,
                     'recordings': [],
                     'quality_score': 0.0,
-                    'feature_vector': None
+                    'vector_row': None
                 }
+                self.progress_store.append(
+                    {'op': 'set_syllable', 'syllable': syllable, 'data': self.progress[syllable]},
+                    self.progress
+                )
         else:
-            self.load_progress()  # Reinitialize all
+            self.progress = self._initial_progress()  # Reinitialize all
+            self.save_progress()
+    
+    @synchronized
+    def get_training_features(self):
+        """
+        Trained syllables and their feature vectors as an (n, FEATURE_DIM) array
+        With the json backend this is a read-only view of the memory-mapped
+        vector file; it is a copy when takes were saved since the last
+        compaction
+        """
+        if self.database is not None:
+            syllables, features = self.database.trained_feature_vectors()
+            return syllables, np.array(features).reshape(-1, FEATURE_DIM)
         
-        self.save_progress()
+        syllables = []
+        rows = []
+        for syllable, data in self.progress.items():
+            if data['trained'] and data.get('vector_row') is not None:
+                syllables.append(syllable)
+                rows.append(data['vector_row'])
+        return syllables, self.syllable_vectors.rows_view(rows)
     
+    @synchronized
     def export_training_data(self, output_path=None):
         """Export all training data for ML model"""
         if output_path is None:
             output_path = os.path.join(TRAINING_DATA_DIR, 'syllable_features.npz')
+        if self.database is None and self.progress_store.journal_events:
+            self.save_progress()  # Packs the vector rows, so the features are read without a copy
         
-        syllables = []
-        features = []
-        labels = []
-        
-        for syllable, data in self.progress.items():
-            if data['trained'] and data['feature_vector']:
-                syllables.append(syllable)
-                features.append(data['feature_vector'])
-                labels.append(syllable)
+        syllables, features = self.get_training_features()
         
         # Save as numpy arrays
         np.savez(
             output_path,
             syllables=np.array(syllables),
-            features=np.array(features),
-            labels=np.array(labels)
+            features=features,
+            labels=np.array(syllables)
         )
         
         return output_path
+    
+    @synchronized
+    def export_progress_json(self, output_path):
+        """Write progress in the training_progress.json format"""
+        progress = self.database.export_progress() if self.database is not None else self._materialize(self.progress)
+        atomic_write_json(output_path, progress)
+        return output_path
+    
+    @synchronized
+    def import_progress_json(self, input_path):
+        """Replace progress with a training_progress.json-format file"""
+        progress = JournalProgressStore(input_path).load()
+        self.feature_stats = {}
+        if self.database is not None:
+            self.database.import_progress(progress)
+            self.database.ensure_syllables(self.syllable_list)
+        else:
+            self.progress = progress
+            self._migrate_features()
+            self.save_progress()
 
 
 if __name__ == "__main__":
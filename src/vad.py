@@ -0,0 +1,148 @@
+"""
+Energy/zero-crossing voice activity detection for capture-time trimming
+Frames are speech when they are loud enough above the calibrated noise
+floor, or slightly quieter but noisy like a fricative (ש, ס, ח)
+"""
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (SAMPLE_RATE, VAD_FRAME_MS, VAD_THRESHOLD_DB, VAD_MIN_LEVEL_DB, VAD_FRICATIVE_ZCR,
+                    VAD_MIN_SPEECH_MS, VAD_PADDING_MS, VAD_CALIBRATION_MS, VAD_TAKE_FLOOR_PERCENTILE)
+
+FRICATIVE_MARGIN_DB = 8.0  # How far below the speech threshold a noisy (high-ZCR) frame still counts
+
+
+class EnergyVAD:
+    """
+    Streaming voice activity detector
+    Feed captured blocks to process(); it tracks where speech starts and
+    ends (in samples from the start of the take) and, with auto_stop_ms,
+    reports when enough trailing silence has followed the speech
+    
+    Thresholds come from calibrate() with a noise-only sample; without it,
+    the quietest frames of the first VAD_CALIBRATION_MS of every take set
+    the noise floor, so speech that starts inside that sample is still found
+    """
+    
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=VAD_FRAME_MS, threshold_db=VAD_THRESHOLD_DB,
+                 min_speech_ms=VAD_MIN_SPEECH_MS, calibration_ms=VAD_CALIBRATION_MS):
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.threshold_db = threshold_db
+        self.min_speech_frames = max(1, int(np.ceil(min_speech_ms / frame_ms)))
+        self.calibration_frames = int(calibration_ms / frame_ms)
+        self.noise_floor_db = None
+        self.noise_zcr = 0.0
+        self.explicitly_calibrated = False
+        self.reset()
+    
+    def reset(self, auto_stop_ms=None):
+        """Start a new take"""
+        if not self.explicitly_calibrated:
+            self.noise_floor_db = None
+        self.auto_stop_samples = int(auto_stop_ms * self.sample_rate / 1000) if auto_stop_ms else None
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.position = 0  # Samples consumed as whole frames
+        self.noise_frames = []
+        self.speech_run = 0
+        self.speech_start = None
+        self.speech_end = None
+        self.stop_requested = False
+    
+    def frame_features(self, audio):
+        """Per-frame energy (dBFS) and zero-crossing rate of mono audio"""
+        n_frames = len(audio) // self.frame_length
+        frames = np.asarray(audio[:n_frames * self.frame_length], dtype=np.float32).reshape(n_frames, -1)
+        energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return energy_db, zcr
+    
+    def calibrate(self, noise_audio):
+        """Set the noise floor from a sample of background noise only"""
+        self._set_noise_floor(*self.frame_features(self._mono(noise_audio)))
+        self.explicitly_calibrated = True
+    
+    def _set_noise_floor(self, energy_db, zcr, percentile=90):
+        if len(energy_db) == 0:
+            return
+        self.noise_floor_db = float(np.percentile(energy_db, percentile))
+        # Zero-crossing rate of the quieter half only, so voiced or fricative speech cannot raise it
+        quiet = energy_db <= np.median(energy_db)
+        self.noise_zcr = float(np.percentile(zcr[quiet], 90))
+        print(f"DEBUG: VAD noise floor {self.noise_floor_db:.1f} dBFS")
+    
+    @property
+    def calibrated(self):
+        return self.noise_floor_db is not None
+    
+    def _mono(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        return block if block.ndim == 1 else block.mean(axis=1)
+    
+    def is_speech(self, energy_db, zcr):
+        """Speech decision per frame"""
+        threshold = max(self.noise_floor_db + self.threshold_db, VAD_MIN_LEVEL_DB)
+        fricative = (energy_db > threshold - FRICATIVE_MARGIN_DB) & (zcr > max(VAD_FRICATIVE_ZCR, 1.5 * self.noise_zcr))
+        return (energy_db > threshold) | fricative
+    
+    def process(self, block):
+        """
+        Feed captured audio (frames x channels, or mono)
+        Returns True once the take should stop automatically
+        """
+        samples = np.concatenate([self.pending, self._mono(block)])
+        energy_db, zcr = self.frame_features(samples)
+        consumed = len(energy_db) * self.frame_length
+        self.pending = samples[consumed:]
+        
+        start = 0
+        if not self.calibrated:
+            # Leading frames of the take serve as the noise sample
+            take = min(len(energy_db), self.calibration_frames - len(self.noise_frames))
+            self.noise_frames.extend(zip(energy_db[:take], zcr[:take]))
+            start = take
+            if len(self.noise_frames) >= self.calibration_frames:
+                energies, rates = (np.array(values) for values in zip(*self.noise_frames))
+                self._set_noise_floor(energies, rates, VAD_TAKE_FLOOR_PERCENTILE)
+                # The learner may already have started speaking inside the sample
+                self._detect(energies, rates, 0)
+        
+        if self.calibrated and start < len(energy_db):
+            self._detect(energy_db[start:], zcr[start:], self.position + start * self.frame_length)
+        
+        self.position += consumed
+        if (self.auto_stop_samples is not None and self.speech_end is not None
+                and self.position - self.speech_end >= self.auto_stop_samples):
+            self.stop_requested = True
+        return self.stop_requested
+    
+    def _detect(self, energy_db, zcr, first_sample):
+        """Extend the speech bounds with consecutive frames starting at first_sample"""
+        for i, voiced in enumerate(self.is_speech(energy_db, zcr)):
+            if voiced:
+                self.speech_run += 1
+                if self.speech_run >= self.min_speech_frames:
+                    frame_end = first_sample + (i + 1) * self.frame_length
+                    if self.speech_start is None:
+                        self.speech_start = frame_end - self.speech_run * self.frame_length
+                    self.speech_end = frame_end
+            else:
+                self.speech_run = 0
+    
+    def speech_bounds(self, total_samples, padding_ms=VAD_PADDING_MS):
+        """(start, end) sample range of the speech with padding, or None if no speech was found"""
+        if self.speech_start is None:
+            return None
+        padding = int(padding_ms * self.sample_rate / 1000)
+        return max(0, self.speech_start - padding), min(total_samples, self.speech_end + padding)
+    
+    def trim(self, audio, padding_ms=VAD_PADDING_MS):
+        """Offline: audio without leading and trailing silence (a view; unchanged if no speech)"""
+        self.reset()
+        self.process(audio)
+        bounds = self.speech_bounds(len(audio), padding_ms)
+        if bounds is None:
+            return audio
+        return audio[bounds[0]:bounds[1]]
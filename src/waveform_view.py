@@ -0,0 +1,326 @@
+"""
+Waveform display for long recordings
+WaveformPyramid keeps per-block min/max of the audio at several
+resolutions, built once (or appended to while recording), so drawing any
+zoom level reads about one entry per pixel instead of every sample.
+WaveformView draws it on a Tk canvas with syllable and correction overlays
+"""
+import numpy as np
+import threading
+import tkinter as tk
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (SAMPLE_RATE, THEME_COLOR, WAVEFORM_BASE_BLOCK, WAVEFORM_LEVEL_FACTOR, WAVEFORM_HEIGHT,
+                    WAVEFORM_LIVE_REDRAW_MS)
+
+
+class WaveformPyramid:
+    """
+    Multi-resolution min/max summary of a mono signal
+    Level k has one (min, max) entry per base_block * factor**k samples;
+    the last entry of every level may cover a partial block and is
+    rewritten as audio is appended
+    """
+    
+    def __init__(self, sample_rate=SAMPLE_RATE, base_block=WAVEFORM_BASE_BLOCK, factor=WAVEFORM_LEVEL_FACTOR):
+        self.sample_rate = sample_rate
+        self.base_block = base_block
+        self.factor = factor
+        self.levels = []  # (capacity, 2) float32 arrays of (min, max)
+        self.counts = []  # Entries in use per level
+        self.total_samples = 0
+        self.pending = np.zeros(0, dtype=np.float32)  # Samples of the partial last base block
+        self.audio = None  # Full-resolution samples, when known, for zooming past base_block
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def from_audio(cls, audio, **kwargs):
+        """Pyramid of a whole recording (kept for full-resolution zoom)"""
+        pyramid = cls(**kwargs)
+        pyramid.append(audio)
+        pyramid.audio = pyramid._mono(audio)
+        return pyramid
+    
+    def _mono(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim == 1:
+            return samples
+        return samples[:, 0] if samples.shape[1] == 1 else samples.mean(axis=1)
+    
+    def entry_samples(self, level):
+        """Samples summarized by one entry of a level"""
+        return self.base_block * self.factor ** level
+    
+    def _write(self, level, start, rows):
+        """Store rows at entries start.. of a level, growing it as needed"""
+        if level == len(self.levels):
+            self.levels.append(np.zeros((max(16, len(rows)), 2), dtype=np.float32))
+            self.counts.append(0)
+        
+        end = start + len(rows)
+        data = self.levels[level]
+        if end > len(data):
+            grown = np.zeros((max(end, 2 * len(data)), 2), dtype=np.float32)
+            grown[:self.counts[level]] = data[:self.counts[level]]
+            self.levels[level] = data = grown
+        data[start:end] = rows
+        self.counts[level] = end
+    
+    def _reduce(self, rows, group):
+        """Min/max over consecutive groups of rows (the last group may be short)"""
+        starts = np.arange(0, len(rows), group)
+        return np.stack([np.minimum.reduceat(rows[:, 0], starts), np.maximum.reduceat(rows[:, 1], starts)], axis=1)
+    
+    def append(self, samples):
+        """Add audio (mono, or frames x channels) after what is already summarized"""
+        samples = self._mono(samples)
+        if len(samples) == 0:
+            return
+        
+        with self.lock:
+            first_entry = (self.total_samples - len(self.pending)) // self.base_block
+            audio = np.concatenate([self.pending, samples])
+            self.total_samples += len(samples)
+            
+            # Level 0 straight from the samples: full blocks, then the partial one
+            full = len(audio) // self.base_block * self.base_block
+            blocks = audio[:full].reshape(-1, self.base_block)
+            rows = np.stack([blocks.min(axis=1), blocks.max(axis=1)], axis=1)
+            self.pending = audio[full:].copy()
+            if len(self.pending):
+                rows = np.vstack([rows, [[self.pending.min(), self.pending.max()]]])
+            self._write(0, first_entry, rows)
+            
+            # Each coarser level: recompute only the entries over changed children
+            level = 1
+            changed = first_entry
+            while self.counts[level - 1] > 1:
+                changed //= self.factor
+                children = self.levels[level - 1][changed * self.factor:self.counts[level - 1]]
+                self._write(level, changed, self._reduce(children, self.factor))
+                level += 1
+    
+    def duration(self):
+        return self.total_samples / self.sample_rate
+    
+    def peak(self):
+        """Largest absolute sample value (from the coarsest level)"""
+        with self.lock:
+            if not self.levels:
+                return 0.0
+            top = self.levels[-1][:self.counts[-1]]
+            return float(max(-top[:, 0].min(), top[:, 1].max()))
+    
+    def query(self, start_sample, end_sample, width):
+        """
+        Per-pixel (mins, maxs) of samples start_sample..end_sample drawn
+        across width pixels; pixels past the end of the audio are NaN
+        Reads O(width) entries from the level whose blocks fit one pixel
+        """
+        width = max(1, int(width))
+        mins = np.full(width, np.nan, dtype=np.float32)
+        maxs = np.full(width, np.nan, dtype=np.float32)
+        
+        with self.lock:
+            available = min(end_sample, self.total_samples)
+            if available <= start_sample or not self.levels:
+                return mins, maxs
+            
+            samples_per_pixel = (end_sample - start_sample) / width
+            columns = min(width, int(np.ceil((available - start_sample) / samples_per_pixel - 1e-9)))
+            edges = start_sample + np.arange(columns + 1) * samples_per_pixel
+            edges[-1] = min(edges[-1], available)
+            
+            raw = samples_per_pixel < self.base_block and self.audio is not None
+            if raw:
+                # Zoomed in past the pyramid: read the samples, about one per pixel
+                entry_size = 1
+                entries = self.total_samples
+            else:
+                level = 0
+                while (level + 1 < len(self.levels)
+                       and self.entry_samples(level + 1) <= samples_per_pixel):
+                    level += 1
+                entry_size = self.entry_samples(level)
+                entries = self.counts[level]
+            
+            # Entries overlapping each pixel: first..last-1 (at least one)
+            first = np.minimum((edges[:-1] // entry_size).astype(np.int64), entries - 1)
+            last = np.maximum(np.ceil(edges[1:] / entry_size).astype(np.int64), first + 1)
+            if raw:
+                samples = self.audio[first[0]:last[-1]]
+                span = np.stack([samples, samples], axis=1)
+            else:
+                span = self.levels[level][first[0]:last[-1]]
+            starts = first - first[0]
+            # reduceat covers first[i]..first[i+1]-1 (just first[i] where they are equal)...
+            pixel_min = np.minimum.reduceat(span[:, 0], starts)
+            pixel_max = np.maximum.reduceat(span[:, 1], starts)
+            # ...so add the entry a pixel shares with the next one
+            shared = np.nonzero(last[:-1] > first[1:])[0]
+            pixel_min[shared] = np.minimum(pixel_min[shared], span[starts[shared + 1], 0])
+            pixel_max[shared] = np.maximum(pixel_max[shared], span[starts[shared + 1], 1])
+        
+        mins[:columns] = pixel_min
+        maxs[:columns] = pixel_max
+        return mins, maxs
+
+
+class WaveformView(tk.Canvas):
+    """
+    Canvas drawing a recording from its WaveformPyramid
+    Syllables found by the corrector are marked by their onsets (coloured by
+    quality) and corrected syllables are shaded. The mouse wheel zooms
+    around the pointer, dragging pans, and a double-click shows everything
+    """
+    
+    def __init__(self, parent, height=WAVEFORM_HEIGHT, sample_rate=SAMPLE_RATE, **kwargs):
+        super().__init__(parent, height=height, background='white', highlightthickness=0, **kwargs)
+        self.sample_rate = sample_rate
+        self.pyramid = WaveformPyramid(sample_rate)
+        self.view = None  # (start, end) sample range, or None for the whole recording
+        self.syllables = []
+        self.corrections = []
+        self.live = False
+        self.redraw_pending = False
+        self.drag = None
+        
+        self.bind('<Configure>', lambda event: self.request_redraw())
+        self.bind('<MouseWheel>', lambda event: self.zoom(0.8 if event.delta > 0 else 1.25, event.x))
+        self.bind('<Button-4>', lambda event: self.zoom(0.8, event.x))
+        self.bind('<Button-5>', lambda event: self.zoom(1.25, event.x))
+        self.bind('<ButtonPress-1>', self.on_press)
+        self.bind('<B1-Motion>', self.on_drag)
+        self.bind('<Double-Button-1>', lambda event: self.show_all())
+    
+    def set_audio(self, audio):
+        """Show a finished recording"""
+        self.live = False
+        self.pyramid = WaveformPyramid.from_audio(audio, sample_rate=self.sample_rate)
+        self.set_overlays([], [])
+        self.show_all()
+    
+    def start_live(self):
+        """Start an empty recording that append() extends; redrawn periodically"""
+        self.pyramid = WaveformPyramid(self.sample_rate)
+        self.set_overlays([], [])
+        self.view = None
+        self.live = True
+        self._live_tick()
+    
+    def append(self, block):
+        """Add captured audio (safe to call from the recording threads)"""
+        self.pyramid.append(block)
+    
+    def stop_live(self, audio=None):
+        """Stop following the recording; audio is its full take, for fine zoom"""
+        self.live = False
+        if audio is not None:
+            if len(audio) == self.pyramid.total_samples:
+                self.pyramid.audio = self.pyramid._mono(audio)
+            else:
+                # Blocks were dropped on the way: summarize the take itself
+                self.pyramid = WaveformPyramid.from_audio(audio, sample_rate=self.sample_rate)
+        self.request_redraw()
+    
+    def _live_tick(self):
+        if self.live:
+            self.request_redraw()
+            self.after(WAVEFORM_LIVE_REDRAW_MS, self._live_tick)
+    
+    def set_overlays(self, syllables, corrections):
+        """Replace the syllable and correction marks (AudioCorrector report entries)"""
+        self.syllables = list(syllables)
+        self.corrections = list(corrections)
+        self.request_redraw()
+    
+    def add_syllable(self, syllable):
+        self.syllables.append(syllable)
+        self.request_redraw()
+    
+    def add_correction(self, correction):
+        self.corrections.append(correction)
+        self.request_redraw()
+    
+    def view_range(self):
+        """(start, end) samples currently shown"""
+        if self.view is None:
+            return 0, max(1, self.pyramid.total_samples)
+        return self.view
+    
+    def show_all(self):
+        self.view = None
+        self.request_redraw()
+    
+    def zoom(self, factor, x):
+        """Scale the visible span by factor, keeping the sample under pixel x in place"""
+        width = max(1, self.winfo_width())
+        total = self.pyramid.total_samples
+        start, end = self.view_range()
+        anchor = start + (end - start) * x / width
+        span = min(max((end - start) * factor, width), total)
+        if span >= total:
+            self.show_all()
+            return
+        start = min(max(0, anchor - span * x / width), total - span)
+        self.view = (start, start + span)
+        self.request_redraw()
+    
+    def on_press(self, event):
+        self.drag = (event.x, self.view_range())
+    
+    def on_drag(self, event):
+        if self.drag is None or self.view is None:
+            return
+        x, (start, end) = self.drag
+        shift = (x - event.x) * (end - start) / max(1, self.winfo_width())
+        shift = min(max(shift, -start), self.pyramid.total_samples - end)
+        self.view = (start + shift, end + shift)
+        self.request_redraw()
+    
+    def request_redraw(self):
+        """Redraw once the event loop is idle (repeated requests coalesce)"""
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.after_idle(self.redraw)
+    
+    def _x(self, seconds, start, end, width):
+        return (seconds * self.sample_rate - start) * width / (end - start)
+    
+    def redraw(self):
+        """Draw the visible range: one pyramid query and one polyline, O(pixels)"""
+        self.redraw_pending = False
+        self.delete('all')
+        width = max(1, self.winfo_width())
+        height = max(1, self.winfo_height())
+        start, end = self.view_range()
+        
+        # Corrected syllables shaded behind the waveform
+        for correction in self.corrections:
+            x0 = self._x(correction['start_time'], start, end, width)
+            x1 = self._x(correction['end_time'], start, end, width)
+            if x1 >= 0 and x0 <= width:
+                self.create_rectangle(x0, 0, x1, height, fill='#F8D7DA', outline='')
+        
+        mins, maxs = self.pyramid.query(start, end, width)
+        columns = np.nonzero(~np.isnan(mins))[0]
+        if len(columns):
+            middle = height / 2
+            scale = (middle - 2) / max(self.pyramid.peak(), 1e-3)
+            # Zigzag through each column's max and min: one canvas item for the whole trace
+            points = np.empty((len(columns), 4), dtype=np.float32)
+            points[:, 0] = points[:, 2] = columns
+            points[:, 1] = middle - maxs[columns] * scale
+            points[:, 3] = middle - mins[columns] * scale
+            self.create_line(*points.ravel().tolist(), fill=THEME_COLOR)
+        
+        # Syllable onsets, coloured like the quality marks in the results
+        for syllable in self.syllables:
+            x = self._x(syllable['start_time'], start, end, width)
+            if 0 <= x <= width:
+                quality = syllable.get('quality_score', 1.0)
+                color = '#2E7D32' if quality >= 0.85 else '#EF6C00' if quality >= 0.70 else '#C62828'
+                self.create_line(x, 0, x, height, fill=color, dash=(2, 2))
+                if syllable.get('matched_syllable'):
+                    self.create_text(x + 2, 2, text=syllable['matched_syllable'], anchor='nw', fill=color)
@@ -188,6 +188,1546 @@ def test_feature_extraction():
         return False
 
 
+def make_syllable_audio(duration=3.0, sample_rate=22050, seed=0):
+    """Synthetic speech-like audio: voiced bursts separated by short pauses"""
+    import numpy as np
+    
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    audio = 0.003 * rng.standard_normal(len(t))
+    position = 0.1
+    while position < duration - 0.3:
+        length = rng.uniform(0.12, 0.25)
+        mask = (t >= position) & (t < position + length)
+        envelope = np.sin(np.pi * (t[mask] - position) / length)
+        f0 = rng.uniform(100, 200)
+        audio[mask] += envelope * (0.5 * np.sin(2 * np.pi * f0 * t[mask])
+                                   + 0.3 * np.sin(2 * np.pi * 3 * f0 * t[mask]))
+        position += length + rng.uniform(0.03, 0.1)
+    return audio.astype(np.float32)
+
+
+def test_shared_stft_features():
+    """Test that shared-STFT analysis matches per-syllable feature extraction"""
+    print("\nTesting shared-STFT feature extraction...")
+    
+    import numpy as np
+    from src.syllable_analyzer import SyllableAnalyzer
+    
+    import librosa
+
+    audio = make_syllable_audio()
+    analyzer = SyllableAnalyzer(shared_stft=True)
+    calls = {'stft': 0, 'fallback': 0}
+    stft, extract_features = librosa.stft, analyzer.extract_features
+    def counting_stft(*args, **kwargs):
+        calls['stft'] += 1
+        return stft(*args, **kwargs)
+    def counting_extract_features(segment):
+        calls['fallback'] += 1
+        return extract_features(segment)
+    librosa.stft, analyzer.extract_features = counting_stft, counting_extract_features
+    try:
+        shared = analyzer.analyze_audio(audio)
+    finally:
+        librosa.stft = stft
+    separate = SyllableAnalyzer(shared_stft=False).analyze_audio(audio)
+
+    assert len(shared) == len(separate) > 0, "Syllable count differs"
+    for a, b in zip(shared, separate):
+        assert a['features'].shape == (29,)
+        assert np.allclose(a['features'], b['features'], rtol=1e-4, atol=1e-3), "Features differ"
+    # Onsets are frame-aligned, so no syllable falls back to its own STFT:
+    # one for the recording, one for all syllable edges
+    assert all(s['start_sample'] % 512 == 0 for s in shared), "Onset start not frame-aligned"
+    assert calls == {'stft': 2, 'fallback': 0}, calls
+
+    print(f"✓ Shared-STFT features match ({len(shared)} syllables)")
+
+
+def test_batch_feature_extraction():
+    """Test that batched extraction matches per-segment extraction"""
+    print("\nTesting batched feature extraction...")
+    
+    import numpy as np
+    from src.syllable_analyzer import SyllableAnalyzer
+    
+    audio = make_syllable_audio(duration=5.0)
+    rng = np.random.default_rng(1)
+    segments = [audio[:300]]
+    for _ in range(20):
+        start = rng.integers(0, len(audio) - 20000)
+        segments.append(audio[start:start + rng.integers(600, 20000)])
+    
+    analyzer = SyllableAnalyzer()
+    batch = analyzer.extract_features_batch(segments)
+    single = np.array([analyzer.extract_features(s) for s in segments])
+    
+    assert batch.shape == (len(segments), 29) and batch.dtype == np.float32
+    assert np.allclose(batch, single, rtol=1e-4, atol=1e-3), "Batched features differ"
+    
+    print(f"✓ Batched features match ({len(segments)} segments)")
+
+
+def test_reference_matching():
+    """Test that batched reference matching agrees with pairwise comparison"""
+    print("\nTesting reference matching...")
+    
+    import numpy as np
+    from src.pronunciation_model import PronunciationModel
+    
+    rng = np.random.default_rng(0)
+    references = rng.normal(size=(30, 29)) * 10
+    model = PronunciationModel()
+    for i, features in enumerate(references):
+        model.add_syllable_reference(f"syllable_{i}", features)
+    
+    queries = references[:5] + rng.normal(size=(5, 29))
+    matches = model.match_features(queries, top_k=3)
+    
+    for query, match in zip(queries, matches):
+        scores = {name: model.compare_syllables(query, ref['features'])
+                  for name, ref in model.syllable_references.items()}
+        best = max(scores, key=scores.get)
+        assert match['best_match'] == best, "Best match differs"
+        assert abs(match['quality_score'] - scores[best]) < 1e-5, "Score differs"
+        assert len(match['matches']) == 3 and match['margin'] >= 0
+    
+    # Re-recording overwrites the syllable's row in the embedding index
+    model.add_syllable_reference("syllable_0", references[1])
+    assert len(model.reference_index) == len(references), "Re-record appended a row"
+    assert model.assess_pronunciation(references[1], "syllable_0")['quality_score'] > 0.999
+
+    # The index refuses rows of another width instead of dropping the others
+    from src.pronunciation_model import ReferenceIndex
+    index = ReferenceIndex()
+    index.upsert("a", np.ones(29))
+    try:
+        index.upsert("b", np.ones(8))
+        assert False, "Mismatched row accepted"
+    except ValueError:
+        pass
+    assert index.names == ["a"] and index.matrix().shape == (1, 29)
+
+    # A network swapped in without invalidating: the next reference rebuilds every row
+    from src.embedding_net import SyllableEmbeddingNet
+    model.model = SyllableEmbeddingNet(input_dim=29).eval()
+    model.add_syllable_reference("syllable_30", references[2])
+    names, matrix = model.get_reference_matrix()
+    assert len(names) == len(references) + 1 and matrix.shape[1] == model.embed_features(references[:1]).shape[1]
+
+    # Embedding leaves the network's mode alone; new networks start in inference mode
+    assert not model.create_model().training
+    model.model.train()
+    model.embed_features(queries)
+    assert model.model.training, "Embedding switched the network to eval mode"
+
+    print(f"✓ Reference matching agrees with pairwise comparison")
+
+
+def test_streaming_segmentation():
+    """Test that streaming segmentation finds the offline syllables with bounded lag"""
+    print("\nTesting streaming segmentation...")
+    
+    import numpy as np
+    from src.syllable_analyzer import SyllableAnalyzer
+    from src.streaming_segmenter import StreamingSyllableSegmenter
+    
+    audio = make_syllable_audio(duration=4.0)
+    analyzer = SyllableAnalyzer()
+    offline = analyzer.analyze_audio(audio)
+    
+    segmenter = StreamingSyllableSegmenter(analyzer=analyzer)
+    streamed = []
+    lags = []
+    for start in range(0, len(audio), 1024):
+        finalized = segmenter.process_chunk(audio[start:start + 1024])
+        lags.extend(s['finalized_time'] - s['end_time'] for s in finalized)
+        streamed.extend(finalized)
+    streamed.extend(segmenter.flush())
+    
+    assert len(streamed) == len(offline), f"{len(streamed)} vs {len(offline)} syllables"
+    for a, b in zip(streamed, offline):
+        assert abs(a['end_time'] - b['end_time']) < 0.001, "Boundary differs"
+        assert a['features'].shape == (29,)
+        assert np.array_equal(a['audio'], b['audio']), f"Syllable {a['index']} audio differs"
+        assert np.allclose(a['features'], b['features'], rtol=1e-4, atol=1e-3), \
+            f"Syllable {a['index']} features differ"
+    assert lags and max(lags) < 0.25, f"Lag too large: {max(lags):.3f}s"
+    
+    # A sustained sound with no new onset must not grow the buffer without bound
+    t = np.arange(int(12 * analyzer.sample_rate)) / analyzer.sample_rate
+    hum = np.concatenate([np.zeros(analyzer.sample_rate // 2), 0.3 * np.sin(2 * np.pi * 220 * t)]).astype(np.float32)
+    segmenter.reset()
+    retained = 0
+    allocations = set()
+    for start in range(0, len(hum), 1024):
+        segmenter.process_chunk(hum[start:start + 1024])
+        retained = max(retained, len(segmenter.audio))
+        allocations.add((id(segmenter.audio_buffer.data), id(segmenter.magnitude_buffer.data),
+                         id(segmenter.mel_power_buffer.data)))
+    segmenter.flush()
+    limit = (analyzer.max_syllable_duration + 0.5) * analyzer.sample_rate
+    assert retained < limit, f"Retained {retained / analyzer.sample_rate:.1f}s of audio"
+    # Chunks are copied into the preallocated buffers, never reallocated
+    assert len(allocations) == 1, f"Buffers reallocated {len(allocations) - 1} times"
+    
+    print(f"✓ Streaming segmentation matches offline ({len(streamed)} syllables, "
+          f"max lag {max(lags) * 1000:.0f} ms)")
+
+
+def test_streaming_correction():
+    """Test the streaming corrector end to end from a WAV file"""
+    print("\nTesting streaming correction...")
+    
+    import tempfile
+    import numpy as np
+    import soundfile as sf
+    import src.pronunciation_model as pronunciation_model
+    from src.syllable_analyzer import SyllableAnalyzer
+    from src.audio_corrector import AudioCorrector
+    from src.streaming_corrector import StreamingCorrector
+    from config import SAMPLE_RATE
+    
+    class ReferenceFiles:
+        """Minimal stand-in for SyllableTrainingSystem"""
+        def __init__(self):
+            self.references = {}
+        
+        def get_syllable_reference(self, syllable):
+            return self.references.get(syllable)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        references = ReferenceFiles()
+        model = pronunciation_model.PronunciationModel()
+        analyzer = SyllableAnalyzer()
+        for i, syllable in enumerate(analyzer.analyze_audio(make_syllable_audio(duration=3.0, seed=1))):
+            filepath = os.path.join(temp_dir, f"reference_{i}.wav")
+            sf.write(filepath, syllable['audio'], SAMPLE_RATE)
+            references.references[f"syllable_{i}"] = {'filepath': filepath, 'features': syllable['features']}
+            model.add_syllable_reference(f"syllable_{i}", syllable['features'])
+        corrector = AudioCorrector(model, references)
+        
+        audio = make_syllable_audio(duration=4.0)
+        input_path = os.path.join(temp_dir, "input.wav")
+        sf.write(input_path, audio, SAMPLE_RATE)
+        
+        # Flag every syllable so each one gets replaced
+        threshold = pronunciation_model.SIMILARITY_THRESHOLD
+        pronunciation_model.SIMILARITY_THRESHOLD = 1.01
+        try:
+            # Default delay: every syllable is replaced whole
+            streaming = StreamingCorrector(corrector)
+            corrected, report = streaming.run_file(input_path)
+            
+            short_streaming = StreamingCorrector(corrector, delay_ms=300)
+            short_corrected, short_report = short_streaming.run_file(input_path)
+            
+            late_streaming = StreamingCorrector(corrector, delay_ms=0)
+            passthrough, late_report = late_streaming.run_file(input_path)
+        finally:
+            pronunciation_model.SIMILARITY_THRESHOLD = threshold
+        
+        recorded, _ = sf.read(input_path, dtype='float32')
+        expected = corrector.render_corrections(recorded, [
+            (syllable, corrector.get_replacement_audio(syllable['matched_syllable']))
+            for syllable in streaming.assessed_syllables
+        ])
+        
+        assert len(corrected) == len(audio), "Output length differs from input"
+        assert report['syllables'] > 0 and report['corrections'] == report['syllables']
+        assert np.allclose(corrected, expected, atol=1e-5), "Spliced output differs"
+        assert report['late_corrections'] == 0, "Default delay should not be late"
+        # A short delay still replaces the unplayed tail of late syllables
+        assert short_report['late_corrections'] > 0 and short_report['partial_corrections'] > 0
+        assert len(short_corrected) == len(audio)
+        for entry in short_streaming.corrections:
+            if entry['partial']:
+                start = int(round(entry['start_time'] * SAMPLE_RATE))
+                assert np.array_equal(short_corrected[start:start + 1], recorded[start:start + 1]), \
+                    "Played part of a late syllable changed"
+        assert late_report['late_corrections'] == late_report['syllables'], "Zero delay should be late"
+        assert np.array_equal(passthrough, recorded), "Late output changed"
+        
+        print(f"✓ Streaming correction ({report['corrections']} corrections, "
+              f"max decision {report['decision_ms_max']:.1f} ms, max lag {report['lag_ms_max']:.0f} ms)")
+
+
+def test_reference_audio_cache():
+    """Test the reference waveform cache and its invalidation by new takes"""
+    print("\nTesting reference audio cache...")
+    
+    import tempfile
+    import numpy as np
+    import src.training_system as training_module
+    from src.pronunciation_model import PronunciationModel
+    from src.audio_corrector import AudioCorrector
+    
+    # Keep the test's takes out of the real data directory
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        training_module.SYLLABLES_DIR = os.path.join(temp_dir, 'syllables')
+        training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, 'training_data')
+        try:
+            training_system = training_module.SyllableTrainingSystem()
+            corrector = AudioCorrector(PronunciationModel(), training_system)
+            syllable = training_system.syllable_list[0]
+            
+            training_system.save_syllable_recording(syllable, make_syllable_audio(duration=0.3, seed=1))
+            first = corrector.get_replacement_audio(syllable)
+            second = corrector.get_replacement_audio(syllable)
+            assert first is second and first.dtype == np.float32
+            assert (corrector.reference_cache.hits, corrector.reference_cache.misses) == (1, 1)
+            
+            # A new take must not be served from the old cached waveform
+            new_take = make_syllable_audio(duration=0.4, seed=2)
+            training_system.save_syllable_recording(syllable, new_take)
+            assert len(corrector.reference_cache) == 0, "New take did not invalidate the cache"
+            third = corrector.get_replacement_audio(syllable)
+            assert len(third) == len(new_take) and corrector.reference_cache.misses == 2
+            
+            # Byte bound evicts the least recently used waveform
+            corrector.reference_cache.max_bytes = third.nbytes
+            training_system.save_syllable_recording(training_system.syllable_list[1], new_take)
+            corrector.get_replacement_audio(training_system.syllable_list[1])
+            assert len(corrector.reference_cache) == 1
+            assert corrector.reference_cache.current_bytes <= corrector.reference_cache.max_bytes
+            
+            # Lookups on several threads while another invalidates (as the save worker does)
+            import threading
+            from src.audio_corrector import ReferenceAudioCache
+            
+            filepaths = []
+            for seed, name in enumerate(training_system.syllable_list[2:6]):
+                training_system.save_syllable_recording(name, make_syllable_audio(duration=0.2, seed=seed))
+                filepaths.append(training_system.get_syllable_reference(name)['filepath'])
+            cache = ReferenceAudioCache(max_bytes=3 * 0.2 * 22050 * 4)
+            errors = []
+            
+            def lookups(offset):
+                try:
+                    for i in range(60):
+                        cache.get(filepaths[(i + offset) % len(filepaths)])
+                except Exception as e:
+                    errors.append(e)
+            
+            def invalidations():
+                try:
+                    for i in range(200):
+                        cache.invalidate(filepath=filepaths[i % len(filepaths)])
+                except Exception as e:
+                    errors.append(e)
+            
+            threads = [threading.Thread(target=lookups, args=(offset,)) for offset in range(3)]
+            threads.append(threading.Thread(target=invalidations))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert not errors, f"Concurrent cache use failed: {errors[0]!r}"
+            assert cache.current_bytes == sum(audio.nbytes for audio, _ in cache.entries.values())
+            assert cache.current_bytes <= cache.max_bytes
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+        
+        print(f"✓ Reference audio cache ({corrector.reference_cache.stats()})")
+
+
+def test_reference_bank():
+    """Test the packed, memory-mapped reference bank"""
+    print("\nTesting reference bank...")
+    
+    import tempfile
+    import numpy as np
+    import src.training_system as training_module
+    from src.pronunciation_model import PronunciationModel
+    from src.audio_corrector import AudioCorrector
+    from src.reference_bank import ReferenceBank, build_reference_bank
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        training_module.SYLLABLES_DIR = os.path.join(temp_dir, 'syllables')
+        training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, 'training_data')
+        try:
+            training_system = training_module.SyllableTrainingSystem()
+            syllables = training_system.syllable_list[:3]
+            for seed, syllable in enumerate(syllables):
+                training_system.save_syllable_recording(syllable, make_syllable_audio(duration=0.3, seed=seed))
+            
+            bank_dir = os.path.join(temp_dir, 'reference_bank')
+            build_reference_bank(training_system, bank_dir=bank_dir)
+            corrector = AudioCorrector(PronunciationModel(), training_system)
+            corrector.reference_bank = ReferenceBank(bank_dir=bank_dir)
+            assert len(corrector.reference_bank) == len(syllables)
+            
+            # Bank slices are read-only views of the memory map, equal to the decoded files
+            for syllable in syllables:
+                packed = corrector.get_replacement_audio(syllable)
+                assert isinstance(packed, np.memmap) and not packed.flags.writeable
+                decoded = corrector.reference_cache.get(training_system.get_syllable_reference(syllable)['filepath'])
+                assert np.array_equal(packed, decoded), "Packed audio differs"
+            
+            # A newer take is not in the bank, so it comes from the file
+            training_system.save_syllable_recording(syllables[0], make_syllable_audio(duration=0.5, seed=9))
+            assert not isinstance(corrector.get_replacement_audio(syllables[0]), np.memmap)
+            
+            # A packed take keeps working after its WAV file is gone
+            os.remove(training_system.get_syllable_reference(syllables[1])['filepath'])
+            assert isinstance(corrector.get_replacement_audio(syllables[1]), np.memmap)
+            
+            # A build that crashed before its index was written leaves the old bank usable
+            index_path = os.path.join(bank_dir, 'references.json')
+            with open(index_path, 'rb') as f:
+                old_index = f.read()
+            build_reference_bank(training_system, bank_dir=bank_dir)
+            with open(index_path, 'wb') as f:
+                f.write(old_index)
+            assert len(ReferenceBank(bank_dir=bank_dir)) == 0, "Old index served from removed audio"
+            index = build_reference_bank(training_system, bank_dir=bank_dir)
+            assert [name for name in os.listdir(bank_dir) if name.endswith('.f32')] == [index['audio_file']]
+            with open(os.path.join(bank_dir, 'references-1.f32'), 'wb') as f:
+                f.write(b'partial new build')
+            assert len(ReferenceBank(bank_dir=bank_dir)) == len(syllables) - 1
+            
+            # Audio that does not match the index is never sliced
+            with open(os.path.join(bank_dir, index['audio_file']), 'r+b') as f:
+                f.truncate(16)
+            assert len(ReferenceBank(bank_dir=bank_dir)) == 0, "Truncated bank was loaded"
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+        
+        print(f"✓ Reference bank serves zero-copy slices ({len(syllables)} syllables)")
+
+
+def test_render_corrections():
+    """Test that the single-pass renderer matches per-syllable replacement"""
+    print("\nTesting correction renderer...")
+    
+    import tracemalloc
+    import numpy as np
+    from src.pronunciation_model import PronunciationModel
+    from src.audio_corrector import AudioCorrector
+    from config import SAMPLE_RATE
+    
+    corrector = AudioCorrector(PronunciationModel(), None)
+    audio = make_syllable_audio(duration=10.0).astype(np.float32)
+    reference = make_syllable_audio(duration=0.25, seed=3).astype(np.float32)
+    corrections = [
+        ({'start_time': start, 'end_time': start + 0.25}, reference)
+        for start in np.arange(0.1, 9.5, 0.5)
+    ]
+    
+    # Without crossfades: identical to fitting and pasting each slot
+    expected = audio.copy()
+    for syllable_info, replacement in corrections:
+        start_sample, end_sample, fitted = corrector.fit_replacement(syllable_info, replacement)
+        expected[start_sample:end_sample] = fitted
+    assert np.array_equal(corrector.render_corrections(audio, corrections, crossfade_ms=0), expected)
+    
+    # Crossfades start and end on the original samples
+    rendered = corrector.render_corrections(audio, corrections)
+    fade = int(0.01 * SAMPLE_RATE)
+    start_sample = int(round(corrections[0][0]['start_time'] * SAMPLE_RATE))
+    assert abs(rendered[start_sample] - audio[start_sample]) < abs(expected[start_sample] - audio[start_sample]) + 1e-6
+    assert np.array_equal(rendered[start_sample + fade:start_sample + 2 * fade],
+                          expected[start_sample + fade:start_sample + 2 * fade])
+    
+    # One output buffer regardless of how many syllables are corrected
+    peaks = []
+    for subset in (corrections[:1], corrections):
+        tracemalloc.start()
+        corrector.render_corrections(audio, subset)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    assert peaks[1] < peaks[0] + 0.1 * audio.nbytes, "Peak memory grows with corrections"
+    
+    print(f"✓ Correction renderer ({len(corrections)} corrections, "
+          f"peak {peaks[1] / audio.nbytes:.2f}x input allocated)")
+
+
+def test_time_stretch():
+    """Test the time-stretch backends and the near-1.0 fast path"""
+    print("\nTesting time-stretch backends...")
+    
+    import numpy as np
+    from src.time_stretch import STRETCH_BACKENDS, time_stretch, benchmark_backends
+    from config import SAMPLE_RATE
+    
+    t = np.arange(int(0.3 * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = np.sin(2 * np.pi * 200 * t).astype(np.float32)
+    for name in STRETCH_BACKENDS:
+        for rate in (0.7, 1.3):
+            stretched = time_stretch(tone, rate, backend=name)
+            assert len(stretched) == int(round(len(tone) / rate)), f"{name} length differs"
+            spectrum = np.abs(np.fft.rfft(stretched * np.hanning(len(stretched))))
+            peak = np.argmax(spectrum) * SAMPLE_RATE / len(stretched)
+            assert abs(peak - 200) < 5, f"{name} changed the pitch ({peak:.0f} Hz)"
+    
+    assert time_stretch(tone, 1.01, tolerance=0.02) is tone, "Fast path did not skip"
+    from src.time_stretch import wsola_stretch
+    assert len(wsola_stretch(tone, 1.3, frame_length=511)) == int(round(len(tone) / 1.3)), "Odd frame length"
+    
+    results = benchmark_backends(repeats=1)
+    assert all(result['max_length_error'] == 0 for result in results.values())
+    
+    print("✓ Time-stretch backends (" + ", ".join(
+        f"{name} {result['ms_per_call']:.1f} ms/call" for name, result in results.items()) + ")")
+
+
+def test_progress_journal():
+    """Test journaled training progress: append, replay, compaction and torn writes"""
+    print("\nTesting progress journal...")
+    
+    import tempfile
+    import src.training_system as training_module
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        training_module.SYLLABLES_DIR = os.path.join(temp_dir, 'syllables')
+        training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, 'training_data')
+        try:
+            training_system = training_module.SyllableTrainingSystem()
+            store = training_system.progress_store
+            store.compact_every = 5
+            snapshot_mtime = os.stat(store.snapshot_path).st_mtime_ns
+            
+            syllables = training_system.syllable_list[:4]
+            for seed, syllable in enumerate(syllables):
+                training_system.save_syllable_recording(syllable, make_syllable_audio(duration=0.3, seed=seed))
+            
+            # Takes are appended to the journal, the snapshot is untouched
+            with open(store.journal_path, encoding='utf-8') as f:
+                assert len(f.readlines()) == 4
+            assert os.stat(store.snapshot_path).st_mtime_ns == snapshot_mtime, "Snapshot rewritten"
+            
+            # A fresh load replays the journal; a torn last line is dropped
+            with open(store.journal_path, 'a', encoding='utf-8') as f:
+                f.write('{"op": "add_recording", "syll')
+            reloaded = training_module.SyllableTrainingSystem()
+            assert reloaded.progress == training_system.progress, "Replay differs"
+            assert reloaded.progress_store.journal_events == 4
+            
+            # The fifth event compacts into the snapshot and empties the journal
+            training_system.reset_training(syllables[0])
+            assert not os.path.exists(store.journal_path), "Journal not compacted"
+            reloaded = training_module.SyllableTrainingSystem()
+            assert reloaded.progress == training_system.progress
+            assert not reloaded.progress[syllables[0]]['trained']
+            assert len(reloaded.get_all_trained_syllables()) == 3
+
+            # Saves on worker threads wait for readers, and compact while others read
+            import threading
+            errors = []
+            def run(fn, *args):
+                try:
+                    fn(*args)
+                except Exception as e:
+                    errors.append(e)
+            with training_system.lock:
+                saver = threading.Thread(target=run, args=(training_system.save_syllable_recording, syllables[0],
+                                                           make_syllable_audio(duration=0.3, seed=20)))
+                saver.start()
+                saver.join(0.2)
+                assert saver.is_alive(), "Save ran while the lock was held"
+            saver.join()
+            store.compact_every = 1
+            def read_references():
+                for _ in range(20):
+                    training_system.get_trained_references()
+                    training_system.get_training_features()
+            threads = [threading.Thread(target=run, args=(read_references,))] + [
+                threading.Thread(target=run, args=(training_system.save_syllable_recording, syllable,
+                                                   make_syllable_audio(duration=0.3, seed=30 + seed)))
+                for seed, syllable in enumerate(training_system.syllable_list[4:10])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert not errors, errors
+            assert training_module.SyllableTrainingSystem().progress == training_system.progress
+            assert len(training_system.get_all_trained_syllables()) == 10
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+        
+        print("✓ Progress journal replays and compacts")
+
+
+def test_sqlite_progress_store():
+    """Test the SQLite training backend against the JSON one"""
+    print("\nTesting SQLite progress store...")
+    
+    import tempfile
+    import numpy as np
+    import src.training_system as training_module
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        training_module.SYLLABLES_DIR = os.path.join(temp_dir, 'syllables')
+        training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, 'training_data')
+        try:
+            json_system = training_module.SyllableTrainingSystem(backend='json')
+            for seed, syllable in enumerate(json_system.syllable_list[:3]):
+                json_system.save_syllable_recording(syllable, make_syllable_audio(duration=0.3, seed=seed))
+            
+            # An empty database starts from the JSON progress
+            sqlite_system = training_module.SyllableTrainingSystem(backend='sqlite', speaker='speaker_a')
+            assert sqlite_system.get_training_status() == json_system.get_training_status()
+            assert sqlite_system.get_all_trained_syllables() == json_system.get_all_trained_syllables()
+            assert sqlite_system.get_next_syllable_to_train() == json_system.get_next_syllable_to_train()
+            for syllable in json_system.get_all_trained_syllables():
+                expected = json_system.get_syllable_reference(syllable)
+                actual = sqlite_system.get_syllable_reference(syllable)
+                assert actual['filepath'] == expected['filepath']
+                assert np.allclose(actual['features'], expected['features'], rtol=1e-6)
+            
+            # Takes, resets and speakers are kept apart
+            next_syllable = sqlite_system.get_next_syllable_to_train()
+            sqlite_system.save_syllable_recording(next_syllable, make_syllable_audio(duration=0.3, seed=7))
+            kept_stats = sqlite_system.get_feature_stats(json_system.syllable_list[1])
+            sqlite_system.reset_training(json_system.syllable_list[0])
+            assert sqlite_system.feature_stats[json_system.syllable_list[1]] is kept_stats, "Other syllables' stats reset"
+            assert sqlite_system.get_training_status()['trained'] == 3
+            assert sqlite_system.get_next_syllable_to_train() == json_system.syllable_list[0]
+            other_speaker = training_module.SyllableTrainingSystem(backend='sqlite', speaker='speaker_b')
+            assert other_speaker.get_training_status()['trained'] == 0
+            assert sqlite_system.recompute_features() == 3
+            
+            # Lookups use the trained-state index
+            plan = sqlite_system.database.connection.execute(
+                'EXPLAIN QUERY PLAN SELECT syllable FROM syllables WHERE speaker_id = 1 AND trained = 0 '
+                'ORDER BY position LIMIT 1'
+            ).fetchall()
+            assert any('idx_syllables_trained' in row[-1] for row in plan), "Index not used"
+            plan = sqlite_system.database.connection.execute(
+                "EXPLAIN QUERY PLAN SELECT 1 FROM recordings WHERE filepath = 'a.wav' LIMIT 1"
+            ).fetchall()
+            assert any('idx_recordings_filepath' in row[-1] for row in plan), "Filepath index not used"
+            
+            # A take stored without features
+            reference = sqlite_system.database.get_reference(next_syllable)
+            sqlite_system.database.add_recording(next_syllable, {'filepath': 'blobs/none.wav'},
+                                                 reference['features'], reference['quality_score'])
+            assert sqlite_system.database.get_take(next_syllable, 'blobs/none.wav')['features'] is None
+            sqlite_system.database.remove_recording(next_syllable, 'blobs/none.wav', reference['features'])
+            
+            # JSON export/import round trip
+            export_path = sqlite_system.export_progress_json(os.path.join(temp_dir, 'export.json'))
+            json_system.import_progress_json(export_path)
+            assert json_system.get_all_trained_syllables() == sqlite_system.get_all_trained_syllables()
+            
+            # Resetting everything only touches this speaker
+            other_speaker.save_syllable_recording(next_syllable, make_syllable_audio(duration=0.3, seed=9))
+            sqlite_system.reset_training()
+            assert sqlite_system.get_training_status()['trained'] == 0 and not sqlite_system.feature_stats
+            assert other_speaker.get_training_status()['trained'] == 1
+            json_system.reset_training()
+            assert training_module.SyllableTrainingSystem(backend='json').get_training_status()['trained'] == 0
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+        
+        print("✓ SQLite progress store matches the JSON backend")
+
+
+def test_feature_stats():
+    """Test incremental per-syllable feature statistics"""
+    print("\nTesting feature statistics...")
+    
+    import tempfile
+    import numpy as np
+    import src.training_system as training_module
+    from src.feature_stats import SyllableFeatureStats
+    
+    # Add/remove agree with a full recomputation, including recency weights
+    rng = np.random.default_rng(0)
+    takes = [(f"take_{i}", rng.normal(size=29) * 5 + 3) for i in range(8)]
+    stats = SyllableFeatureStats.from_takes(takes, decay=0.7)
+    stats.remove(takes[3][1], takes[3][0])
+    kept = [features for key, features in takes if key != "take_3"]
+    weights = np.array([0.7 ** (7 - i) for i in range(8) if i != 3])
+    assert np.allclose(stats.mean, np.mean(kept, axis=0))
+    assert np.allclose(stats.variance(), np.var(kept, axis=0))
+    assert np.allclose(stats.recency_mean(), np.average(kept, axis=0, weights=weights))
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        training_module.SYLLABLES_DIR = os.path.join(temp_dir, 'syllables')
+        training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, 'training_data')
+        try:
+            for backend in ('json', 'sqlite'):
+                training_system = training_module.SyllableTrainingSystem(backend=backend, speaker=backend)
+                source, target = training_system.syllable_list[:2]
+                filepaths = []
+                for seed in range(3):
+                    audio = make_syllable_audio(duration=0.3, seed=seed)
+                    filepaths.append(training_system.save_syllable_recording(source, audio, label=f"take{seed}"))
+                
+                # Move one take to another syllable, then remove the rest
+                assert training_system.relabel_recording(filepaths[0], source, target)
+                assert len(training_system.get_feature_stats(source)) == 2
+                reloaded = training_module.SyllableTrainingSystem(backend=backend, speaker=backend)
+                for syllable in (source, target):
+                    expected = reloaded.get_feature_stats(syllable)  # Rebuilt from the stored takes
+                    assert np.allclose(training_system.get_syllable_reference(syllable)['features'], expected.mean,
+                                       atol=1e-5), f"{backend}: stored vector differs"
+                
+                training_system.remove_recording(source, filepaths[1])
+                training_system.remove_recording(source, filepaths[2], delete_file=True)
+                assert source not in training_system.get_all_trained_syllables()
+                assert not os.path.exists(filepaths[2])
+                assert training_system.get_all_trained_syllables() == [target]
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+        
+        print("✓ Feature statistics track add/remove/relabel")
+
+
+def test_binary_feature_store():
+    """Test feature rows in the memory-mapped feature files"""
+    print("\nTesting binary feature store...")
+    
+    import json
+    import tempfile
+    import numpy as np
+    import src.training_system as training_module
+    from src.progress_store import atomic_write_json
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        training_module.SYLLABLES_DIR = os.path.join(temp_dir, 'syllables')
+        training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, 'training_data')
+        try:
+            # An older progress file with features inlined as lists
+            rng = np.random.default_rng(1)
+            syllables = training_module.get_syllable_list()[:3]
+            legacy = {}
+            for i, syllable in enumerate(syllables):
+                takes = rng.normal(size=(2, 29))
+                legacy[syllable] = {
+                    'trained': True,
+                    'recordings': [{'filepath': f"/missing/{i}_{n}.wav", 'timestamp': '', 'label': 'correct',
+                                    'features': takes[n].tolist()} for n in range(2)],
+                    'quality_score': 1.0,
+                    'feature_vector': takes.mean(axis=0).tolist()
+                }
+            os.makedirs(training_module.TRAINING_DATA_DIR)
+            atomic_write_json(os.path.join(training_module.TRAINING_DATA_DIR, 'training_progress.json'), legacy)
+            
+            training_system = training_module.SyllableTrainingSystem()
+            with open(training_system.progress_store.snapshot_path, encoding='utf-8') as f:
+                snapshot = f.read()
+            assert "'features'" not in snapshot and '"features"' not in snapshot, "Snapshot still holds features"
+            with open(training_system.progress_file, encoding='utf-8') as f:
+                assert json.load(f) == legacy, "The (tracked) interchange file was rewritten"
+            for syllable in syllables:
+                assert np.allclose(training_system.get_syllable_reference(syllable)['features'],
+                                   legacy[syllable]['feature_vector'], atol=1e-6)
+            names, features = training_system.get_training_features()
+            assert isinstance(features, np.memmap) or isinstance(features.base, np.memmap), "Export copied"
+            
+            # A vector row written before a crash, without its journal entry, is never used
+            vector_row = training_system.progress[syllables[1]]['vector_row']
+            training_system._write_vector(np.zeros(29))
+            assert np.allclose(training_module.SyllableTrainingSystem().get_syllable_reference(syllables[1])['features'],
+                               legacy[syllables[1]]['feature_vector'], atol=1e-6)
+            assert training_system.progress[syllables[1]]['vector_row'] == vector_row
+            
+            # New takes land in the same files and survive a reload
+            audio = make_syllable_audio(duration=0.3, seed=4)
+            training_system.save_syllable_recording(syllables[0], audio)
+            reloaded = training_module.SyllableTrainingSystem()
+            assert reloaded.progress == training_system.progress
+            assert np.allclose(reloaded.get_syllable_reference(syllables[0])['features'],
+                               reloaded.get_feature_stats(syllables[0]).mean, atol=1e-5)
+
+            # Exporting packs the vectors again, so it reads the memory map without a copy
+            for seed in (5, 6):
+                training_system.save_syllable_recording(syllables[1], make_syllable_audio(duration=0.3, seed=seed))
+            with open(training_system.progress_store.journal_path, 'rb') as f:
+                journal = f.read()
+            training_system.export_training_data(os.path.join(temp_dir, 'features.npz'))
+            names, features = training_system.get_training_features()
+            assert np.shares_memory(features, training_system.syllable_vectors.matrix()), "Export copied"
+            vector_files = [name for name in os.listdir(training_module.TRAINING_DATA_DIR)
+                            if name.startswith('syllable_vectors')]
+            assert vector_files == [os.path.basename(training_system.syllable_vectors.path)], vector_files
+            assert len(training_system.syllable_vectors) == 3, "Vector file keeps superseded rows"
+
+            # A journal left behind by a crash after the snapshot is not replayed onto it
+            with open(training_system.progress_store.journal_path, 'wb') as f:
+                f.write(journal)
+            assert training_module.SyllableTrainingSystem().progress == training_system.progress
+
+            # The interchange format still inlines lists
+            names, features = reloaded.get_training_features()
+            assert names == syllables and features.shape == (3, 29)
+            exported = os.path.join(temp_dir, 'exported.json')
+            reloaded.export_progress_json(exported)
+            with open(exported, encoding='utf-8') as f:
+                exported_progress = json.load(f)
+            assert exported_progress[syllables[1]]['recordings'][0]['features'] is not None
+            assert np.allclose(exported_progress[syllables[1]]['feature_vector'],
+                               legacy[syllables[1]]['feature_vector'], atol=1e-6)
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+        
+        print("✓ Features stored as float32 rows, migrated and exported")
+
+
+def test_bulk_import():
+    """Test parallel, resumable bulk import of labelled recordings"""
+    print("\nTesting bulk import...")
+    
+    import tempfile
+    import soundfile as sf
+    import src.training_system as training_module
+    from src.bulk_import import bulk_import
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        try:
+            syllables = training_module.get_syllable_list()[:2]
+            archive = os.path.join(temp_dir, 'archive')
+            for i, syllable in enumerate(syllables):
+                folder = os.path.join(archive, syllable.replace('/', '_'))
+                os.makedirs(folder)
+                for n in range(3):
+                    sf.write(os.path.join(folder, f"take_{n}.wav"), make_syllable_audio(0.3, seed=i * 10 + n), 22050)
+            with open(os.path.join(archive, syllables[0].replace('/', '_'), 'broken.wav'), 'wb') as f:
+                f.write(b'not audio')
+            os.makedirs(os.path.join(archive, 'notes'))
+            
+            for backend in ('json', 'sqlite'):
+                training_module.SYLLABLES_DIR = os.path.join(temp_dir, backend, 'syllables')
+                training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, backend, 'training_data')
+                training_system = training_module.SyllableTrainingSystem(backend=backend, speaker=backend)
+                
+                # Interrupt after the first batch, then resume
+                def interrupt(done, total):
+                    if done >= 2:
+                        raise KeyboardInterrupt
+                try:
+                    bulk_import(training_system, archive, workers=2, batch_size=2, progress_callback=interrupt)
+                    assert False, "Import was not interrupted"
+                except KeyboardInterrupt:
+                    pass
+                calls = []
+                counts = bulk_import(training_system, archive, workers=2, batch_size=2,
+                                     progress_callback=lambda done, total: calls.append((done, total)))
+                assert counts == {'found': 7, 'imported': 5, 'skipped': 2, 'failed': 0}, counts  # broken.wav failed in batch 1
+                assert calls[-1] == (7, 7)
+                
+                reloaded = training_module.SyllableTrainingSystem(backend=backend, speaker=backend)
+                assert reloaded.get_all_trained_syllables() == syllables
+                for syllable in syllables:
+                    assert len(reloaded.get_feature_stats(syllable)) == 3, f"{backend}: wrong take count"
+                    assert reloaded.get_syllable_reference(syllable)['filepath'].startswith(training_module.SYLLABLES_DIR)
+                
+                # A finished import is not repeated
+                assert bulk_import(reloaded, archive, workers=2)['imported'] == 0
+                
+                # The state log holds one line per clip (appended per batch, not rewritten)
+                state_path = os.path.join(training_module.TRAINING_DATA_DIR, 'bulk_import_state.jsonl')
+                with open(state_path, encoding='utf-8') as f:
+                    assert len(f.readlines()) == 1 + counts['found']
+                with open(state_path, 'a', encoding='utf-8') as f:
+                    f.write('{"source": "torn')
+                assert bulk_import(reloaded, archive, workers=2)['skipped'] == counts['found']
+                with open(state_path, encoding='utf-8') as f:
+                    assert len(f.readlines()) == 1 + counts['found'], "Torn line was kept"
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+        
+        print("✓ Bulk import is parallel, resumable and skips bad files")
+
+
+def test_recording_store():
+    """Test content-addressed recording storage and path migration"""
+    print("\nTesting recording store...")
+    
+    import shutil
+    import tempfile
+    import numpy as np
+    import soundfile as sf
+    import src.training_system as training_module
+    from src.progress_store import atomic_write_json
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        try:
+            for backend in ('json', 'sqlite'):
+                base = os.path.join(temp_dir, backend)
+                training_module.SYLLABLES_DIR = os.path.join(base, 'syllables')
+                training_module.TRAINING_DATA_DIR = os.path.join(base, 'training_data')
+                
+                # Progress from another machine: absolute paths, two identical takes, one lost file
+                syllable = training_module.get_syllable_list()[0]
+                folder = syllable.replace('/', '_')
+                os.makedirs(os.path.join(training_module.SYLLABLES_DIR, folder))
+                audio = make_syllable_audio(0.3, seed=7)
+                recordings = []
+                for name in ('lost.wav', 'correct_1.wav', 'correct_2.wav'):
+                    if name != 'lost.wav':
+                        sf.write(os.path.join(training_module.SYLLABLES_DIR, folder, name), audio, 22050)
+                    recordings.append({'filepath': f"/home/someone/phoneme-replacement/data/syllables/{folder}/{name}",
+                                       'timestamp': '', 'label': 'correct', 'features': [0.5] * 29})
+                os.makedirs(training_module.TRAINING_DATA_DIR)
+                atomic_write_json(os.path.join(training_module.TRAINING_DATA_DIR, 'training_progress.json'), {
+                    syllable: {'trained': True, 'recordings': recordings, 'quality_score': 1.0,
+                               'feature_vector': [0.5] * 29}
+                })
+                
+                training_system = training_module.SyllableTrainingSystem(backend=backend, speaker=backend)
+                assert len(training_system.get_feature_stats(syllable)) == 2, f"{backend}: identical takes not merged"
+                assert training_system.missing_recordings() == [recordings[0]['filepath']]
+                reference = training_system.get_syllable_reference(syllable)
+                assert os.path.exists(reference['filepath']) and '/blobs/' in reference['filepath']
+                assert not os.path.exists(os.path.join(training_module.SYLLABLES_DIR, folder, 'correct_1.wav'))
+                
+                # Identical new takes are stored once
+                other = training_module.get_syllable_list()[1]
+                first = training_system.save_syllable_recording(other, make_syllable_audio(0.3, seed=8))
+                second = training_system.save_syllable_recording(other, make_syllable_audio(0.3, seed=8))
+                assert first == second and len(training_system.get_feature_stats(other)) == 1
+                assert len(training_system.recording_store.list_blobs()) == 2
+                
+                # The data keeps working after being moved
+                moved = os.path.join(temp_dir, backend + '_moved')
+                shutil.copytree(base, moved)
+                training_module.SYLLABLES_DIR = os.path.join(moved, 'syllables')
+                training_module.TRAINING_DATA_DIR = os.path.join(moved, 'training_data')
+                relocated = training_module.SyllableTrainingSystem(backend=backend, speaker=backend)
+                path = relocated.get_syllable_reference(other)['filepath']
+                assert path.startswith(moved) and os.path.exists(path), f"{backend}: moved data not found"
+                
+                # A shared blob is only deleted with its last take
+                assert relocated.relabel_recording(path, other, syllable)
+                assert relocated.remove_recording(syllable, path, delete_file=True) and not os.path.exists(path)
+
+            # A crash before the new paths are saved leaves the old files in place
+            from src.progress_store import JournalProgressStore
+            base = os.path.join(temp_dir, 'crash')
+            training_module.SYLLABLES_DIR = os.path.join(base, 'syllables')
+            training_module.TRAINING_DATA_DIR = os.path.join(base, 'training_data')
+            os.makedirs(os.path.join(training_module.SYLLABLES_DIR, folder))
+            os.makedirs(training_module.TRAINING_DATA_DIR)
+            legacy = os.path.join(training_module.SYLLABLES_DIR, folder, 'correct_1.wav')
+            sf.write(legacy, audio, 22050)
+            atomic_write_json(os.path.join(training_module.TRAINING_DATA_DIR, 'training_progress.json'), {
+                syllable: {'trained': True, 'quality_score': 1.0, 'feature_vector': [0.5] * 29,
+                           'recordings': [{'filepath': legacy, 'timestamp': '', 'label': 'correct',
+                                           'features': [0.5] * 29}]}
+            })
+            compact = JournalProgressStore.compact
+            def crashing_compact(store, progress):
+                if any(rec['filepath'].startswith('blobs/')
+                       for data in progress.values() for rec in data['recordings']):
+                    raise RuntimeError("simulated crash")
+                compact(store, progress)
+            JournalProgressStore.compact = crashing_compact
+            try:
+                training_module.SyllableTrainingSystem(speaker='crash')
+                assert False, "simulated crash did not happen"
+            except RuntimeError:
+                pass
+            finally:
+                JournalProgressStore.compact = compact
+            assert os.path.exists(legacy), "legacy take deleted before its new path was saved"
+
+            recovered = training_module.SyllableTrainingSystem(speaker='crash')
+            path = recovered.get_syllable_reference(syllable)['filepath']
+            assert '/blobs/' in path and os.path.exists(path) and not os.path.exists(legacy)
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+        
+        print("✓ Recordings stored by content, deduplicated and relocatable")
+
+
+def test_ring_buffer_recorder():
+    """Test the callback-driven ring buffer recording mode"""
+    print("\nTesting ring buffer recorder...")
+    
+    import numpy as np
+    from src.audio_recorder import AudioRecorder, AudioRingBuffer
+    
+    # Blocks are copied into the preallocated array; the take comes back as a view
+    rng = np.random.default_rng(0)
+    blocks = [rng.normal(size=(512, 1)).astype(np.float32) for _ in range(40)]
+    buffer = AudioRingBuffer(40 * 512, channels=1)
+    data = buffer.data
+    for block in blocks:
+        buffer.write(block)
+    audio = buffer.view()
+    assert buffer.data is data, "Buffer reallocated while writing"
+    assert np.array_equal(audio, np.concatenate(blocks)) and audio.base is buffer.data
+    assert buffer.overruns == 0
+    
+    # Once full it keeps the latest audio and counts the overwrites
+    buffer = AudioRingBuffer(4096, channels=1)
+    for block in blocks:
+        buffer.write(block)
+    assert np.array_equal(buffer.view(), np.concatenate(blocks)[-4096:])
+    assert buffer.overruns == 40 - 8
+    
+    # The recorder's callback writes straight into the buffer, no collector thread
+    class Status:
+        input_overflow = True
+        def __bool__(self):
+            return True
+    
+    recorder = AudioRecorder(mode='ring')
+    recorder._prepare_capture()
+    recorder.recording = True
+    data = recorder.ring_buffer.data
+    for i, block in enumerate(blocks):
+        recorder._audio_callback(block, len(block), None, Status() if i == 5 else None)
+    assert recorder.ring_buffer.data is data, "Callback reallocated the buffer"
+    audio = recorder.stop_recording()
+    assert audio.shape == (40 * 512,) and np.array_equal(audio, np.concatenate(blocks)[:, 0])
+    assert recorder.get_overruns() == 1
+    assert not hasattr(recorder, 'record_thread')
+    
+    print("✓ Ring buffer recorder (view on stop, overruns counted)")
+
+
+def test_record_to_disk():
+    """Test streaming a recording to disk and memory-mapping it back"""
+    print("\nTesting record-to-disk mode...")
+    
+    import tempfile
+    import time
+    import numpy as np
+    import soundfile as sf
+    from src.audio_recorder import AudioRecorder
+    from src.disk_recording import DiskRecordingWriter, open_wav_memmap
+    from src.syllable_analyzer import SyllableAnalyzer
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rng = np.random.default_rng(0)
+        blocks = [(rng.normal(size=(512, 1)) * 0.1).astype(np.float32) for _ in range(60)]
+        
+        # The file is valid on disk while recording is still going on
+        path = os.path.join(temp_dir, 'live.wav')
+        writer = DiskRecordingWriter(path, 22050, 1, flush_seconds=0.05)
+        for block in blocks[:20]:
+            writer.put(block)
+        time.sleep(0.3)
+        partial, _ = sf.read(path, dtype='float32')
+        assert len(partial) == 20 * 512, f"Header not flushed ({len(partial)} samples)"
+        writer.close()
+        
+        # Through the recorder: the finished take comes back memory-mapped
+        recorder = AudioRecorder()
+        path = os.path.join(temp_dir, 'session.wav')
+        recorder._prepare_capture(path)
+        recorder.recording = True
+        for block in blocks:
+            recorder._audio_callback(block, len(block), None, None)
+        audio = recorder.stop_recording()
+        expected = np.concatenate(blocks)
+        assert isinstance(audio.base, np.memmap) and np.array_equal(audio, expected[:, 0])
+        assert np.array_equal(sf.read(path, dtype='float32', always_2d=True)[0], expected)
+        loaded, sr = SyllableAnalyzer().load_audio(path, mmap=True)
+        assert sr == 22050 and isinstance(loaded.base, np.memmap) and np.array_equal(loaded, expected[:, 0])
+        assert open_wav_memmap(os.path.join(temp_dir, 'missing.wav')) is None
+        
+        # FLAC output, read back through soundfile
+        recorder._prepare_capture(os.path.join(temp_dir, 'session.flac'))
+        recorder.recording = True
+        for block in blocks:
+            recorder._audio_callback(block, len(block), None, None)
+        assert np.allclose(recorder.stop_recording(), expected[:, 0], atol=1e-4)
+        
+        # A writer that cannot keep up drops blocks instead of blocking the callback
+        writer = DiskRecordingWriter(os.path.join(temp_dir, 'slow.wav'), 22050, 1, queue_blocks=2,
+                                     listeners=[lambda block: time.sleep(0.05)])
+        accepted = sum(writer.put(block) for block in blocks)
+        writer.close()
+        assert writer.dropped_blocks == len(blocks) - accepted > 0
+        
+        print("✓ Record-to-disk mode (crash-safe header, memory-mapped result)")
+
+
+def test_voice_activity_trimming():
+    """Test capture-time silence trimming and auto-stop"""
+    print("\nTesting voice activity trimming...")
+    
+    import numpy as np
+    from src.audio_recorder import AudioRecorder
+    from src.vad import EnergyVAD
+    
+    sr = 22050
+    rng = np.random.default_rng(0)
+    
+    def noise(seconds):
+        return (0.003 * rng.standard_normal(int(seconds * sr))).astype(np.float32)
+    
+    t = np.arange(int(0.25 * sr)) / sr
+    syllable = (np.sin(np.pi * t / 0.25) * 0.4 * np.sin(2 * np.pi * 150 * t)).astype(np.float32)
+    take = np.concatenate([noise(0.6), syllable + noise(0.25), noise(1.5)])
+    speech_start, speech_end = int(0.6 * sr), int(0.85 * sr)
+    
+    # Calibrated from the start of the take; stops itself after the pause
+    stops = []
+    recorder = AudioRecorder(mode='ring')
+    recorder._prepare_capture(trim_silence=True, auto_stop_ms=500, on_auto_stop=lambda: stops.append(True))
+    recorder.recording = True
+    for start in range(0, len(take), 512):
+        block = take[start:start + 512, None]
+        recorder._audio_callback(block, len(block), None, None)
+    audio = recorder.stop_recording()
+    assert stops == [True], "Auto-stop did not fire once"
+    assert recorder.captured_samples < speech_end + int(0.6 * sr), "Kept recording after auto-stop"
+    assert audio.base is recorder.ring_buffer.data, "Trimmed take is not a view"
+    padding = int(0.06 * sr)
+    assert abs(len(audio) - (speech_end - speech_start + 2 * padding)) < int(0.03 * sr), len(audio) / sr
+
+    # The take (captured as frames x 1 blocks) is saved with real features
+    import tempfile
+    import src.training_system as training_module
+    directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        training_module.SYLLABLES_DIR = os.path.join(temp_dir, 'syllables')
+        training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, 'training_data')
+        try:
+            training_system = training_module.SyllableTrainingSystem()
+            name = training_module.get_syllable_list()[0]
+            training_system.save_syllable_recording(name, audio)
+            features = training_system.get_syllable_reference(name)['features']
+            assert audio.ndim == 1 and np.any(features != 0), "Recorded take saved with zero features"
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+
+    # Speaking right after pressing Record, inside the noise-floor sample
+    for onset in (0.1, 0.2):
+        vad = EnergyVAD(sr)
+        vad.reset(auto_stop_ms=500)
+        early_take = np.concatenate([noise(onset), syllable + noise(0.25), noise(1.0)])
+        stopped = any(vad.process(early_take[start:start + 512]) for start in range(0, len(early_take), 512))
+        bounds = vad.speech_bounds(len(early_take), padding_ms=0)
+        assert bounds is not None and stopped, f"Speech at {onset}s not found"
+        assert abs(bounds[0] - int(onset * sr)) < int(0.03 * sr) and abs(bounds[1] - int((onset + 0.25) * sr)) < int(0.03 * sr), \
+            [b / sr for b in bounds]
+    
+    # Explicit calibration, and quiet fricative noise still counts as speech
+    vad = EnergyVAD(sr)
+    vad.calibrate(noise(0.5))
+    hiss = (0.02 * rng.standard_normal(int(0.15 * sr))).astype(np.float32)
+    trimmed = vad.trim(np.concatenate([noise(0.5), hiss, noise(0.5)]))
+    assert abs(len(trimmed) - (len(hiss) + 2 * padding)) < int(0.03 * sr), len(trimmed) / sr
+    
+    # No speech: the take is kept whole
+    silence = noise(1.0)
+    assert len(vad.trim(silence)) == len(silence)
+    
+    print("✓ Voice activity trimming and auto-stop")
+
+
+def test_audio_sources():
+    """Test the file and synthetic audio sources against the live-audio consumers"""
+    print("\nTesting audio sources...")
+    
+    import tempfile
+    import time
+    import numpy as np
+    import soundfile as sf
+    from src.audio_sources import SyntheticSyllableSource, WavFileSource, create_audio_source
+    from src.audio_recorder import AudioRecorder
+    from src.streaming_segmenter import StreamingSyllableSegmenter
+    
+    # The synthetic stream is reproducible and logs where its syllables are
+    source = SyntheticSyllableSource(duration=5, channels=1, realtime=False, seed=1)
+    segmenter = StreamingSyllableSegmenter(sample_rate=source.sample_rate)
+    syllables = segmenter.run_source(source, timeout=30)
+    onsets = [start / source.sample_rate for start, end, _ in source.syllables if end <= 5 * source.sample_rate]
+    found = [syllable['start_time'] for syllable in syllables]
+    matched = sum(1 for onset in onsets if any(abs(onset - start) < 0.1 for start in found))
+    assert matched >= 0.7 * len(onsets), f"{matched}/{len(onsets)} onsets found"
+    
+    # A file replayed as fast as possible records exactly what is in it
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'take.wav')
+        audio = np.random.default_rng(0).uniform(-0.5, 0.5, 22050).astype(np.float32)
+        sf.write(path, audio, 22050, subtype='FLOAT')
+        
+        recorder = AudioRecorder(sample_rate=22050, channels=1, mode='ring',
+                                 source=WavFileSource(path, 22050, channels=1, realtime=False))
+        recorder.start_recording()
+        assert recorder.source.wait(10)
+        recorded = recorder.stop_recording()
+        assert np.allclose(recorded, audio, atol=1e-6)
+        
+        # Replaying starts from the beginning again
+        recorder.start_recording()
+        recorder.source.wait(10)
+        assert len(recorder.stop_recording()) == len(audio)
+        
+        assert isinstance(create_audio_source(path, 22050, 1), WavFileSource)
+    
+    # Real-time sources deliver at the sample rate, and stop() ends the callbacks
+    source = SyntheticSyllableSource(channels=1, realtime=True, sample_rate=16000, block_size=800)
+    blocks = []
+    started = time.perf_counter()
+    source.start(lambda indata, frames, time_info, status: blocks.append(frames))
+    time.sleep(0.5)
+    source.stop()
+    elapsed = time.perf_counter() - started
+    delivered = sum(blocks)
+    assert delivered <= elapsed * 16000 + 800 and delivered >= 0.25 * 16000, delivered
+    time.sleep(0.1)
+    assert sum(blocks) == delivered and not source.is_active()
+    
+    print(f"✓ Audio sources ({matched}/{len(onsets)} synthetic onsets found, file and real-time replay)")
+
+
+def test_job_scheduler():
+    """Test the GUI background job scheduler"""
+    print("\nTesting job scheduler...")
+    
+    import threading
+    import time
+    from src.job_scheduler import JobScheduler
+    
+    scheduler = JobScheduler(max_workers=2)
+    
+    def pump_until_idle(timeout=5):
+        deadline = time.time() + timeout
+        while not scheduler.is_idle() and time.time() < deadline:
+            scheduler.pump()
+            time.sleep(0.01)
+        return scheduler.is_idle()
+    
+    # Results and errors come back through pump() on the calling thread
+    delivered = []
+    scheduler.submit('sum', sum, [1, 2, 3], on_done=lambda r: delivered.append((r, threading.current_thread())))
+    scheduler.submit('fail', lambda: 1 / 0, on_error=lambda e: delivered.append(type(e).__name__))
+    assert pump_until_idle()
+    assert (6, threading.current_thread()) in delivered and 'ZeroDivisionError' in delivered
+    
+    # Repeated requests of one kind: the running one is cancelled, only the newest waits
+    release = threading.Event()
+    started = []
+    results = []
+    
+    def analysis(n, token):
+        started.append(n)
+        if n == 0:
+            release.wait(5)
+        return n, token.cancelled
+    
+    for n in range(10):
+        scheduler.submit('analysis', analysis, n, on_done=results.append, with_token=True)
+    assert scheduler.is_busy('analysis')
+    release.set()
+    assert pump_until_idle()
+    assert started[-1] == 9 and len(started) <= 2, started  # 0 may be cancelled before it starts
+    assert results == [(9, False)], results
+    
+    # Non-coalescing jobs all run; cancel() drops a kind's result
+    saved = []
+    for n in range(5):
+        scheduler.submit('save', saved.append, n, coalesce=False)
+    release.clear()
+    cancelled = []
+    scheduler.submit('slow', release.wait, 5, on_done=cancelled.append)
+    scheduler.cancel('slow')
+    release.set()
+    assert pump_until_idle()
+    assert sorted(saved) == list(range(5)) and cancelled == []
+    
+    scheduler.shutdown(wait=True)
+    
+    # Closing with both workers busy: queued saves still run and are delivered, analysis is dropped
+    scheduler = JobScheduler(max_workers=2)
+    release.clear()
+    delivered = []
+    scheduler.submit('startup', release.wait, 5)
+    scheduler.submit('analysis', release.wait, 5, on_done=delivered.append)
+    for n in range(3):
+        scheduler.submit('save', lambda n: n, n, on_done=delivered.append, coalesce=False)
+    scheduler.submit('playback', delivered.append, 'played')
+    threading.Timer(0.1, release.set).start()
+    scheduler.shutdown(wait=True)
+    assert delivered == [0, 1, 2], delivered
+    assert scheduler.submit('save', delivered.append, 3, coalesce=False).cancelled
+    
+    print("✓ Job scheduler (batched delivery, coalescing, cancellation)")
+
+
+def test_progressive_correction():
+    """Test that incremental correction yields the same results as correct_audio"""
+    print("\nTesting progressive correction results...")
+    
+    import tempfile
+    import time
+    import numpy as np
+    import soundfile as sf
+    import src.pronunciation_model as pronunciation_model
+    from src.syllable_analyzer import SyllableAnalyzer
+    from src.audio_corrector import AudioCorrector
+    from src.job_scheduler import JobScheduler, CancelToken
+    from config import SAMPLE_RATE
+    
+    class ReferenceFiles:
+        """Minimal stand-in for SyllableTrainingSystem"""
+        def __init__(self):
+            self.references = {}
+        
+        def get_syllable_reference(self, syllable):
+            return self.references.get(syllable)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        references = ReferenceFiles()
+        model = pronunciation_model.PronunciationModel()
+        for i, syllable in enumerate(SyllableAnalyzer().analyze_audio(make_syllable_audio(duration=3.0, seed=1))):
+            filepath = os.path.join(temp_dir, f"reference_{i}.wav")
+            sf.write(filepath, syllable['audio'], SAMPLE_RATE)
+            references.references[f"syllable_{i}"] = {'filepath': filepath, 'features': syllable['features']}
+            model.add_syllable_reference(f"syllable_{i}", syllable['features'])
+        corrector = AudioCorrector(model, references)
+        audio = make_syllable_audio(duration=4.0)
+        
+        # Flag every syllable so corrections are reported too
+        threshold = pronunciation_model.SIMILARITY_THRESHOLD
+        pronunciation_model.SIMILARITY_THRESHOLD = 1.01
+        try:
+            expected_audio, expected = corrector.correct_audio(audio)
+            events = list(corrector.iter_correct_audio(audio))
+            batch_assessed = corrector.analyze_and_assess(audio)
+            
+            # A cancelled run stops after the syllable it is working on (and its correction)
+            token = CancelToken()
+            partial = []
+            for event, value in corrector.iter_correct_audio(audio, token=token):
+                partial.append(event)
+                token.cancel()
+            
+            # Progress items reach the GUI thread in order, before the result
+            scheduler = JobScheduler()
+            delivered = []
+            
+            def analyze(audio, token, progress):
+                for event, value in corrector.iter_correct_audio(audio, token=token):
+                    if event == 'done':
+                        return value
+                    progress(event)
+            
+            scheduler.submit('analysis', analyze, audio, on_done=lambda result: delivered.append('done'),
+                             on_progress=delivered.append, with_token=True)
+            deadline = time.time() + 30
+            while not scheduler.is_idle() and time.time() < deadline:
+                scheduler.pump()
+                time.sleep(0.01)
+            scheduler.shutdown()
+        finally:
+            pronunciation_model.SIMILARITY_THRESHOLD = threshold
+        
+        kinds = [event for event, _ in events]
+        assert kinds[-1] == 'done' and kinds.count('done') == 1
+        corrected_audio, report = events[-1][1]
+        assert kinds.count('syllable') == expected['total_syllables'] > 0
+        assert kinds.count('correction') == expected['syllables_corrected'] > 0
+        assert np.allclose([s['quality_score'] for s in report['syllables_analyzed']],
+                           [s['quality_score'] for s in expected['syllables_analyzed']], atol=1e-5)
+        assert [(c['index'], c['syllable'], c['start_time']) for c in report['corrections']] == \
+            [(c['index'], c['syllable'], c['start_time']) for c in expected['corrections']]
+        assert np.allclose(corrected_audio, expected_audio, atol=1e-5)
+        assert partial == ['syllable', 'correction'], partial
+        assert delivered == kinds, delivered
+        
+        # Scores agree with the batched search
+        assert np.allclose([s['quality_score'] for s in report['syllables_analyzed']],
+                           [s['quality_score'] for s in batch_assessed], atol=1e-5)
+    
+    print(f"✓ Progressive correction ({kinds.count('syllable')} syllables, "
+          f"{kinds.count('correction')} corrections streamed)")
+
+
+def test_shared_analyzer_warm_up():
+    """Test the shared analyzer and the start-up warm-up paths"""
+    print("\nTesting shared analyzer and warm-up...")
+    
+    import tempfile
+    import time
+    import numpy as np
+    import src.training_system as training_module
+    from src.syllable_analyzer import SyllableAnalyzer
+    from src.pronunciation_model import PronunciationModel
+    from src.audio_corrector import AudioCorrector
+    
+    # One analyzer instance serves the training system and the corrector
+    analyzer = SyllableAnalyzer()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directories = (training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR)
+        try:
+            training_module.SYLLABLES_DIR = os.path.join(temp_dir, 'syllables')
+            training_module.TRAINING_DATA_DIR = os.path.join(temp_dir, 'training_data')
+            training_system = training_module.SyllableTrainingSystem(analyzer=analyzer)
+        finally:
+            training_module.SYLLABLES_DIR, training_module.TRAINING_DATA_DIR = directories
+    model = PronunciationModel()
+    corrector = AudioCorrector(model, training_system, analyzer=analyzer)
+    assert training_system.analyzer is analyzer and corrector.analyzer is analyzer
+    
+    # Warming up leaves no state behind that changes results
+    audio = make_syllable_audio(duration=2.0, seed=4)
+    started = time.perf_counter()
+    analyzer.warm_up()
+    model.create_model()
+    model.warm_up()
+    warm_up_seconds = time.perf_counter() - started
+    assert len(model.syllable_references) == 0
+    
+    started = time.perf_counter()
+    syllables = analyzer.analyze_audio(audio)
+    analysis_seconds = time.perf_counter() - started
+    fresh = SyllableAnalyzer().analyze_audio(audio)
+    assert len(syllables) == len(fresh) > 0
+    assert np.allclose(np.vstack([s['features'] for s in syllables]), np.vstack([s['features'] for s in fresh]))
+    
+    # GUI start-up: a failed warm-up keeps the loaded model, a failed load is never marked ready
+    from main import HebrewSpeechCorrectorGUI
+    
+    class Status:
+        def set(self, text):
+            self.text = text
+    
+    class BrokenAnalyzer:
+        def warm_up(self):
+            raise RuntimeError("warm-up failed")
+    
+    class References:
+        def __init__(self, fail=False):
+            self.fail = fail
+        
+        def get_trained_references(self):
+            if self.fail:
+                raise RuntimeError("progress unreadable")
+            return {'ba': {'features': syllables[0]['features']}}
+    
+    gui = HebrewSpeechCorrectorGUI.__new__(HebrewSpeechCorrectorGUI)
+    gui.status_var = Status()
+    gui.analyzer = BrokenAnalyzer()
+    gui.training_system = References()
+    gui.model = PronunciationModel()
+    gui.corrector = AudioCorrector(gui.model, None, analyzer=analyzer)
+    gui.model_ready = False
+    gui.model_error = None
+    gui.interactive_seconds = None
+    gui.on_model_loaded(gui.load_model_if_exists())
+    assert gui.model_ready and 'ba' in gui.model.syllable_references, "Warm-up failure discarded the model"
+    
+    gui.model_ready = False
+    gui.training_system = References(fail=True)
+    gui.on_model_load_failed(RuntimeError("background load failed"))
+    assert not gui.model_ready and gui.model_error is not None, "Failed load was marked ready"
+    
+    print(f"✓ Shared analyzer and warm-up (warm-up {warm_up_seconds:.2f}s, "
+          f"then analysis {analysis_seconds * 1000:.0f} ms)")
+
+
+def test_import_time():
+    """Test that src modules import without loading the heavy dependencies"""
+    print("\nTesting import time...")
+    
+    import subprocess
+    
+    heavy = ('librosa', 'torch', 'scipy', 'sklearn', 'soundfile', 'pydub', 'sounddevice')
+    modules = ['config', 'src.hebrew_syllables', 'src.syllable_analyzer', 'src.training_system',
+               'src.pronunciation_model', 'src.audio_corrector', 'src.audio_recorder',
+               'src.streaming_corrector', 'src.bulk_import']
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-500:]
+    
+    # "import time: self [us] | cumulative | module" with the name indented by nesting
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, total, name = line.split('|')
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total) / 1e6
+    
+    loaded = sorted({name.split('.')[0] for name in cumulative} & set(heavy))
+    assert not loaded, f"heavy dependencies imported eagerly: {loaded}"
+    assert cumulative['config'] < 0.05 and cumulative['src.hebrew_syllables'] < 0.05, \
+        f"{cumulative['config']:.3f}s / {cumulative['src.hebrew_syllables']:.3f}s"
+    total = sum(cumulative[name] for name in modules if name in cumulative)
+    assert total < 2.0, f"{total:.2f}s"
+    
+    # The deferred modules still work once used
+    from src.lazy_import import lazy_import
+    fft = lazy_import('scipy.fft')
+    assert fft.dct([1.0, 1.0])[0] == 4.0 and repr(fft).endswith("(loaded)>")
+    
+    print(f"✓ Import time ({len(modules)} modules in {total * 1000:.0f} ms, "
+          f"config {cumulative['config'] * 1000:.1f} ms, no heavy dependencies)")
+
+
+def test_waveform_pyramid():
+    """Test the min/max waveform pyramid behind the waveform view"""
+    print("\nTesting waveform pyramid...")
+    
+    import time
+    import numpy as np
+    from src.waveform_view import WaveformPyramid
+    
+    rng = np.random.default_rng(0)
+    envelope = np.repeat(rng.uniform(0, 1, 600), 2205)
+    audio = (rng.standard_normal(len(envelope)) * envelope).astype(np.float32)
+    
+    # Built while recording (odd block sizes) equals built in one go
+    pyramid = WaveformPyramid.from_audio(audio)
+    live = WaveformPyramid()
+    for start in range(0, len(audio), 1000):
+        live.append(audio[start:start + 1000, None])
+    assert live.counts == pyramid.counts and live.total_samples == len(audio)
+    for level, count in enumerate(pyramid.counts):
+        assert np.array_equal(live.levels[level][:count], pyramid.levels[level][:count])
+    assert abs(pyramid.peak() - np.abs(audio).max()) < 1e-6
+    
+    # Every pixel's range covers the samples under it, at any zoom (past the end is NaN)
+    for start, end, width in [(0, len(audio), 800), (12345, 12345 + 2400, 800),
+                              (100000, 180000, 800), (len(audio) - 5000, len(audio) + 5000, 800)]:
+        mins, maxs = pyramid.query(start, end, width)
+        per_pixel = (end - start) / width
+        for x in range(0, width, 37):
+            lo, hi = int(start + x * per_pixel), min(int(np.ceil(start + (x + 1) * per_pixel)), len(audio))
+            if lo >= len(audio):
+                assert np.isnan(mins[x]) and np.isnan(maxs[x])
+                continue
+            assert mins[x] <= audio[lo:hi].min() and maxs[x] >= audio[lo:hi].max()
+        assert np.nanmax(maxs) == audio[start:end].max()
+    
+    # Drawing cost follows the pixels, not the length of the recording
+    def query_ms(pyramid):
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            pyramid.query(0, pyramid.total_samples, 800)
+            timings.append(time.perf_counter() - started)
+        return np.median(timings) * 1000
+    
+    long_pyramid = WaveformPyramid.from_audio(np.tile(audio, 20))
+    short_ms, long_ms = query_ms(pyramid), query_ms(long_pyramid)
+    assert long_ms < 5 * short_ms + 1.0, f"{short_ms:.2f} ms vs {long_ms:.2f} ms"
+    
+    print(f"✓ Waveform pyramid ({len(pyramid.levels)} levels, 800 px of 1 min in {short_ms:.2f} ms, "
+          f"of 20 min in {long_ms:.2f} ms)")
+
+
+def run_test(name, test):
+    """Run an assert-style test for the summary, reporting its failure"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"✗ {name} failed: {e!r}")
+        return False
+
+
 def main():
     """Run all tests"""
     print("=" * 60)
@@ -203,6 +1743,34 @@ def main():
     results.append(("Audio Devices", test_audio_devices()))
     results.append(("Directories", test_directories()))
     results.append(("Feature Extraction", test_feature_extraction()))
+    # Assert-style tests raise on failure
+    for name, test in [
+        ("Shared-STFT Features", test_shared_stft_features),
+        ("Batched Features", test_batch_feature_extraction),
+        ("Reference Matching", test_reference_matching),
+        ("Streaming Segmentation", test_streaming_segmentation),
+        ("Streaming Correction", test_streaming_correction),
+        ("Reference Audio Cache", test_reference_audio_cache),
+        ("Reference Bank", test_reference_bank),
+        ("Correction Renderer", test_render_corrections),
+        ("Time Stretch", test_time_stretch),
+        ("Progress Journal", test_progress_journal),
+        ("SQLite Progress Store", test_sqlite_progress_store),
+        ("Feature Statistics", test_feature_stats),
+        ("Binary Feature Store", test_binary_feature_store),
+        ("Bulk Import", test_bulk_import),
+        ("Recording Store", test_recording_store),
+        ("Ring Buffer Recorder", test_ring_buffer_recorder),
+        ("Record to Disk", test_record_to_disk),
+        ("Voice Activity Trimming", test_voice_activity_trimming),
+        ("Audio Sources", test_audio_sources),
+        ("Job Scheduler", test_job_scheduler),
+        ("Progressive Correction", test_progressive_correction),
+        ("Shared Analyzer Warm-up", test_shared_analyzer_warm_up),
+        ("Import Time", test_import_time),
+        ("Waveform Pyramid", test_waveform_pyramid),
+    ]:
+        results.append((name, run_test(name, test)))
     
     # Summary
     print("\n" + "=" * 60)